@@ -0,0 +1,156 @@
+# analytics.py - Columnar time entry analytics (pivots, heatmaps, percentiles)
+#
+# Pivots over a year of time entries (hours per user x project x week) are too slow and
+# too large to build from ORM objects. load_entries() reads only the needed columns of
+# a period in a single cursor pass into NumPy arrays:
+#     benutzer_id, projekt_id, aufgabe_id   int32
+#     day                                   int32, days since 1970-01-01
+#     minutes                               int16 (one entry is at most 24 h)
+#     billable                              bool
+# i.e. 19 bytes per entry instead of an ORM object with its identity map entry.
+# group_by(), pivot() and percentiles() work on these arrays vectorized; the router
+# (routers/analytics.py) turns the results into compact label + matrix responses.
+# Without NumPy installed ENABLED is False and the analytics endpoints answer 501.
+
+import itertools
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+import models
+from sql_compat import epoch_day
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENABLED = np is not None
+
+# Rows per fetch; the arrays are built per chunk, so the driver never holds the whole result
+CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", "50000"))
+EPOCH = date(1970, 1, 1)
+# 1970-01-05 was the first Monday after the epoch; weeks are numbered from there
+_MONDAY_OFFSET = 4
+_COLUMNS = 6
+
+
+@dataclass
+class Entries:
+    benutzer_id: "np.ndarray"
+    projekt_id: "np.ndarray"
+    aufgabe_id: "np.ndarray"
+    day: "np.ndarray"
+    minutes: "np.ndarray"
+    billable: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in (
+            self.benutzer_id, self.projekt_id, self.aufgabe_id, self.day, self.minutes, self.billable,
+        ))
+
+    @property
+    def week(self) -> "np.ndarray":
+        """Week number of every entry (Monday-based, counted from 1970-01-05)."""
+        return (self.day - _MONDAY_OFFSET) // 7
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def week_number(day: date) -> int:
+    return (day_number(day) - _MONDAY_OFFSET) // 7
+
+
+def week_monday(week: int) -> date:
+    return EPOCH + timedelta(days=week * 7 + _MONDAY_OFFSET)
+
+
+def load_entries(
+    db: Session,
+    start: date,
+    end: date,
+    benutzer_ids: list[int] | None = None,
+    projekt_ids: list[int] | None = None,
+) -> Entries:
+    """Time entries from start to end (inclusive) as columns, read in one cursor pass."""
+    z = models.Zeiteintrag
+    stmt = select(
+        z.benutzer_id,
+        z.projekt_id,
+        z.aufgabe_id,
+        epoch_day(z.datum),
+        cast(func.round(func.coalesce(z.stunden, 0) * 60), Integer),
+        cast(z.ist_abrechenbar, Integer),
+    ).where(z.datum >= start, z.datum <= end)
+    if benutzer_ids:
+        stmt = stmt.where(z.benutzer_id.in_(benutzer_ids))
+    if projekt_ids:
+        stmt = stmt.where(z.projekt_id.in_(projekt_ids))
+
+    chunks = []
+    # On the session's connection, not db.execute(): plain rows without the ORM result layer
+    result = db.connection().execute(stmt.execution_options(yield_per=CHUNK_ROWS))
+    for partition in result.partitions():
+        flat = itertools.chain.from_iterable(partition)
+        chunks.append(np.fromiter(flat, dtype=np.int32, count=len(partition) * _COLUMNS).reshape(-1, _COLUMNS))
+    data = np.concatenate(chunks) if chunks else np.empty((0, _COLUMNS), dtype=np.int32)
+
+    return Entries(
+        benutzer_id=np.ascontiguousarray(data[:, 0]),
+        projekt_id=np.ascontiguousarray(data[:, 1]),
+        aufgabe_id=np.ascontiguousarray(data[:, 2]),
+        day=np.ascontiguousarray(data[:, 3]),
+        minutes=data[:, 4].astype(np.int16),
+        billable=data[:, 5].astype(bool),
+    )
+
+
+def group_by(keys: list["np.ndarray"], values: "np.ndarray") -> tuple[list["np.ndarray"], "np.ndarray"]:
+    """
+    Sums values per distinct combination of the key columns. Returns the key columns of
+    the groups (sorted) and the sum per group.
+    """
+    labels, codes = zip(*(np.unique(key, return_inverse=True) for key in keys))
+    shape = tuple(len(label) for label in labels)
+    flat = np.ravel_multi_index(codes, shape) if len(keys) > 1 else codes[0]
+    groups, inverse = np.unique(flat, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(groups))
+    group_codes = np.unravel_index(groups, shape)
+    return [label[code] for label, code in zip(labels, group_codes)], sums
+
+
+def pivot(
+    row_keys: "np.ndarray",
+    column_keys: "np.ndarray",
+    values: "np.ndarray",
+    columns: "np.ndarray | None" = None,
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Dense matrix of summed values, one row per distinct row key and one column per
+    column label. columns fixes the column labels (e.g. every week of the period, also
+    empty ones); keys outside of it must not occur.
+    """
+    rows, row_codes = np.unique(row_keys, return_inverse=True)
+    if columns is None:
+        columns, column_codes = np.unique(column_keys, return_inverse=True)
+    else:
+        column_codes = np.searchsorted(columns, column_keys)
+    flat = row_codes.astype(np.int64) * len(columns) + column_codes
+    matrix = np.bincount(flat, weights=values, minlength=len(rows) * len(columns))
+    return rows, columns, matrix.reshape(len(rows), len(columns))
+
+
+def percentiles(matrix: "np.ndarray", q: list[float]) -> "np.ndarray":
+    """Percentiles q of every row of the matrix (e.g. of a user's weekly hours), one row per q."""
+    if matrix.size == 0:
+        return np.zeros((len(q), matrix.shape[0]))
+    return np.percentile(matrix, q, axis=1)
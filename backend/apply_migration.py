@@ -1,46 +1,118 @@
 #!/usr/bin/env python
-# apply_migration.py - Script to apply the database migration for time entry columns
+# apply_migration.py - Script to apply the SQL migrations in the migrations directory
+#
+# <name>.sql is written for Postgres. A SQLite variant of the same migration lives in
+# <name>.sqlite.sql. SQLite databases get their full schema from create_all (see
+# launcher.prepare), so a migration needs a SQLite variant only if it changes tables
+# that may already exist in a SQLite database; without one it is skipped there.
+#
+# Applied migrations are recorded in the schema_migrations table (by <name>.sql, for
+# both dialects), so every start only runs the pending ones. Each file runs in its own
+# transaction together with its record; files should still be idempotent, databases
+# from before the table existed run all of them once.
+#
+# Migrations in migrations/manual/ are never run automatically (e.g. table rewrites that
+# need a maintenance window). Apply one explicitly with
+#     python apply_migration.py manual/<name>.sql
 
+import logging
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 # Import database config from the main app
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from database import SQLALCHEMY_DATABASE_URL
-
-def apply_migration():
-    """Apply the SQL migration to add startzeit and endzeit columns"""
-    print("Starting migration to add time columns to zeiteintraege table...")
-    
-    # Create database connection
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+if __name__ == "__main__":
+    import logging_config
+    logging_config.setup_logging()
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+class MigrationError(RuntimeError):
+    """A migration failed; the transaction of the failing file was rolled back."""
+
+
+def get_migration_files(dialect: str = "postgresql"):
+    """Return (name, path) of the migrations for a dialect in a stable (alphabetical) order"""
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return []
+    names = set(os.listdir(MIGRATIONS_DIR))
+    files = []
+    for name in sorted(names):
+        if not name.endswith(".sql") or name.endswith(".sqlite.sql"):
+            continue
+        path = os.path.join(MIGRATIONS_DIR, name)
+        if dialect == "sqlite":
+            variant = name[:-len(".sql")] + ".sqlite.sql"
+            if variant not in names:
+                logger.debug("Migration %s has no SQLite variant, skipped", name)
+                continue
+            path = os.path.join(MIGRATIONS_DIR, variant)
+        files.append((name, path))
+    return files
+
+def _ensure_table(db) -> set[str]:
+    db.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " name VARCHAR(255) PRIMARY KEY,"
+        " angewendet_am TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    db.commit()
+    return set(db.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+def _run(db, name: str, path: str) -> None:
+    with open(path, 'r') as file:
+        migration_sql = file.read()
+
+    logger.info("Executing SQL migration %s...", os.path.relpath(path, MIGRATIONS_DIR))
+    if engine.dialect.name == "sqlite":
+        # sqlite3 runs only one statement per execute(); executescript commits itself,
+        # so the record follows in a transaction of its own
+        db.connection().connection.dbapi_connection.executescript(migration_sql)
+    else:
+        db.execute(text(migration_sql))
+    # A file given explicitly may have been recorded before
+    db.execute(text("DELETE FROM schema_migrations WHERE name = :name"), {"name": name})
+    db.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+    db.commit()
+
+def apply_migration(only: str | None = None):
+    """
+    Apply the pending SQL migrations, or only the given file (relative to migrations/,
+    e.g. a manual one), which runs even if it was applied before. Raises MigrationError;
+    migrations before the failing one stay applied.
+    """
+    logger.info("Starting to apply SQL migrations...")
+
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
-    
+
+    name = None
     try:
-        # Read the migration SQL file
-        migration_file_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            "migrations", 
-            "add_time_columns.sql"
-        )
-        
-        with open(migration_file_path, 'r') as file:
-            migration_sql = file.read()
-        
-        # Execute the migration
-        print("Executing SQL migration...")
-        db.execute(text(migration_sql))
-        db.commit()
-        print("Migration applied successfully!")
+        applied = _ensure_table(db)
+        if only is not None:
+            pending = [(only, os.path.join(MIGRATIONS_DIR, only))]
+        else:
+            pending = [(name, path) for name, path in get_migration_files(engine.dialect.name) if name not in applied]
+        for name, path in pending:
+            _run(db, name, path)
+        if pending:
+            logger.info("%d migration(s) applied successfully!", len(pending))
+        else:
+            logger.info("Database schema is up to date, no pending migrations")
     except Exception as e:
         db.rollback()
-        print(f"Error applying migration: {str(e)}")
-        sys.exit(1)
+        raise MigrationError(f"Migration {name or ''} failed: {e}") from e
     finally:
         db.close()
 
 if __name__ == "__main__":
-    apply_migration()
+    try:
+        apply_migration(sys.argv[1] if len(sys.argv) > 1 else None)
+    except MigrationError:
+        logger.exception("Error applying migration")
+        sys.exit(1)
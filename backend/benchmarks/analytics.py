@@ -0,0 +1,99 @@
+"""
+Compares the columnar analytics path with the ORM path for a users x weeks pivot.
+
+    orm       crud.get_zeiteintraege (ORM objects with user, project and task, as used by
+              GET /time-entries/report) and a dict aggregation in Python
+    columnar  analytics.load_entries (NumPy columns, one cursor pass) and analytics.pivot
+
+Both build the same matrix (minutes per user and week); the benchmark checks that they
+agree and prints wall time and peak Python memory (tracemalloc, NumPy buffers included).
+
+Run against a database filled by generate_dataset.
+
+Usage (from backend/):
+    python -m benchmarks.analytics                          # last generated year
+    python -m benchmarks.analytics --start 2025-01-01 --end 2025-03-31 --repeat 3
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date
+
+import analytics
+import crud
+from benchmarks.generate_dataset import DEFAULT_END
+from database import SessionLocal
+
+
+def orm_pivot(db, start: date, end: date) -> dict[tuple[int, int], int]:
+    entries = crud.get_zeiteintraege(db, limit=None, start_datum=start, end_datum=end, with_benutzer=True)
+    cells = defaultdict(int)
+    for entry in entries:
+        minutes = round(float(entry.stunden or 0) * 60)
+        cells[entry.benutzer_id, analytics.week_number(entry.datum)] += minutes
+    return cells
+
+
+def columnar_pivot(db, start: date, end: date) -> dict[tuple[int, int], int]:
+    entries = analytics.load_entries(db, start, end)
+    weeks = analytics.np.arange(analytics.week_number(start), analytics.week_number(end) + 1)
+    users, weeks, matrix = analytics.pivot(entries.benutzer_id, entries.week, entries.minutes, weeks)
+    rows, columns = matrix.nonzero()
+    return {
+        (int(users[row]), int(weeks[column])): int(round(matrix[row, column]))
+        for row, column in zip(rows, columns)
+    }
+
+
+def _run(build, start: date, end: date, trace: bool):
+    db = SessionLocal()
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    began = time.perf_counter()
+    try:
+        cells = build(db, start, end)
+        duration = time.perf_counter() - began
+        peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    finally:
+        if trace:
+            tracemalloc.stop()
+        db.close()
+    return duration, peak, cells
+
+
+def measure(name: str, build, start: date, end: date, repeat: int):
+    # Timed without tracemalloc (it slows down every allocation), then one traced run for memory
+    duration = min(_run(build, start, end, trace=False)[0] for _ in range(repeat))
+    _, peak, cells = _run(build, start, end, trace=True)
+    print(f"{name:<10}{duration:>10.2f} s{peak / 2**20:>12.1f} MiB{len(cells):>12,} cells")
+    return duration, peak, cells
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, default=DEFAULT_END.replace(month=1, day=1))
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per path, the fastest counts (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not analytics.ENABLED:
+        sys.exit("NumPy is not installed.")
+
+    print(f"Users x weeks pivot from {args.start} to {args.end}\n")
+    print(f"{'path':<10}{'time':>12}{'peak memory':>16}{'':>18}")
+    orm = measure("orm", orm_pivot, args.start, args.end, args.repeat)
+    columnar = measure("columnar", columnar_pivot, args.start, args.end, args.repeat)
+    if {k: v for k, v in orm[2].items() if v} != columnar[2]:
+        print("\nResults differ between the two paths", file=sys.stderr)
+        return 1
+    print(f"\ncolumnar: {orm[0] / max(columnar[0], 1e-9):.1f}x faster, "
+          f"{orm[1] / max(columnar[1], 1):.1f}x less peak memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Compares the psycopg2 and psycopg 3 drivers on the hot queries of the API.
+
+Both drivers run the same workload against the configured database, each through a
+single-connection engine of its own:
+    - lookup        benutzer by username (every authenticated request, get_current_user)
+    - time_entries  GET /time-entries/ of one user for a month (fast JSON rows)
+    - absences      GET /absences/ of one user (fast JSON rows)
+    - write         insert and delete a time entry (two statements, one commit)
+psycopg 3 runs with server-side prepared statements (prepare_threshold, see
+DB_PREPARE_THRESHOLD); --prepare-threshold 0 measures it without.
+
+Run against a database filled by generate_dataset. Switch the application itself with
+DB_DRIVER=psycopg once the numbers look good.
+
+Usage (from backend/):
+    python -m benchmarks.db_drivers
+    python -m benchmarks.db_drivers --iterations 5000 --prepare-threshold 0
+"""
+import argparse
+import sys
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, delete, insert, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import database
+import models
+from benchmarks.generate_dataset import DEFAULT_END
+
+DRIVERS = ("psycopg2", "psycopg")
+
+
+def _engine(driver: str, prepare_threshold: int):
+    url = make_url(database.DATABASE_URL).set(drivername=f"postgresql+{driver}")
+    options = {"pool_size": 1, "max_overflow": 0}
+    if driver == "psycopg":
+        options["connect_args"] = {"prepare_threshold": prepare_threshold or None}
+    return create_engine(url, **options)
+
+
+def _fixture(db) -> dict:
+    row = db.execute(text(
+        "SELECT b.id, b.username, z.aufgabe_id, z.projekt_id FROM benutzer b "
+        "JOIN zeiteintraege z ON z.benutzer_id = b.id ORDER BY b.id LIMIT 1"
+    )).first()
+    if row is None:
+        sys.exit("No time entries found, fill the database with benchmarks.generate_dataset first.")
+    return dict(benutzer_id=row[0], username=row[1], aufgabe_id=row[2], projekt_id=row[3])
+
+
+def workloads(f: dict) -> dict:
+    start, end = DEFAULT_END.replace(day=1), DEFAULT_END
+    entry = dict(
+        benutzer_id=f["benutzer_id"], aufgabe_id=f["aufgabe_id"], projekt_id=f["projekt_id"],
+        datum=date(1999, 1, 1), startzeit=dtime(9), endzeit=dtime(10), stunden=Decimal("1.00"),
+        beschreibung="db_drivers benchmark", ist_abrechenbar=False,
+    )
+
+    def write(db):
+        zeiteintrag_id = db.execute(insert(models.Zeiteintrag).values(**entry).returning(models.Zeiteintrag.id)).scalar()
+        db.execute(delete(models.Zeiteintrag).where(models.Zeiteintrag.id == zeiteintrag_id))
+        db.commit()
+
+    return {
+        "lookup": lambda db: crud.get_benutzer_by_username(db, f["username"]),
+        "time_entries": lambda db: crud.get_zeiteintraege_rows(
+            db, benutzer_id=f["benutzer_id"], start_datum=start, end_datum=end,
+        ),
+        "absences": lambda db: crud.get_abwesenheiten_rows(db, benutzer_id=f["benutzer_id"]),
+        "write": write,
+    }
+
+
+def measure(engine, iterations: int, warmup: int) -> dict[str, float]:
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    results = {}
+    with Session() as db:
+        for name, call in workloads(_fixture(db)).items():
+            for _ in range(warmup):
+                call(db)
+                db.rollback()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call(db)
+                db.rollback()
+            results[name] = iterations / (time.perf_counter() - start)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per workload and driver (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=100, help="untimed calls first, also past the prepare threshold")
+    parser.add_argument("--prepare-threshold", type=int, default=database.PREPARE_THRESHOLD,
+                        help="psycopg 3 prepare_threshold, 0 = no prepared statements (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if database.engine.dialect.name != "postgresql":
+        sys.exit("The driver comparison needs PostgreSQL.")
+    if database.psycopg is None:
+        sys.exit("psycopg 3 is not installed (pip install 'psycopg[binary]').")
+
+    results = {}
+    for driver in DRIVERS:
+        engine = _engine(driver, args.prepare_threshold)
+        try:
+            results[driver] = measure(engine, args.iterations, args.warmup)
+        finally:
+            engine.dispose()
+
+    print(f"{'workload':<14}{'psycopg2':>12}{'psycopg':>12}{'change':>10}   (ops/s)")
+    for name, before in results["psycopg2"].items():
+        after = results["psycopg"][name]
+        print(f"{name:<14}{before:>12,.0f}{after:>12,.0f}{(after / before - 1) * 100:>+9.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
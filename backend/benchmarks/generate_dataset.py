@@ -0,0 +1,517 @@
+"""
+Generates a large synthetic dataset for benchmarks and query plan tests.
+
+Users, projects, tasks, absences and time entries come from seeded generators and
+are streamed into Postgres with COPY, so the same arguments always produce the same
+rows. Nothing is held in memory except the per-user absence days.
+
+Usage (from backend/):
+    python -m benchmarks.generate_dataset --scale small            # 200 users, ~200k entries
+    python -m benchmarks.generate_dataset --scale large --truncate # 5,000 users, 50M entries
+    python -m benchmarks.generate_dataset --users 1000 --entries 5000000 --seed 7
+
+Without --truncate the existing rows are kept and generated ids start after the
+current maximum. --truncate empties users, projects, tasks, time entries and
+absences first and re-seeds the initial data (roles, absence types, admin user).
+Generated users share the password "benchmark".
+"""
+import argparse
+import bisect
+import random
+import sys
+import time
+from datetime import date, datetime, time as time_of_day, timedelta, timezone
+from decimal import Decimal
+from itertools import islice
+
+from sqlalchemy import text
+
+import crud
+import models  # noqa: F401 - registers the tables
+import refdata_cache
+from database import Base, SessionLocal, engine
+
+SCALES = {
+    "small": dict(users=200, projects=20, entries=200_000, years=2),
+    "medium": dict(users=1_000, projects=100, entries=5_000_000, years=3),
+    "large": dict(users=5_000, projects=500, entries=50_000_000, years=5),
+}
+# Fixed default end date, so the data does not depend on the day it is generated
+DEFAULT_END = date(2025, 12, 31)
+PASSWORD = "benchmark"
+COPY_READ_SIZE = 1 << 20
+
+VORNAMEN = [
+    "Anna", "Ben", "Clara", "David", "Elena", "Felix", "Greta", "Hannes", "Ida", "Jonas",
+    "Katharina", "Lukas", "Marie", "Niklas", "Olivia", "Paul", "Quirin", "Sophie", "Tim", "Ursula",
+    "Valentin", "Wiebke", "Xaver", "Yvonne", "Zoe", "Moritz", "Lea", "Jan", "Emma", "Leon",
+]
+NACHNAMEN = [
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann",
+    "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Zimmermann",
+    "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Schmitt", "Werner", "Krause", "Meier", "Lehmann",
+]
+PROJEKT_WOERTER = [
+    "Portal", "Migration", "Relaunch", "Wartung", "Analyse", "Schnittstelle", "Rollout", "Audit",
+    "Plattform", "Kampagne", "Shop", "Reporting", "Infrastruktur", "App", "Schulung", "Support",
+]
+AUFGABEN = [
+    "Konzeption", "Frontend-Entwicklung", "Backend-Entwicklung", "Testen", "Dokumentation",
+    "Projektmanagement", "Abstimmung Kunde", "Deployment", "Code-Review", "Fehlerbehebung",
+    "Datenmigration", "Design", "Schulung", "Betrieb",
+]
+BESCHREIBUNGEN = [
+    "Implementierung", "Besprechung mit dem Team", "Fehleranalyse", "Review und Nacharbeiten",
+    "Abstimmung mit dem Kunden", "Tests geschrieben", "Dokumentation aktualisiert", "Refactoring",
+    "Deployment vorbereitet", "Recherche", "Workshop", "Support-Anfragen bearbeitet",
+]
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value)
+
+
+def _copy_line(row) -> str:
+    # Rows may also come preformatted as a complete line
+    return row if isinstance(row, str) else "\t".join(map(_copy_value, row)) + "\n"
+
+
+class CopyStream:
+    """File-like object that feeds rows from a generator to COPY ... FROM STDIN (text format)."""
+
+    def __init__(self, rows):
+        self._lines = map(_copy_line, rows)
+        self._buffer = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            lines = list(islice(self._lines, 2000))
+            if not lines:
+                break
+            self.rows += len(lines)
+            self._buffer += "".join(lines)
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _column_oids(connection, table: str, columns: list[str]) -> list[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attname, atttypid FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0",
+            (table,),
+        )
+        oids = dict(cursor.fetchall())
+    return [oids[column] for column in columns]
+
+
+def _copy_binary(connection, sql: str, oids: list[int], rows) -> int:
+    # psycopg 3: binary COPY, the values are sent in their wire format without text parsing
+    count = 0
+    with connection.cursor() as cursor, cursor.copy(f"{sql} (FORMAT BINARY)") as copy:
+        copy.set_types(oids)
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+def copy_rows(connection, table: str, columns: list[str], rows) -> int:
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    start = time.perf_counter()
+    if engine.dialect.driver != "psycopg":
+        stream = CopyStream(rows)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, stream, size=COPY_READ_SIZE)
+        count = stream.rows
+    else:
+        count = _copy_binary(connection, sql, _column_oids(connection, table, columns), rows)
+    duration = time.perf_counter() - start
+    print(f"  {table}: {count:,} rows in {duration:.1f} s ({count / max(duration, 1e-9):,.0f} rows/s)")
+    return count
+
+
+def _timestamp(rng: random.Random, day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(8 * 3600, 18 * 3600))
+
+
+def _workdays(start: date, end: date):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+class Dataset:
+    def __init__(self, seed: int, users: int, projects: int, tasks_per_project: int, entries: int, years: int, end: date):
+        self.seed = seed
+        self.users = users
+        self.projects = projects
+        self.tasks_per_project = tasks_per_project
+        self.entries = entries
+        self.end = end
+        self.start = end - timedelta(days=round(365.25 * years))
+
+        # Filled in by the generators, needed by the later tables
+        self.user_ids: list[int] = []
+        self.user_start: dict[int, date] = {}
+        self.user_projects: dict[int, list[int]] = {}
+        self.manager_ids: list[int] = []
+        self.project_tasks: dict[int, list[int]] = {}
+        self.absent_days: dict[int, set[date]] = {}
+
+    def rng(self, name: str) -> random.Random:
+        # One independent stream per table, so changing one table does not shift the others
+        return random.Random(f"{self.seed}:{name}")
+
+    # ---------- Users ----------
+    def benutzer_rows(self, first_id: int, rolle_ids: dict[str, int], passwort_hash: str):
+        rng = self.rng("benutzer")
+        for n in range(self.users):
+            user_id = first_id + n
+            vorname, nachname = rng.choice(VORNAMEN), rng.choice(NACHNAMEN)
+            r = rng.random()
+            rolle = "Administrator" if r < 0.01 else "Manager" if r < 0.06 else "Mitarbeiter"
+            # Most staff were there from the beginning, the rest joined over time
+            joined = self.start if rng.random() < 0.6 else self.start + timedelta(days=rng.randrange((self.end - self.start).days))
+            archived = rng.random() < 0.02
+            self.user_ids.append(user_id)
+            self.user_start[user_id] = joined
+            if rolle == "Manager":
+                self.manager_ids.append(user_id)
+            created = _timestamp(rng, joined)
+            yield (
+                user_id, f"bench{user_id:07d}", f"{vorname.lower()}.{nachname.lower()}.{user_id}@example.com",
+                passwort_hash, vorname, nachname, rolle_ids[rolle], not archived,
+                created, created, created + timedelta(days=30) if archived else None,
+            )
+
+    # ---------- Projects and tasks ----------
+    def projekt_rows(self, first_id: int):
+        rng = self.rng("projekte")
+        for n in range(self.projects):
+            projekt_id = first_id + n
+            start = self.start + timedelta(days=rng.randrange((self.end - self.start).days))
+            r = rng.random()
+            status = "aktiv" if r < 0.6 else "abgeschlossen" if r < 0.9 else "archiviert"
+            end = start + timedelta(days=rng.randrange(60, 720)) if status != "aktiv" else None
+            created = _timestamp(rng, start)
+            self.project_tasks[projekt_id] = []
+            yield (
+                projekt_id, f"{rng.choice(PROJEKT_WOERTER)} {projekt_id:05d}", f"Generiertes Projekt {projekt_id}",
+                status, start, end, created, created, None,
+            )
+
+    def aufgabe_rows(self, first_id: int):
+        rng = self.rng("aufgaben")
+        aufgabe_id = first_id
+        for projekt_id in sorted(self.project_tasks):
+            count = max(1, round(rng.gauss(self.tasks_per_project, self.tasks_per_project / 3)))
+            for name in rng.sample(AUFGABEN, min(count, len(AUFGABEN))):
+                self.project_tasks[projekt_id].append(aufgabe_id)
+                created = _timestamp(rng, self.start)
+                status = rng.choices(["offen", "in Arbeit", "erledigt"], weights=[3, 4, 3])[0]
+                yield (
+                    aufgabe_id, projekt_id, name, None, round(rng.uniform(8, 999), 2), status,
+                    self.end - timedelta(days=rng.randrange(0, 365)), created, created,
+                )
+                aufgabe_id += 1
+
+    def assign_projects(self) -> None:
+        """Every user works on 1-4 projects; popularity follows a Zipf-like distribution."""
+        rng = self.rng("zuordnung")
+        project_ids = sorted(self.project_tasks)
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(len(project_ids))]
+        for user_id in self.user_ids:
+            count = min(len(project_ids), rng.choice([1, 1, 2, 2, 2, 3, 3, 4]))
+            chosen = set()
+            while len(chosen) < count:
+                chosen.add(rng.choices(project_ids, weights=weights)[0])
+            self.user_projects[user_id] = sorted(chosen)
+
+    # ---------- Absences ----------
+    def abwesenheit_rows(self, first_id: int, typ_ids: dict[str, int], today: date):
+        """
+        Per user and year: ~28 vacation days in 2-4 blocks (summer and Christmas
+        favoured), sick leave in short blocks mostly in winter, occasionally training,
+        special leave and single home office days.
+        """
+        rng = self.rng("abwesenheiten")
+        abwesenheit_id = first_id
+        plan = [
+            # type, blocks per year (min, max), block length in workdays (min, max), preferred months
+            ("Urlaub", (2, 4), (3, 10), (7, 8, 12)),
+            ("Krankheit", (0, 4), (1, 5), (1, 2, 3, 11, 12)),
+            ("Fortbildung", (0, 2), (1, 3), ()),
+            ("Sonderurlaub", (0, 1), (1, 2), ()),
+            ("Homeoffice", (5, 20), (1, 1), ()),
+        ]
+        for user_id in self.user_ids:
+            absent = self.absent_days.setdefault(user_id, set())
+            for year in range(self.user_start[user_id].year, self.end.year + 1):
+                for typ, (min_blocks, max_blocks), (min_len, max_len), months in plan:
+                    if typ not in typ_ids:
+                        continue
+                    for _ in range(rng.randint(min_blocks, max_blocks)):
+                        month = rng.choice(months) if months and rng.random() < 0.6 else rng.randint(1, 12)
+                        start = date(year, month, rng.randint(1, 28))
+                        if start < self.user_start[user_id] or start > self.end:
+                            continue
+                        days = list(islice(_workdays(start, self.end), rng.randint(min_len, max_len)))
+                        if not days or any(day in absent for day in days):
+                            continue
+                        if typ != "Homeoffice":  # Home office days still have time entries
+                            absent.update(days)
+                        if days[0] > today:
+                            status, genehmiger = "beantragt", None
+                        else:
+                            status = rng.choices(["genehmigt", "abgelehnt", "beantragt"], weights=[92, 5, 3])[0]
+                            genehmiger = rng.choice(self.manager_ids) if status != "beantragt" and self.manager_ids else None
+                        created = _timestamp(rng, days[0] - timedelta(days=rng.randint(1, 60)))
+                        yield (
+                            abwesenheit_id, user_id, typ_ids[typ], days[0], days[-1],
+                            None if rng.random() < 0.5 else f"{typ} {year}", status, genehmiger,
+                            None, created, created,
+                        )
+                        abwesenheit_id += 1
+
+    # ---------- Time entries ----------
+    def zeiteintrag_rows(self, first_id: int, binary: bool = False):
+        """
+        Day by day across all users (like the real insert order, which matters for the
+        physical correlation Postgres sees), entries are packed into a working day that
+        starts between 7:00 and 9:45. The number of entries per day is chosen so the
+        total matches the requested count. Text COPY lines, or value tuples for binary
+        COPY (psycopg 3); both draw the same random numbers, so they hold the same rows.
+        """
+        rng = self.rng("zeiteintraege")
+        all_days = list(_workdays(self.start, self.end))
+        user_days = sum(len(all_days) - bisect.bisect_left(all_days, self.user_start[u]) for u in self.user_ids)
+        user_days -= sum(len(days) for days in self.absent_days.values())
+        per_day = self.entries / max(user_days, 1)
+        zeiteintrag_id = first_id
+        remaining = self.entries
+
+        # The hot loop writes COPY lines (or tuples) from precomputed values; formatting
+        # each value on its own costs ~3x more
+        random_ = rng.random
+        if binary:
+            times = [time_of_day(m // 60, m % 60) for m in range(24 * 60)]
+            hours = {length: Decimal(f"{length / 60:.2f}") for length in range(15, 24 * 60, 15)}
+            minutes = [timedelta(minutes=m) for m in range(24 * 60)]
+        else:
+            times = [f"{m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)]
+            hours = {length: f"{length / 60:.2f}" for length in range(15, 24 * 60, 15)}
+        # ~70 % of the entries have a description
+        beschreibungen = BESCHREIBUNGEN + [None] * 5
+        if not binary:
+            beschreibungen = [_copy_value(b) for b in beschreibungen]
+        length_jitter = (-15, 0, 0, 15)
+        gaps = (0, 0, 15, 30)
+        fraction = per_day - int(per_day)
+
+        for day in all_days:
+            if binary:
+                midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            else:
+                day_s = day.isoformat()
+            for user_id in self.user_ids:
+                if remaining <= 0:
+                    return
+                if day < self.user_start[user_id] or day in self.absent_days.get(user_id, ()):
+                    continue
+                # Whole part of the mean, plus one more with the probability of the fraction
+                count = int(per_day) + (1 if random_() < fraction else 0)
+                if count == 0:
+                    continue
+                count = min(count, remaining, 32)
+                minute = 7 * 60 + 15 * int(random_() * 12)
+                slot = max(15, min(240, (9 * 60) // count // 15 * 15))
+                projekte = self.user_projects[user_id]
+                for _ in range(count):
+                    length = max(15, slot + length_jitter[int(random_() * 4)])
+                    if minute + length > 23 * 60 + 45:
+                        break
+                    projekt_id = projekte[int(random_() * len(projekte))]
+                    aufgaben = self.project_tasks[projekt_id]
+                    start = minute
+                    minute += length
+                    if binary:
+                        created = midnight + minutes[minute + 5]
+                        yield (
+                            zeiteintrag_id, user_id, aufgaben[int(random_() * len(aufgaben))], projekt_id,
+                            day, times[start], times[minute], hours[length],
+                            beschreibungen[int(random_() * len(beschreibungen))], random_() < 0.8,
+                            created, created,
+                        )
+                    else:
+                        created = f"{day_s} {times[minute + 5]}+00"
+                        yield (
+                            f"{zeiteintrag_id}\t{user_id}\t{aufgaben[int(random_() * len(aufgaben))]}\t{projekt_id}\t"
+                            f"{day_s}\t{times[start]}\t{times[minute]}\t{hours[length]}\t"
+                            f"{beschreibungen[int(random_() * len(beschreibungen))]}\t{'t' if random_() < 0.8 else 'f'}\t"
+                            f"{created}\t{created}\n"
+                        )
+                    zeiteintrag_id += 1
+                    remaining -= 1
+                    minute += gaps[int(random_() * 4)]
+
+
+def _next_id(connection, table: str) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+        return cursor.fetchone()[0]
+
+
+def _reset_sequence(connection, table: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        )
+
+
+def _drop_secondary_indexes(connection, table: str) -> list[str]:
+    """Drops indexes that do not back a constraint and returns their definitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.indexname, i.indexdef FROM pg_indexes i
+            WHERE i.tablename = %s AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname
+            )
+            """,
+            (table,),
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+    return [definition for _, definition in indexes]
+
+
+def _create_indexes(connection, definitions: list[str]) -> None:
+    with connection.cursor() as cursor:
+        for definition in definitions:
+            start = time.perf_counter()
+            cursor.execute(definition)
+            print(f"  {definition} ({time.perf_counter() - start:.1f} s)")
+
+
+def generate(args) -> None:
+    if engine.dialect.name != "postgresql":
+        sys.exit("The dataset generator needs PostgreSQL (COPY).")
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.truncate:
+            print("Truncating existing data...")
+            db.execute(text(
+                "TRUNCATE zeiteintraege, abwesenheiten, aufgaben, projekte, idempotency_keys, benutzer RESTART IDENTITY CASCADE"
+            ))
+            db.commit()
+        crud.create_initial_data(db)
+        rolle_ids = {r.name: r.id for r in db.query(models.Rolle)}
+        typ_ids = {t.name: t.id for t in db.query(models.AbwesenheitTyp)}
+    finally:
+        db.close()
+
+    dataset = Dataset(args.seed, args.users, args.projects, args.tasks_per_project, args.entries, args.years, args.end)
+    passwort_hash = crud.get_password_hash(PASSWORD)
+    total_start = time.perf_counter()
+
+    raw = engine.raw_connection()
+    try:
+        connection = raw.dbapi_connection
+        with connection.cursor() as cursor:
+            cursor.execute("SET synchronous_commit = off")
+            cursor.execute("SET maintenance_work_mem = '512MB'")
+
+        print(f"Generating data from {dataset.start} to {dataset.end} (seed {args.seed})")
+        copy_rows(connection, "benutzer", [
+            "id", "username", "email", "passwort_hash", "vorname", "nachname", "rolle_id", "ist_aktiv",
+            "erstellt_am", "aktualisiert_am", "geloescht_am",
+        ], dataset.benutzer_rows(_next_id(connection, "benutzer"), rolle_ids, passwort_hash))
+        copy_rows(connection, "projekte", [
+            "id", "name", "beschreibung", "status", "start_datum", "end_datum", "erstellt_am", "aktualisiert_am", "geloescht_am",
+        ], dataset.projekt_rows(_next_id(connection, "projekte")))
+        copy_rows(connection, "aufgaben", [
+            "id", "projekt_id", "name", "beschreibung", "geplante_stunden", "status", "faelligkeits_datum",
+            "erstellt_am", "aktualisiert_am",
+        ], dataset.aufgabe_rows(_next_id(connection, "aufgaben")))
+        connection.commit()
+        dataset.assign_projects()
+
+        deferred = []
+        if not args.keep_indexes:
+            deferred = _drop_secondary_indexes(connection, "abwesenheiten") + _drop_secondary_indexes(connection, "zeiteintraege")
+            connection.commit()
+
+        copy_rows(connection, "abwesenheiten", [
+            "id", "benutzer_id", "abwesenheit_typ_id", "start_datum", "end_datum", "grund", "status",
+            "genehmigt_von_benutzer_id", "kommentar_genehmiger", "erstellt_am", "aktualisiert_am",
+        ], dataset.abwesenheit_rows(_next_id(connection, "abwesenheiten"), typ_ids, args.end - timedelta(days=30)))
+        connection.commit()
+        copy_rows(connection, "zeiteintraege", [
+            "id", "benutzer_id", "aufgabe_id", "projekt_id", "datum", "startzeit", "endzeit", "stunden",
+            "beschreibung", "ist_abrechenbar", "erstellt_am", "aktualisiert_am",
+        ], dataset.zeiteintrag_rows(_next_id(connection, "zeiteintraege"), binary=engine.dialect.driver == "psycopg"))
+        connection.commit()
+
+        if deferred:
+            print("Recreating indexes...")
+            _create_indexes(connection, deferred)
+        for table in ("benutzer", "projekte", "aufgaben", "abwesenheiten", "zeiteintraege"):
+            _reset_sequence(connection, table)
+        connection.commit()
+
+        print("Analyzing...")
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM (ANALYZE) benutzer, projekte, aufgaben, abwesenheiten, zeiteintraege")
+        connection.autocommit = False
+    finally:
+        raw.close()
+
+    # Running workers drop their cached projects/tasks
+    db = SessionLocal()
+    try:
+        refdata_cache.notify_change(db, "projekte", "aufgaben")
+        db.commit()
+    finally:
+        db.close()
+    print(f"Done in {time.perf_counter() - total_start:.1f} s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="preset sizes (default: small)")
+    parser.add_argument("--users", type=int, help="number of users")
+    parser.add_argument("--projects", type=int, help="number of projects")
+    parser.add_argument("--tasks-per-project", type=int, default=6, help="average tasks per project")
+    parser.add_argument("--entries", type=int, help="number of time entries")
+    parser.add_argument("--years", type=int, help="years of history")
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help=f"last day (default {DEFAULT_END})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="remove existing data first")
+    parser.add_argument("--keep-indexes", action="store_true", help="do not drop secondary indexes during the load")
+    args = parser.parse_args(argv)
+
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    if args.entries and not args.users:
+        parser.error("time entries need at least one user")
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
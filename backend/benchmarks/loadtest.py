@@ -0,0 +1,384 @@
+"""
+HTTP load test for the API with realistic scenarios.
+
+Scenarios (run one after the other, each with --concurrency virtual users):
+    login          login storm: every virtual user logs in again and again (bcrypt bound)
+    dashboard      dashboard polling: /users/me, latest entries and absences, page bootstrap
+    timesheet      timesheet saves: POST time entries (with Idempotency-Key) and reload the list
+    approval       approval sessions: users file absences, a manager lists and approves them
+    month_end      month-end reports: time entry report and project burndown for the last month
+
+Runs against a running server (--url, e.g. started with launcher.py against a local
+Postgres filled by generate_dataset) or in-process against main.app (--in-process).
+Users are the generated "bench..." accounts (password "benchmark"); approvals and
+reports run as the admin account. The scenarios write data, use a benchmark database.
+
+Results (throughput and p50/p95/p99 per scenario and endpoint) are printed and written
+as JSON with --output. With --baseline the run is compared to an earlier result file;
+endpoints whose p95 grew or throughput dropped by more than --tolerance are reported
+and the exit code is 1.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --url http://localhost:8000 --concurrency 20 --duration 30 --output results.json
+    python -m benchmarks.loadtest --scenario dashboard --scenario timesheet --baseline baseline.json
+
+Before/after comparison of a change at high concurrency (e.g. the async read path):
+    git checkout <old> && python -m benchmarks.loadtest --scenario dashboard --concurrency 200 --output before.json
+    git checkout <new> && python -m benchmarks.loadtest --scenario dashboard --concurrency 200 --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.generate_dataset import PASSWORD as BENCH_PASSWORD
+
+SCENARIOS = ("login", "dashboard", "timesheet", "approval", "month_end")
+API = "/api/v1"
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, duration: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "throughput_rps": round(len(ordered) / duration, 2) if duration else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints: dict[str, EndpointStats] = defaultdict(EndpointStats)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        """Sends a request and records its latency under the endpoint label (route template)."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.endpoints[label].errors += 1
+            return None
+        self.endpoints[label].latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.endpoints[label].errors += 1
+        return response
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    recorder: Recorder
+    users: list[dict]
+    admin_token: str
+    think_time: float
+    rng: random.Random
+
+    async def login(self, username: str, password: str = BENCH_PASSWORD) -> str | None:
+        response = await self.recorder.request(
+            self.client, "POST /auth/token", "POST", "/auth/token",
+            data={"username": username, "password": password},
+        )
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()["access_token"]
+
+    async def think(self) -> None:
+        if self.think_time:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+# ---------- Scenarios ----------
+# Each scenario is one virtual user; it loops until the deadline.
+
+async def scenario_login(ctx: Context, user: dict, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        await ctx.login(user["username"])
+        await ctx.think()
+
+
+async def scenario_dashboard(ctx: Context, user: dict, deadline: float) -> None:
+    token = await ctx.login(user["username"])
+    if token is None:
+        return
+    headers = _auth(token)
+    r = ctx.recorder
+    while time.monotonic() < deadline:
+        await r.request(ctx.client, "GET /users/me", "GET", f"{API}/users/me", headers=headers)
+        await asyncio.gather(
+            r.request(ctx.client, "GET /time-entries/", "GET", f"{API}/time-entries/",
+                      params={"limit": 5, "benutzer_id": user["id"]}, headers=headers),
+            r.request(ctx.client, "GET /absences/", "GET", f"{API}/absences/",
+                      params={"limit": 5, "benutzer_id": user["id"]}, headers=headers),
+        )
+        await r.request(ctx.client, "GET /bootstrap?view=arbeitszeiten", "GET", f"{API}/bootstrap",
+                        params={"view": "arbeitszeiten", "skip": 0, "limit": 10}, headers=headers)
+        await ctx.think()
+
+
+async def scenario_timesheet(ctx: Context, user: dict, deadline: float) -> None:
+    token = await ctx.login(user["username"])
+    if token is None:
+        return
+    headers = _auth(token)
+    r = ctx.recorder
+    response = await r.request(ctx.client, "GET /bootstrap?view=arbeitszeiten", "GET", f"{API}/bootstrap",
+                                params={"view": "arbeitszeiten", "skip": 0, "limit": 10}, headers=headers)
+    if response is None or response.status_code != 200:
+        return
+    tasks = response.json().get("tasks") or []
+    if not tasks:
+        return
+    day = date.today()
+    while time.monotonic() < deadline:
+        task = ctx.rng.choice(tasks)
+        start_hour = ctx.rng.randint(7, 16)
+        payload = {
+            "datum": day.isoformat(),
+            "startzeit": f"{start_hour:02d}:00:00",
+            "endzeit": f"{start_hour + 1:02d}:30:00",
+            "beschreibung": "Lasttest",
+            "ist_abrechenbar": True,
+            "projekt_id": task["projekt_id"],
+            "aufgabe_id": task["id"],
+        }
+        await r.request(ctx.client, "POST /time-entries/", "POST", f"{API}/time-entries/", json=payload,
+                        headers={**headers, "Idempotency-Key": str(uuid.uuid4())})
+        await r.request(ctx.client, "GET /bootstrap?view=arbeitszeiten", "GET", f"{API}/bootstrap",
+                        params={"view": "arbeitszeiten", "skip": 0, "limit": 10}, headers=headers)
+        day -= timedelta(days=1)
+        await ctx.think()
+
+
+async def scenario_approval(ctx: Context, user: dict, deadline: float) -> None:
+    token = await ctx.login(user["username"])
+    if token is None:
+        return
+    headers = _auth(token)
+    admin = _auth(ctx.admin_token)
+    r = ctx.recorder
+    types = await r.request(ctx.client, "GET /absence-types/", "GET", f"{API}/absence-types/", headers=headers)
+    if types is None or types.status_code != 200 or not types.json():
+        return
+    type_id = types.json()[0]["id"]
+    start = date.today() + timedelta(days=ctx.rng.randint(30, 3000))
+    while time.monotonic() < deadline:
+        await r.request(ctx.client, "POST /absences/", "POST", f"{API}/absences/", json={
+            "benutzer_id": user["id"],
+            "abwesenheit_typ_id": type_id,
+            "start_datum": start.isoformat(),
+            "end_datum": (start + timedelta(days=2)).isoformat(),
+            "grund": "Lasttest",
+        }, headers={**headers, "Idempotency-Key": str(uuid.uuid4())})
+        start += timedelta(days=7)
+
+        # The manager's view: pending requests, then decide on a few of them
+        response = await r.request(ctx.client, "GET /bootstrap?view=genehmigen", "GET", f"{API}/bootstrap",
+                                   params={"view": "genehmigen", "status_filter": "beantragt"}, headers=admin)
+        pending = (response.json().get("absences") or []) if response is not None and response.status_code == 200 else []
+        for absence in ctx.rng.sample(pending, min(2, len(pending))):
+            await r.request(ctx.client, "PUT /absences/{id}", "PUT", f"{API}/absences/{absence['id']}", json={
+                "status": ctx.rng.choice(["genehmigt", "genehmigt", "abgelehnt"]),
+                "kommentar_genehmiger": "Lasttest",
+            }, headers=admin)
+        await ctx.think()
+
+
+async def scenario_month_end(ctx: Context, user: dict, deadline: float) -> None:
+    admin = _auth(ctx.admin_token)
+    r = ctx.recorder
+    first_of_month = date.today().replace(day=1)
+    last_month_end = first_of_month - timedelta(days=1)
+    params = {"start_date": last_month_end.replace(day=1).isoformat(), "end_date": last_month_end.isoformat()}
+    while time.monotonic() < deadline:
+        await r.request(ctx.client, "GET /time-entries/report", "GET", f"{API}/time-entries/report",
+                        params={**params, "user_id": user["id"]}, headers=admin)
+        await r.request(ctx.client, "GET /time-entries/report (all users)", "GET", f"{API}/time-entries/report",
+                        params=params, headers=admin)
+        await r.request(ctx.client, "GET /projects/burndown", "GET", f"{API}/projects/burndown", headers=admin)
+        await ctx.think()
+
+
+SCENARIO_FUNCTIONS = {
+    "login": scenario_login,
+    "dashboard": scenario_dashboard,
+    "timesheet": scenario_timesheet,
+    "approval": scenario_approval,
+    "month_end": scenario_month_end,
+}
+
+
+# ---------- Runner ----------
+
+async def _load_users(client: httpx.AsyncClient, admin_token: str, prefix: str) -> list[dict]:
+    response = await client.get(f"{API}/users/", params={"limit": 100000}, headers=_auth(admin_token))
+    response.raise_for_status()
+    return [
+        {"id": u["id"], "username": u["username"]}
+        for u in response.json()
+        if u["username"].startswith(prefix) and u.get("ist_aktiv", True)
+    ]
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, users: list[dict], admin_token: str, args, seed: int) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    ctx = Context(client, recorder, users, admin_token, args.think_time, rng)
+    virtual_users = [users[i % len(users)] for i in range(args.concurrency)]
+    rng.shuffle(virtual_users)
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*(SCENARIO_FUNCTIONS[name](ctx, user, deadline) for user in virtual_users))
+    duration = time.monotonic() - start
+
+    endpoints = {label: stats.summary(duration) for label, stats in sorted(recorder.endpoints.items())}
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"duration_s": round(duration, 2), "throughput_rps": round(total / duration, 2), "endpoints": endpoints}
+
+
+def _client(args) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    if args.in_process:
+        from main import app
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout)
+    return httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+
+
+async def run(args) -> dict:
+    lifespan = None
+    if args.in_process:
+        from main import app
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+    try:
+        async with _client(args) as client:
+            token_response = await client.post("/auth/token", data={"username": args.admin_user, "password": args.admin_password})
+            if token_response.status_code != 200:
+                sys.exit(f"Admin login failed ({token_response.status_code}), check --admin-user/--admin-password")
+            admin_token = token_response.json()["access_token"]
+            users = await _load_users(client, admin_token, args.user_prefix)
+            if not users:
+                sys.exit(f"No active users with prefix '{args.user_prefix}', run benchmarks.generate_dataset first")
+
+            results = {
+                "meta": {
+                    "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "target": "in-process" if args.in_process else args.url,
+                    "concurrency": args.concurrency,
+                    "duration_s": args.duration,
+                    "think_time_s": args.think_time,
+                    "python": platform.python_version(),
+                    "users": len(users),
+                },
+                "scenarios": {},
+            }
+            for index, name in enumerate(args.scenario or SCENARIOS):
+                print(f"Running {name} ({args.concurrency} virtual users, {args.duration:.0f} s)...", file=sys.stderr)
+                results["scenarios"][name] = await run_scenario(name, client, users, admin_token, args, args.seed + index)
+            return results
+    finally:
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of p95 latency and throughput per scenario/endpoint compared to the baseline."""
+    regressions = []
+    for scenario, data in results["scenarios"].items():
+        base_scenario = baseline.get("scenarios", {}).get(scenario)
+        if not base_scenario:
+            continue
+        for label, stats in data["endpoints"].items():
+            base = base_scenario["endpoints"].get(label)
+            if not base or not base["requests"] or not stats["requests"]:
+                continue
+            if base["p95_ms"] and stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario} {label}: p95 {stats['p95_ms']:.1f} ms (baseline {base['p95_ms']:.1f} ms)"
+                )
+            if stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{scenario} {label}: {stats['throughput_rps']:.1f} req/s (baseline {base['throughput_rps']:.1f} req/s)"
+                )
+            base_error_rate = base["errors"] / base["requests"]
+            if stats["errors"] / stats["requests"] > base_error_rate + 0.01:
+                regressions.append(f"{scenario} {label}: {stats['errors']} errors in {stats['requests']} requests")
+    return regressions
+
+
+def print_table(results: dict) -> None:
+    print(f"{'scenario':<10} {'endpoint':<40} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for scenario, data in results["scenarios"].items():
+        for label, s in data["endpoints"].items():
+            print(
+                f"{scenario:<10} {label:<40} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>8.1f} "
+                f"{s['p50_ms'] or 0:>8.1f} {s['p95_ms'] or 0:>8.1f} {s['p99_ms'] or 0:>8.1f}"
+            )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the running server")
+    parser.add_argument("--in-process", action="store_true", help="call main.app directly instead of a server")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (repeatable, default all)")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per scenario")
+    parser.add_argument("--think-time", type=float, default=0.0, help="average pause between iterations in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--user-prefix", default="bench", help="usernames used as virtual users")
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="adminpassword")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) compared to {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions compared to {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
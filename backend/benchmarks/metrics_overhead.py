@@ -0,0 +1,58 @@
+"""
+Measures the per-request overhead of metrics.MetricsMiddleware.
+
+Calls a minimal ASGI app directly (no server, no network) with and without the
+middleware and prints the difference per request in microseconds.
+
+Usage (from backend/): python -m benchmarks.metrics_overhead [requests]
+"""
+import asyncio
+import sys
+import time
+
+from metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/api/v1/time-entries/{zeiteintrag_id}"
+
+
+async def _app(scope, receive, send):
+    scope["route"] = _Route  # What FastAPI's router sets for a matched route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def _run(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/time-entries/1"}
+        await app(scope, _receive, _send)
+    return time.perf_counter() - start
+
+
+async def main(requests: int) -> None:
+    instrumented = MetricsMiddleware(_app)
+    # Warm up label caches and the interpreter
+    await _run(_app, 1000)
+    await _run(instrumented, 1000)
+
+    bare = min([await _run(_app, requests) for _ in range(5)])
+    with_metrics = min([await _run(instrumented, requests) for _ in range(5)])
+    overhead_us = (with_metrics - bare) / requests * 1e6
+    print(f"requests per run:       {requests}")
+    print(f"bare app:               {bare / requests * 1e6:.2f} us/request")
+    print(f"with MetricsMiddleware: {with_metrics / requests * 1e6:.2f} us/request")
+    print(f"overhead:               {overhead_us:.2f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
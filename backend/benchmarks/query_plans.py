@@ -0,0 +1,279 @@
+"""
+Query plan regression checks for the hot queries in crud.py.
+
+Each case calls the real crud function, intercepts the SQL it sends (the query is not
+executed) and runs EXPLAIN (FORMAT JSON) on it with the same parameters. The plan is
+then checked for:
+    - index usage    at least one of the expected indexes appears in the plan
+    - seq scans      no sequential scan on the large tables (time entries, absences)
+    - cost           estimated total cost below the case's bound, and not grown by more
+                     than --cost-tolerance compared to the stored plan
+
+With a stored plan file (--plans) every plan is also compared structurally to the stored
+one; changed plans are printed as a unified diff of the plan trees. --update writes the
+current plans to the file instead of comparing. The exit code is 1 if a check failed.
+
+Run against a database filled by generate_dataset, so the planner sees realistic sizes
+and statistics (plans on a nearly empty database are meaningless).
+
+Usage (from backend/):
+    python -m benchmarks.query_plans                      # check, compare to the stored plans
+    python -m benchmarks.query_plans --update             # store the current plans
+    python -m benchmarks.query_plans --case report_all_users -v
+"""
+import argparse
+import calendar
+import difflib
+import json
+import os
+import sys
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import crud
+from benchmarks.generate_dataset import DEFAULT_END
+from database import SessionLocal, engine
+
+LARGE_TABLES = ("zeiteintraege", "abwesenheiten")
+DEFAULT_PLANS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans.json")
+# Plan properties shown in the diff; costs and row estimates change with every ANALYZE
+PLAN_KEYS = (
+    "Relation Name", "Index Name", "Join Type", "Strategy", "Scan Direction",
+    "Index Cond", "Hash Cond", "Merge Cond", "Filter", "Group Key", "Sort Key",
+)
+
+
+@dataclass
+class Params:
+    benutzer_id: int
+    projekt_id: int
+    start: date
+    end: date
+
+
+@dataclass
+class Case:
+    name: str
+    description: str
+    call: Callable[[Session, Params], object]
+    indexes: tuple[str, ...] = ()
+    allow_seq_scan: tuple[str, ...] = ()
+    max_cost: float | None = None
+
+
+CASES = [
+    Case(
+        "time_entries_user_month", "GET /time-entries/ of one user for a month",
+        lambda db, p: crud.get_zeiteintraege(db, benutzer_id=p.benutzer_id, start_datum=p.start, end_datum=p.end),
+        indexes=("ix_zeiteintraege_benutzer_datum",), max_cost=10_000,
+    ),
+    Case(
+        "time_entries_rows_user_month", "Fast JSON path of GET /time-entries/",
+        lambda db, p: crud.get_zeiteintraege_rows(db, benutzer_id=p.benutzer_id, start_datum=p.start, end_datum=p.end),
+        indexes=("ix_zeiteintraege_benutzer_datum",), max_cost=10_000,
+    ),
+    Case(
+        "time_entries_user", "Dashboard: entries of one user without a date range",
+        lambda db, p: crud.get_zeiteintraege(db, benutzer_id=p.benutzer_id),
+        indexes=("ix_zeiteintraege_benutzer_datum",), max_cost=10_000,
+    ),
+    Case(
+        "report_user", "GET /time-entries/report for one user",
+        lambda db, p: crud.get_zeiteintraege(
+            db, limit=1000, benutzer_id=p.benutzer_id, start_datum=p.start, end_datum=p.end, with_benutzer=True,
+        ),
+        indexes=("ix_zeiteintraege_benutzer_datum",), max_cost=20_000,
+    ),
+    Case(
+        "report_all_users", "GET /time-entries/report without user_id (managers)",
+        lambda db, p: crud.get_zeiteintraege(db, limit=1000, start_datum=p.start, end_datum=p.end, with_benutzer=True),
+        indexes=("ix_zeiteintraege_datum",), max_cost=50_000,
+    ),
+    Case(
+        "absences_user", "GET /absences/ of one user",
+        lambda db, p: crud.get_abwesenheiten(db, benutzer_id=p.benutzer_id),
+        indexes=("ix_abwesenheiten_benutzer_id",), max_cost=10_000,
+    ),
+    Case(
+        "absences_rows_user", "Fast JSON path of GET /absences/",
+        lambda db, p: crud.get_abwesenheiten_rows(db, benutzer_id=p.benutzer_id),
+        indexes=("ix_abwesenheiten_benutzer_id",), max_cost=10_000,
+    ),
+    Case(
+        "absences_pending", "Approval view: open absence requests of all users",
+        lambda db, p: crud.get_abwesenheiten(db, status="beantragt"),
+        indexes=("ix_abwesenheiten_beantragt",), max_cost=10_000,
+    ),
+    Case(
+        "burndown_project", "Burndown of one project",
+        lambda db, p: crud._query_burndown(db, p.projekt_id),
+        indexes=("ix_zeiteintraege_aufgabe_datum",),
+    ),
+    Case(
+        # Aggregates every entry of the active projects, a full scan is the right plan;
+        # tracked for plan changes and cost growth only
+        "burndown_portfolio", "Burndown of all active projects",
+        lambda db, p: crud._query_burndown(db),
+        allow_seq_scan=("zeiteintraege",),
+    ),
+]
+
+
+class _Captured(Exception):
+    def __init__(self, statement: str, parameters):
+        super().__init__(statement)
+        self.statement = statement
+        self.parameters = parameters
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    # Stop before the query runs; the plan is all we need
+    if statement.lstrip().upper().startswith("SELECT"):
+        raise _Captured(statement, parameters)
+
+
+def capture_sql(db: Session, call: Callable[[], object]) -> tuple[str, object]:
+    """Returns the first SELECT issued by call() without executing it."""
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        call()
+    except _Captured as captured:
+        return captured.statement, captured.parameters
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+        db.rollback()
+    raise RuntimeError("call() did not issue a SELECT")
+
+
+def explain(db: Session, statement: str, parameters) -> dict:
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+def plan_lines(plan: dict, depth: int = 0) -> list[str]:
+    """Plan tree as indented text with the properties that matter for the plan shape."""
+    details = ", ".join(f"{key}: {plan[key]}" for key in PLAN_KEYS if key in plan)
+    lines = [f"{'  ' * depth}{plan['Node Type']}" + (f" ({details})" if details else "")]
+    for child in plan.get("Plans", ()):
+        lines.extend(plan_lines(child, depth + 1))
+    return lines
+
+
+def check_plan(case: Case, plan: dict, stored: dict | None, cost_tolerance: float) -> list[str]:
+    """Returns the failed checks for a plan (empty list if everything is fine)."""
+    failures = []
+    nodes = list(_nodes(plan))
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    if case.indexes and not used.intersection(case.indexes):
+        failures.append(f"expected index {' or '.join(case.indexes)}, plan uses {', '.join(sorted(used)) or 'no index'}")
+
+    for node in nodes:
+        relation = node.get("Relation Name")
+        if node["Node Type"] == "Seq Scan" and relation in LARGE_TABLES and relation not in case.allow_seq_scan:
+            failures.append(f"sequential scan on {relation}")
+
+    cost = plan["Total Cost"]
+    if case.max_cost is not None and cost > case.max_cost:
+        failures.append(f"estimated cost {cost:,.0f} above the bound of {case.max_cost:,.0f}")
+    if stored is not None:
+        stored_cost = stored["Total Cost"]
+        if stored_cost and cost > stored_cost * (1 + cost_tolerance):
+            failures.append(f"estimated cost grew from {stored_cost:,.0f} to {cost:,.0f}")
+    return failures
+
+
+def default_params(db: Session, month: str | None) -> Params:
+    # Generated users and projects first, so the checks see users with a realistic history
+    benutzer_id = db.execute(text(
+        "SELECT COALESCE(MIN(id) FILTER (WHERE username LIKE 'bench%'), MIN(id)) FROM benutzer"
+    )).scalar()
+    projekt_id = db.execute(text("SELECT MIN(id) FROM projekte WHERE geloescht_am IS NULL")).scalar()
+    if benutzer_id is None or projekt_id is None:
+        sys.exit("No users or projects found, fill the database with benchmarks.generate_dataset first.")
+    year, month_number = map(int, month.split("-")) if month else (DEFAULT_END.year, DEFAULT_END.month)
+    last_day = calendar.monthrange(year, month_number)[1]
+    return Params(benutzer_id, projekt_id, date(year, month_number, 1), date(year, month_number, last_day))
+
+
+def load_plans(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(args) -> int:
+    if engine.dialect.name != "postgresql":
+        sys.exit("Query plan checks need PostgreSQL (EXPLAIN FORMAT JSON).")
+
+    cases = [case for case in CASES if not args.case or case.name in args.case]
+    stored_plans = {} if args.update else load_plans(args.plans)
+    current_plans = {}
+    failed = 0
+
+    db = SessionLocal()
+    try:
+        params = default_params(db, args.month)
+        print(f"User {params.benutzer_id}, project {params.projekt_id}, {params.start} to {params.end}\n")
+        for case in cases:
+            statement, parameters = capture_sql(db, lambda: case.call(db, params))
+            plan = explain(db, statement, parameters)["Plan"]
+            db.rollback()
+            current_plans[case.name] = plan
+
+            stored = stored_plans.get(case.name)
+            failures = check_plan(case, plan, stored, args.cost_tolerance)
+            lines = plan_lines(plan)
+            changed = stored is not None and plan_lines(stored) != lines
+
+            print(f"{'FAIL' if failures else 'ok  '} {case.name:<30} cost {plan['Total Cost']:>12,.0f}"
+                  f"{'  (plan changed)' if changed else ''}  {case.description}")
+            for failure in failures:
+                print(f"       - {failure}")
+            if changed:
+                diff = difflib.unified_diff(plan_lines(stored), lines, "stored", "current", lineterm="")
+                print("\n".join(f"       {line}" for line in diff))
+            elif args.verbose:
+                print("\n".join(f"       {line}" for line in lines))
+            failed += bool(failures)
+    finally:
+        db.close()
+
+    if args.update:
+        plans = load_plans(args.plans)
+        plans.update(current_plans)
+        with open(args.plans, "w", encoding="utf-8") as f:
+            json.dump(plans, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nStored {len(current_plans)} plans in {args.plans}")
+
+    print(f"\n{len(cases) - failed} of {len(cases)} query plans ok")
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", choices=[case.name for case in CASES], help="only run this case (repeatable)")
+    parser.add_argument("--plans", default=DEFAULT_PLANS, help="stored plans to compare against (default: %(default)s)")
+    parser.add_argument("--update", action="store_true", help="store the current plans instead of comparing")
+    parser.add_argument("--month", help="month for the date range queries, YYYY-MM (default: last generated month)")
+    parser.add_argument("--cost-tolerance", type=float, default=1.0,
+                        help="allowed growth of the estimated cost against the stored plan (default: 1.0 = 2x)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan, not only changed ones")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Build step for static/: writes minified, content-hashed copies of all files to
+static/dist/ together with .gz/.br variants, resized and WebP/AVIF image variants
+and a manifest.json that maps logical paths to the hashed files.
+
+Usage: python build_static.py
+
+Brotli (brotli), image processing (Pillow) and better JS/CSS minification
+(rjsmin/rcssmin) are optional; missing packages only skip that part of the build.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+from static_assets import DIST_DIR, DIST_DIRNAME, MANIFEST_PATH, STATIC_DIR, variant_name
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+HASH_LENGTH = 10
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".ico"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+# Widths for resized variants; only widths below the original are generated.
+# 64 is the favicon, 128 the header logo (55px high at 2x), 256 the logo on the
+# info page and 640 the gallery images on the vacation page.
+IMAGE_WIDTHS = (64, 128, 256, 640, 1280)
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+
+def minify_css(source: str) -> str:
+    if rcssmin:
+        return rcssmin.cssmin(source)
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    # Without rjsmin the script is kept as is; it is still compressed below
+    return rjsmin.jsmin(source) if rjsmin else source
+
+
+def hashed_name(rel_path: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def write_compressed(path: str, content: bytes) -> None:
+    # mtime=0 keeps the .gz output reproducible between builds
+    gz = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gz) < len(content):
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+    if brotli:
+        br = brotli.compress(content, quality=11)
+        if len(br) < len(content):
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+
+
+def emit(manifest: dict, rel_path: str, content: bytes) -> None:
+    """Write content under its hashed name and record it in the manifest."""
+    target = hashed_name(rel_path, content)
+    full_path = os.path.join(DIST_DIR, target)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "wb") as f:
+        f.write(content)
+    if os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        write_compressed(full_path, content)
+    manifest[rel_path] = target.replace(os.sep, "/")
+
+
+def _encode_image(image, fmt: str) -> bytes | None:
+    buffer = io.BytesIO()
+    try:
+        if fmt == "webp":
+            image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+        elif fmt == "avif":
+            image.save(buffer, "AVIF", quality=AVIF_QUALITY)
+        elif fmt == "png":
+            image.save(buffer, "PNG", optimize=True)
+        else:
+            image.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True, progressive=True)
+    except (KeyError, OSError, ValueError) as e:
+        print(f"  skipped {fmt}: {e}")
+        return None
+    return buffer.getvalue()
+
+
+def build_image_variants(manifest: dict, rel_path: str, source_path: str) -> None:
+    ext = os.path.splitext(rel_path)[1].lower()
+    original_format = "png" if ext == ".png" else "jpeg"
+    formats = ["webp"]
+    try:
+        if features.check("avif"):
+            formats.append("avif")
+    except ValueError:
+        # Pillow versions without AVIF support do not know the feature at all
+        pass
+
+    with Image.open(source_path) as original:
+        original.load()
+        widths = [None] + [w for w in IMAGE_WIDTHS if w < original.width]
+        for width in widths:
+            image = original
+            if width:
+                height = round(original.height * width / original.width)
+                image = original.resize((width, height), Image.LANCZOS)
+                content = _encode_image(image, original_format)
+                if content:
+                    emit(manifest, variant_name(rel_path, width), content)
+            for fmt in formats:
+                content = _encode_image(image, fmt)
+                if content:
+                    emit(manifest, variant_name(rel_path, width, fmt), content)
+
+
+def build() -> dict:
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest: dict[str, str] = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if root == STATIC_DIR and DIST_DIRNAME in dirs:
+            dirs.remove(DIST_DIRNAME)
+        dirs.sort()
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            rel_path = os.path.relpath(source_path, STATIC_DIR).replace(os.sep, "/")
+            ext = os.path.splitext(name)[1].lower()
+            with open(source_path, "rb") as f:
+                content = f.read()
+
+            if ext == ".css":
+                content = minify_css(content.decode("utf-8")).encode("utf-8")
+            elif ext == ".js":
+                content = minify_js(content.decode("utf-8")).encode("utf-8")
+            emit(manifest, rel_path, content)
+
+            if ext in IMAGE_EXTENSIONS and Image is not None:
+                build_image_variants(manifest, rel_path, source_path)
+            print(f"  {rel_path} -> {manifest[rel_path]}")
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    if Image is None:
+        print("Pillow is not installed, image variants are skipped.")
+    if brotli is None:
+        print("brotli is not installed, only .gz variants are written.")
+    print(f"Building static assets into {DIST_DIR}")
+    manifest = build()
+    print(f"Wrote {len(manifest)} entries to {MANIFEST_PATH}")
@@ -1,20 +1,32 @@
 from sqlalchemy.orm import Session, joinedload
 import sqlalchemy.orm
+from sqlalchemy import case, delete, func, literal_column, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+import logging
+import time
 
 import models
 import schemas
+import refdata_cache
+import report_cache
+import metrics
+from sql_compat import week_start, word_similar, word_similarity
+
+logger = logging.getLogger(__name__)
 
 # Password Hashing Context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with metrics.track_bcrypt("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with metrics.track_bcrypt("hash"):
+        return pwd_context.hash(password)
 
 # ---------- Rolle CRUD ----------
 def get_rolle(db: Session, rolle_id: int) -> models.Rolle | None:
@@ -29,6 +41,7 @@ def get_rollen(db: Session, skip: int = 0, limit: int = 100) -> list[models.Roll
 def create_rolle(db: Session, rolle: schemas.RolleCreate) -> models.Rolle:
     db_rolle = models.Rolle(name=rolle.name, beschreibung=rolle.beschreibung)
     db.add(db_rolle)
+    refdata_cache.notify_change(db, "rollen")
     db.commit()
     db.refresh(db_rolle)
     return db_rolle
@@ -38,6 +51,7 @@ def update_rolle(db: Session, rolle_id: int, rolle_update: schemas.RolleBase) ->
     if db_rolle:
         db_rolle.name = rolle_update.name
         db_rolle.beschreibung = rolle_update.beschreibung
+        refdata_cache.notify_change(db, "rollen")
         db.commit()
         db.refresh(db_rolle)
     return db_rolle
@@ -46,9 +60,30 @@ def delete_rolle(db: Session, rolle_id: int) -> models.Rolle | None:
     db_rolle = get_rolle(db, rolle_id)
     if db_rolle:
         db.delete(db_rolle)
+        refdata_cache.notify_change(db, "rollen")
         db.commit()
     return db_rolle
 
+# ---------- Bulk delete ----------
+DELETE_BATCH_SIZE = 5000
+
+def _delete_in_batches(db: Session, model, condition, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """
+    Deletes the rows matching condition in chunks of batch_size, committing after each
+    chunk so locks and WAL stay small. Rows are deleted in the database without
+    being loaded into the session.
+    """
+    deleted = 0
+    while True:
+        ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        result = db.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
 # ---------- Benutzer CRUD ----------
 def get_benutzer(db: Session, benutzer_id: int) -> models.Benutzer | None:
     return db.query(models.Benutzer).filter(models.Benutzer.id == benutzer_id).first()
@@ -56,11 +91,74 @@ def get_benutzer(db: Session, benutzer_id: int) -> models.Benutzer | None:
 def get_benutzer_by_username(db: Session, username: str) -> models.Benutzer | None:
     return db.query(models.Benutzer).filter(models.Benutzer.username == username).first()
 
+async def get_benutzer_by_username_async(db: AsyncSession, username: str) -> models.Benutzer | None:
+    result = await db.execute(select(models.Benutzer).where(models.Benutzer.username == username))
+    return result.scalars().first()
+
 def get_benutzer_by_email(db: Session, email: str) -> models.Benutzer | None:
     return db.query(models.Benutzer).filter(models.Benutzer.email == email).first()
 
-def get_benutzer_list(db: Session, skip: int = 0, limit: int = 100) -> list[models.Benutzer]:
-    return db.query(models.Benutzer).offset(skip).limit(limit).all()
+def get_benutzer_list(db: Session, skip: int = 0, limit: int = 100, include_archived: bool = False, ids: list[int] | None = None) -> list[models.Benutzer]:
+    query = db.query(models.Benutzer)
+    if not include_archived:
+        query = query.filter(models.Benutzer.geloescht_am.is_(None))
+    if ids is not None:
+        query = query.filter(models.Benutzer.id.in_(ids))
+    return query.offset(skip).limit(limit).all()
+
+def benutzer_search_text():
+    """Searched text of a user; the same expression as the trigram index of migrations/add_user_search.sql."""
+    b = models.Benutzer
+    space = literal_column("' '")
+    return func.lower(b.username + space + b.vorname + space + b.nachname + space + b.email)
+
+# pg_trgm is optional (add_user_search.sql skips it without the rights to create it);
+# a missing extension is looked up again after this many seconds
+TRIGRAM_RECHECK_SECONDS = 300
+_trigram_state: tuple[bool, float] | None = None  # (available, checked at)
+
+def trigram_available(db: Session) -> bool:
+    global _trigram_state
+    state = _trigram_state
+    if state is not None and (state[0] or time.monotonic() - state[1] < TRIGRAM_RECHECK_SECONDS):
+        return state[0]
+    available = db.get_bind().dialect.name == "postgresql" and bool(
+        db.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")).scalar()
+    )
+    if not available and state is None and db.get_bind().dialect.name == "postgresql":
+        logger.warning("pg_trgm is not installed, the user search only finds substrings")
+    _trigram_state = (available, time.monotonic())
+    return available
+
+def search_benutzer(db: Session, q: str | None = None, rolle_id: int | None = None, ist_aktiv: bool | None = None,
+                    include_archived: bool = False, limit: int = 20):
+    """
+    Id/name rows of the users matching q in username, first/last name or email: substrings,
+    and with pg_trgm also misspelled words. Name and username prefixes rank first, then the
+    closer matches; without q all users ordered by name.
+    """
+    b = models.Benutzer
+    query = select(b.id, b.vorname, b.nachname)
+    if not include_archived:
+        query = query.where(b.geloescht_am.is_(None))
+    if rolle_id is not None:
+        query = query.where(b.rolle_id == rolle_id)
+    if ist_aktiv is not None:
+        query = query.where(b.ist_aktiv == ist_aktiv)
+
+    order = []
+    term = (q or "").strip().lower()
+    if term:
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        searched = benutzer_search_text()
+        match = searched.like(f"%{escaped}%", escape="\\")
+        is_prefix = or_(*(func.lower(column).like(f"{escaped}%", escape="\\") for column in (b.nachname, b.vorname, b.username)))
+        order = [case((is_prefix, 0), else_=1)]
+        if trigram_available(db):
+            match = or_(match, word_similar(term, searched))
+            order.append(word_similarity(term, searched).desc())
+        query = query.where(match)
+    return db.execute(query.order_by(*order, b.nachname, b.vorname, b.id).limit(limit)).all()
 
 def create_benutzer(db: Session, benutzer: schemas.BenutzerCreate, send_welcome_email: bool = True) -> models.Benutzer:
     hashed_password = get_password_hash(benutzer.passwort)
@@ -90,7 +188,7 @@ def create_benutzer(db: Session, benutzer: schemas.BenutzerCreate, send_welcome_
                 db_benutzer.username
             )
         except Exception as e:
-            print(f"Failed to send account creation notification: {str(e)}")
+            logger.warning("Failed to send account creation notification: %s", e)
             # Continue even if email notification fails
     
     return db_benutzer
@@ -106,6 +204,8 @@ def update_benutzer(db: Session, benutzer_id: int, benutzer_update: schemas.Benu
 
         for key, value in update_data.items():
             setattr(db_benutzer, key, value)
+        if "vorname" in update_data or "nachname" in update_data:
+            report_cache.notify_write(db, report_cache.Change(benutzer_id=benutzer_id))
         
         try:
             db.commit()
@@ -114,7 +214,7 @@ def update_benutzer(db: Session, benutzer_id: int, benutzer_update: schemas.Benu
         except Exception as e:
             db.rollback()
             # Log error
-            print(f"Error updating user: {str(e)}")
+            logger.warning("Error updating user %s: %s", benutzer_id, e)
             # Check for unique constraint violations
             if "unique constraint" in str(e).lower() and "email" in str(e).lower():
                 from fastapi import HTTPException, status
@@ -132,13 +232,41 @@ def update_benutzer(db: Session, benutzer_id: int, benutzer_update: schemas.Benu
             raise
     return db_benutzer
 
-def delete_benutzer(db: Session, benutzer_id: int) -> models.Benutzer | None:
+def delete_benutzer(db: Session, benutzer_id: int, batch_size: int = DELETE_BATCH_SIZE) -> models.Benutzer | None:
+    """
+    Löscht einen Benutzer. Zeiteinträge und Abwesenheiten werden vorher in Batches gelöscht,
+    den Rest erledigt ON DELETE CASCADE in der Datenbank.
+    """
     db_benutzer = get_benutzer(db, benutzer_id)
     if db_benutzer:
+        _delete_in_batches(db, models.Zeiteintrag, models.Zeiteintrag.benutzer_id == benutzer_id, batch_size)
+        _delete_in_batches(db, models.Abwesenheit, models.Abwesenheit.benutzer_id == benutzer_id, batch_size)
         db.delete(db_benutzer)
+        report_cache.notify_write(db, report_cache.Change(benutzer_id=benutzer_id))
         db.commit()
     return db_benutzer
 
+def archive_benutzer(db: Session, benutzer_id: int) -> models.Benutzer | None:
+    """
+    Soft delete: der Benutzer wird aus den Listen ausgeblendet und kann sich nicht mehr anmelden
+    (auth.get_current_active_user), seine Daten bleiben erhalten. ist_aktiv bleibt unverändert,
+    damit restore_benutzer den vorherigen Zustand wiederherstellt.
+    """
+    db_benutzer = get_benutzer(db, benutzer_id)
+    if db_benutzer and db_benutzer.geloescht_am is None:
+        db_benutzer.geloescht_am = datetime.now().astimezone()
+        db.commit()
+        db.refresh(db_benutzer)
+    return db_benutzer
+
+def restore_benutzer(db: Session, benutzer_id: int) -> models.Benutzer | None:
+    db_benutzer = get_benutzer(db, benutzer_id)
+    if db_benutzer and db_benutzer.geloescht_am is not None:
+        db_benutzer.geloescht_am = None
+        db.commit()
+        db.refresh(db_benutzer)
+    return db_benutzer
+
 def get_benutzer_by_rolle_id(db: Session, rolle_id: int) -> list[models.Benutzer]:
     """
     Holt alle Benutzer mit einer bestimmten Rolle
@@ -149,8 +277,11 @@ def get_benutzer_by_rolle_id(db: Session, rolle_id: int) -> list[models.Benutzer
 def get_projekt(db: Session, projekt_id: int) -> models.Projekt | None:
     return db.query(models.Projekt).filter(models.Projekt.id == projekt_id).first()
 
-def get_projekte(db: Session, skip: int = 0, limit: int = 100) -> list[models.Projekt]:
-    return db.query(models.Projekt).offset(skip).limit(limit).all()
+def get_projekte(db: Session, skip: int = 0, limit: int = 100, include_archived: bool = False) -> list[models.Projekt]:
+    query = db.query(models.Projekt)
+    if not include_archived:
+        query = query.filter(models.Projekt.geloescht_am.is_(None))
+    return query.offset(skip).limit(limit).all()
 
 def get_projekt_by_name(db: Session, name: str) -> models.Projekt | None:
     return db.query(models.Projekt).filter(models.Projekt.name == name).first()
@@ -158,6 +289,7 @@ def get_projekt_by_name(db: Session, name: str) -> models.Projekt | None:
 def create_projekt(db: Session, projekt: schemas.ProjektCreate) -> models.Projekt:
     db_projekt = models.Projekt(**projekt.model_dump())
     db.add(db_projekt)
+    refdata_cache.notify_change(db, "projekte")
     db.commit()
     db.refresh(db_projekt)
     return db_projekt
@@ -168,15 +300,46 @@ def update_projekt(db: Session, projekt_id: int, projekt_update: schemas.Projekt
         update_data = projekt_update.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_projekt, key, value)
+        refdata_cache.notify_change(db, "projekte")
+        if "name" in update_data:
+            report_cache.notify_write(db, report_cache.Change(projekt_id=projekt_id))
         db.commit()
         db.refresh(db_projekt)
     return db_projekt
 
-def delete_projekt(db: Session, projekt_id: int) -> models.Projekt | None:
+def delete_projekt(db: Session, projekt_id: int, batch_size: int = DELETE_BATCH_SIZE) -> models.Projekt | None:
+    """
+    Löscht ein Projekt. Die Zeiteinträge werden vorher in Batches gelöscht, damit bei großen
+    Projekten keine langen Sperren entstehen; Aufgaben entfernt ON DELETE CASCADE.
+    """
     db_projekt = get_projekt(db, projekt_id)
     if db_projekt:
+        _delete_in_batches(db, models.Zeiteintrag, models.Zeiteintrag.projekt_id == projekt_id, batch_size)
         db.delete(db_projekt)
+        refdata_cache.notify_change(db, "projekte", "aufgaben")
+        report_cache.notify_write(db, report_cache.Change(projekt_id=projekt_id))
+        db.commit()
+    return db_projekt
+
+def archive_projekt(db: Session, projekt_id: int) -> models.Projekt | None:
+    """Soft delete: das Projekt wird aus den Listen ausgeblendet, Aufgaben und Zeiteinträge bleiben erhalten."""
+    db_projekt = get_projekt(db, projekt_id)
+    if db_projekt and db_projekt.geloescht_am is None:
+        db_projekt.geloescht_am = datetime.now().astimezone()
+        refdata_cache.notify_change(db, "projekte", "aufgaben")
+        report_cache.notify_write(db, report_cache.Change(projekt_id=projekt_id))
         db.commit()
+        db.refresh(db_projekt)
+    return db_projekt
+
+def restore_projekt(db: Session, projekt_id: int) -> models.Projekt | None:
+    db_projekt = get_projekt(db, projekt_id)
+    if db_projekt and db_projekt.geloescht_am is not None:
+        db_projekt.geloescht_am = None
+        refdata_cache.notify_change(db, "projekte", "aufgaben")
+        report_cache.notify_write(db, report_cache.Change(projekt_id=projekt_id))
+        db.commit()
+        db.refresh(db_projekt)
     return db_projekt
 
 # ---------- Aufgabe CRUD ----------
@@ -192,6 +355,9 @@ def get_aufgaben_by_projekt(db: Session, projekt_id: int, skip: int = 0, limit:
 def create_aufgabe(db: Session, aufgabe: schemas.AufgabeCreate) -> models.Aufgabe:
     db_aufgabe = models.Aufgabe(**aufgabe.model_dump())
     db.add(db_aufgabe)
+    refdata_cache.notify_change(db, "aufgaben")
+    # Planned hours of the project change
+    report_cache.notify_write(db, report_cache.Change(projekt_id=db_aufgabe.projekt_id))
     db.commit()
     db.refresh(db_aufgabe)
     return db_aufgabe
@@ -199,9 +365,14 @@ def create_aufgabe(db: Session, aufgabe: schemas.AufgabeCreate) -> models.Aufgab
 def update_aufgabe(db: Session, aufgabe_id: int, aufgabe_update: schemas.AufgabeUpdate) -> models.Aufgabe | None:
     db_aufgabe = get_aufgabe(db, aufgabe_id)
     if db_aufgabe:
+        old_projekt_id = db_aufgabe.projekt_id
         update_data = aufgabe_update.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_aufgabe, key, value)
+        refdata_cache.notify_change(db, "aufgaben")
+        report_cache.notify_write(
+            db, report_cache.Change(projekt_id=old_projekt_id), report_cache.Change(projekt_id=db_aufgabe.projekt_id),
+        )
         db.commit()
         db.refresh(db_aufgabe)
     return db_aufgabe
@@ -210,6 +381,8 @@ def delete_aufgabe(db: Session, aufgabe_id: int) -> models.Aufgabe | None:
     db_aufgabe = get_aufgabe(db, aufgabe_id)
     if db_aufgabe:
         db.delete(db_aufgabe)
+        refdata_cache.notify_change(db, "aufgaben")
+        report_cache.notify_write(db, report_cache.Change(projekt_id=db_aufgabe.projekt_id))
         db.commit()
     return db_aufgabe
 
@@ -220,94 +393,140 @@ def get_zeiteintrag(db: Session, zeiteintrag_id: int) -> models.Zeiteintrag | No
         sqlalchemy.orm.joinedload(models.Zeiteintrag.aufgabe)
     ).first()
 
-def get_zeiteintraege(db: Session, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, projekt_id: int | None = None, aufgabe_id: int | None = None, start_datum: date | None = None, end_datum: date | None = None) -> list[models.Zeiteintrag]:
-    # Use joinedload to eagerly load related objects
-    query = db.query(models.Zeiteintrag).join(
-        models.Projekt, models.Zeiteintrag.projekt_id == models.Projekt.id, isouter=True
-    ).join(
-        models.Aufgabe, models.Zeiteintrag.aufgabe_id == models.Aufgabe.id, isouter=True
-    ).options(        sqlalchemy.orm.joinedload(models.Zeiteintrag.projekt),
-        sqlalchemy.orm.joinedload(models.Zeiteintrag.aufgabe)
-    )
-    
+def get_zeiteintraege(db: Session, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, projekt_id: int | None = None, aufgabe_id: int | None = None, start_datum: date | None = None, end_datum: date | None = None, with_benutzer: bool = False) -> list[models.Zeiteintrag]:
+    # joinedload alone joins projekt/aufgabe once; explicit joins on top of it joined the tables twice
+    options = [
+        joinedload(models.Zeiteintrag.projekt),
+        joinedload(models.Zeiteintrag.aufgabe),
+    ]
+    if with_benutzer:
+        # Callers that read entry.benutzer per row (reports) would otherwise issue one query per entry
+        options.append(joinedload(models.Zeiteintrag.benutzer))
+    query = db.query(models.Zeiteintrag).options(*options)
+    query = query.filter(*_zeiteintrag_filters(benutzer_id, projekt_id, aufgabe_id, start_datum, end_datum))
+    result = query.offset(skip).limit(limit).all()
+    return result
+
+def _zeiteintrag_filters(benutzer_id: int | None, projekt_id: int | None, aufgabe_id: int | None, start_datum: date | None, end_datum: date | None) -> list:
+    conditions = []
     if benutzer_id is not None:
-        query = query.filter(models.Zeiteintrag.benutzer_id == benutzer_id)
+        conditions.append(models.Zeiteintrag.benutzer_id == benutzer_id)
     if projekt_id is not None:
-        query = query.filter(models.Zeiteintrag.projekt_id == projekt_id)
+        conditions.append(models.Zeiteintrag.projekt_id == projekt_id)
     if aufgabe_id is not None:
-        query = query.filter(models.Zeiteintrag.aufgabe_id == aufgabe_id)
+        conditions.append(models.Zeiteintrag.aufgabe_id == aufgabe_id)
     if start_datum is not None:
-        query = query.filter(models.Zeiteintrag.datum >= start_datum)
+        conditions.append(models.Zeiteintrag.datum >= start_datum)
     if end_datum is not None:
-        query = query.filter(models.Zeiteintrag.datum <= end_datum)
-    result = query.offset(skip).limit(limit).all()
-    return result
+        conditions.append(models.Zeiteintrag.datum <= end_datum)
+    return conditions
+
+def get_zeiteintraege_rows(db: Session, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, projekt_id: int | None = None, aufgabe_id: int | None = None, start_datum: date | None = None, end_datum: date | None = None) -> list:
+    """
+    Same filters as get_zeiteintraege, but selects only the columns of schemas.Zeiteintrag
+    as plain rows (no ORM objects). The list endpoint uses the async variant
+    below, the rows are turned into response dicts by fast_json.py.
+    """
+    return db.execute(_zeiteintraege_rows_stmt(skip, limit, benutzer_id, projekt_id, aufgabe_id, start_datum, end_datum)).all()
+
+async def get_zeiteintraege_rows_async(db: AsyncSession, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, projekt_id: int | None = None, aufgabe_id: int | None = None, start_datum: date | None = None, end_datum: date | None = None) -> list:
+    result = await db.execute(_zeiteintraege_rows_stmt(skip, limit, benutzer_id, projekt_id, aufgabe_id, start_datum, end_datum))
+    return result.all()
+
+def _zeiteintraege_rows_stmt(skip: int, limit: int, benutzer_id: int | None, projekt_id: int | None, aufgabe_id: int | None, start_datum: date | None, end_datum: date | None):
+    z = models.Zeiteintrag
+    return select(
+        z.datum, z.startzeit, z.endzeit, z.stunden, z.beschreibung, z.ist_abrechenbar,
+        z.id, z.benutzer_id, z.aufgabe_id, z.projekt_id, z.erstellt_am, z.aktualisiert_am,
+        models.Projekt.id.label("projekt_ref_id"), models.Projekt.name.label("projekt_name"),
+        models.Aufgabe.id.label("aufgabe_ref_id"), models.Aufgabe.name.label("aufgabe_name"),
+    ).outerjoin(
+        models.Projekt, z.projekt_id == models.Projekt.id
+    ).outerjoin(
+        models.Aufgabe, z.aufgabe_id == models.Aufgabe.id
+    ).where(
+        *_zeiteintrag_filters(benutzer_id, projekt_id, aufgabe_id, start_datum, end_datum)
+    ).offset(skip).limit(limit)
 
 def get_zeiteintraege_by_benutzer(db: Session, benutzer_id: int, skip: int = 0, limit: int = 100) -> list[models.Zeiteintrag]:
     return db.query(models.Zeiteintrag).filter(models.Zeiteintrag.benutzer_id == benutzer_id).offset(skip).limit(limit).all()
 
-def create_zeiteintrag(db: Session, zeiteintrag: schemas.ZeiteintragCreate, current_user_id: int = None) -> models.Zeiteintrag:
-    try:
-        # If benutzer_id is not set, use the current user's ID
-        data_dict = zeiteintrag.model_dump()
-        if current_user_id and not zeiteintrag.benutzer_id:
-            data_dict['benutzer_id'] = current_user_id
-        
-        # Calculate hours from start and end time
-        start = datetime.combine(data_dict['datum'], data_dict['startzeit'])
-        end = datetime.combine(data_dict['datum'], data_dict['endzeit'])
+def add_zeiteintrag(db: Session, zeiteintrag: schemas.ZeiteintragCreate, current_user_id: int = None) -> models.Zeiteintrag:
+    """
+    Legt den Zeiteintrag an, ohne zu committen (nur flush), damit er mit weiteren Änderungen
+    in einer Transaktion landen kann (idempotency.run). Nach dem Commit zeiteintrag_created aufrufen.
+    """
+    # If benutzer_id is not set, use the current user's ID
+    data_dict = zeiteintrag.model_dump()
+    if current_user_id and not zeiteintrag.benutzer_id:
+        data_dict['benutzer_id'] = current_user_id
+    
+    # Calculate hours from start and end time
+    start = datetime.combine(data_dict['datum'], data_dict['startzeit'])
+    end = datetime.combine(data_dict['datum'], data_dict['endzeit'])
+    
+    # Handle overnight shifts
+    if end < start:
+        end += timedelta(days=1)
+    
+    duration = end - start
+    hours = duration.total_seconds() / 3600
+    data_dict['stunden'] = Decimal(str(round(hours, 2)))
+
+    # Create the time entry
+    db_zeiteintrag = models.Zeiteintrag(**data_dict)
+    db.add(db_zeiteintrag)
+    report_cache.notify_write(db, report_cache.Change.entry(
+        data_dict['benutzer_id'], data_dict['projekt_id'], data_dict['datum'],
+    ))
+    db.flush()
+    return db_zeiteintrag
+
+def zeiteintrag_created(db: Session, db_zeiteintrag: models.Zeiteintrag) -> None:
+    """Nach dem Commit eines neuen Zeiteintrags: Metrik und E-Mail bei weniger oder mehr als 8 Stunden."""
+    metrics.TIME_ENTRIES_CREATED.inc()
+    
+    # Check if hours are less than or exceed 8 hours and send notification
+    from email_utils import send_work_hours_notification
+    
+    # Get the user information for sending email
+    benutzer = db.query(models.Benutzer).filter(models.Benutzer.id == db_zeiteintrag.benutzer_id).first()
+    if benutzer and benutzer.email:
+        # Format user name for the email
+        user_name = f"{benutzer.vorname} {benutzer.nachname}"
         
-        # Handle overnight shifts
-        if end < start:
-            end += timedelta(days=1)
+        # Convert Decimal to float for comparison
+        hours_float = float(db_zeiteintrag.stunden)
         
-        duration = end - start
-        hours = duration.total_seconds() / 3600
-        data_dict['stunden'] = Decimal(str(round(hours, 2)))
+        if hours_float < 8.0:
+            # Send notification for under 8 hours
+            send_work_hours_notification(
+                benutzer.email, 
+                user_name, 
+                str(db_zeiteintrag.datum), 
+                hours_float, 
+                is_under=True
+            )
+        elif hours_float > 8.0:
+            # Send notification for over 8 hours
+            send_work_hours_notification(
+                benutzer.email, 
+                user_name, 
+                str(db_zeiteintrag.datum), 
+                hours_float, 
+                is_under=False
+            )
 
-        # Create and save the time entry
-        db_zeiteintrag = models.Zeiteintrag(**data_dict)
-        db.add(db_zeiteintrag)
+def create_zeiteintrag(db: Session, zeiteintrag: schemas.ZeiteintragCreate, current_user_id: int = None) -> models.Zeiteintrag:
+    try:
+        db_zeiteintrag = add_zeiteintrag(db, zeiteintrag, current_user_id)
         db.commit()
         db.refresh(db_zeiteintrag)
-        
-        # Check if hours are less than or exceed 8 hours and send notification
-        from email_utils import send_work_hours_notification
-        
-        # Get the user information for sending email
-        benutzer = db.query(models.Benutzer).filter(models.Benutzer.id == db_zeiteintrag.benutzer_id).first()
-        if benutzer and benutzer.email:
-            # Format user name for the email
-            user_name = f"{benutzer.vorname} {benutzer.nachname}"
-            
-            # Convert Decimal to float for comparison
-            hours_float = float(data_dict['stunden'])
-            
-            if hours_float < 8.0:
-                # Send notification for under 8 hours
-                send_work_hours_notification(
-                    benutzer.email, 
-                    user_name, 
-                    str(data_dict['datum']), 
-                    hours_float, 
-                    is_under=True
-                )
-            elif hours_float > 8.0:
-                # Send notification for over 8 hours
-                send_work_hours_notification(
-                    benutzer.email, 
-                    user_name, 
-                    str(data_dict['datum']), 
-                    hours_float, 
-                    is_under=False
-                )
-        
+        zeiteintrag_created(db, db_zeiteintrag)
         return db_zeiteintrag
     except Exception as e:
         db.rollback()
-        print(f"Error creating time entry: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error creating time entry")
         raise Exception(f"Fehler beim Erstellen des Zeiteintrags: {str(e)}")
 
 def update_zeiteintrag(db: Session, zeiteintrag_id: int, zeiteintrag_update: schemas.ZeiteintragUpdate) -> models.Zeiteintrag | None:
@@ -317,6 +536,8 @@ def update_zeiteintrag(db: Session, zeiteintrag_id: int, zeiteintrag_update: sch
         
         # Save old values for comparison if startzeit or endzeit are changing
         recalculate_hours = False
+        old_projekt_id = db_zeiteintrag.projekt_id
+        old_benutzer_id = db_zeiteintrag.benutzer_id
         old_datum = db_zeiteintrag.datum
         old_startzeit = db_zeiteintrag.startzeit
         old_endzeit = db_zeiteintrag.endzeit
@@ -344,7 +565,12 @@ def update_zeiteintrag(db: Session, zeiteintrag_id: int, zeiteintrag_update: sch
             duration = end - start
             hours = duration.total_seconds() / 3600
             db_zeiteintrag.stunden = Decimal(str(round(hours, 2)))
-            
+
+        report_cache.notify_write(
+            db,
+            report_cache.Change.entry(old_benutzer_id, old_projekt_id, old_datum),
+            report_cache.Change.entry(db_zeiteintrag.benutzer_id, db_zeiteintrag.projekt_id, db_zeiteintrag.datum),
+        )
         db.commit()
         db.refresh(db_zeiteintrag)
         
@@ -380,7 +606,7 @@ def update_zeiteintrag(db: Session, zeiteintrag_id: int, zeiteintrag_update: sch
                         is_under=False
                     )
         except Exception as e:
-            print(f"Failed to send email notification: {str(e)}")
+            logger.warning("Failed to send email notification: %s", e)
             # Continue even if email notification fails
     return db_zeiteintrag
 
@@ -388,9 +614,139 @@ def delete_zeiteintrag(db: Session, zeiteintrag_id: int) -> models.Zeiteintrag |
     db_zeiteintrag = get_zeiteintrag(db, zeiteintrag_id)
     if db_zeiteintrag:
         db.delete(db_zeiteintrag)
+        report_cache.notify_write(db, report_cache.Change.entry(
+            db_zeiteintrag.benutzer_id, db_zeiteintrag.projekt_id, db_zeiteintrag.datum,
+        ))
         db.commit()
     return db_zeiteintrag
 
+# ---------- Burndown (geplante vs. gebuchte Stunden) ----------
+# Results live in report_cache (per project, projekt_id None is the portfolio view) over
+# the whole time range, so every write that notifies a change of the project - booked
+# entries, tasks and their planned hours, archiving - drops them in all workers.
+
+def _query_burndown(db: Session, projekt_id: int | None = None) -> list[dict]:
+    """
+    Aggregates planned vs. booked hours per project, task and week in a single
+    GROUP BY query. Tasks without entries show up with woche=None and 0 hours.
+    """
+    woche = week_start(models.Zeiteintrag.datum).label("woche")
+    query = db.query(
+        models.Projekt.id,
+        models.Projekt.name,
+        models.Aufgabe.id,
+        models.Aufgabe.name,
+        models.Aufgabe.geplante_stunden,
+        woche,
+        func.coalesce(func.sum(models.Zeiteintrag.stunden), 0),
+    ).outerjoin(
+        models.Aufgabe, models.Aufgabe.projekt_id == models.Projekt.id
+    ).outerjoin(
+        models.Zeiteintrag, models.Zeiteintrag.aufgabe_id == models.Aufgabe.id
+    ).group_by(
+        models.Projekt.id, models.Projekt.name,
+        models.Aufgabe.id, models.Aufgabe.name, models.Aufgabe.geplante_stunden,
+        woche
+    )
+    if projekt_id is not None:
+        query = query.filter(models.Projekt.id == projekt_id)
+    else:
+        query = query.filter(models.Projekt.geloescht_am.is_(None))
+
+    projekte: dict[int, dict] = {}
+    aufgaben: dict[int, dict] = {}
+    for p_id, p_name, a_id, a_name, geplant, woche_start, ist in query.all():
+        projekt = projekte.setdefault(p_id, {
+            "projekt_id": p_id,
+            "projekt_name": p_name,
+            "aufgaben": [],
+            "wochen": {},
+        })
+        if a_id is None:
+            continue
+        aufgabe = aufgaben.get(a_id)
+        if aufgabe is None:
+            aufgabe = {
+                "aufgabe_id": a_id,
+                "name": a_name,
+                "geplante_stunden": float(geplant) if geplant is not None else None,
+                "ist_stunden": 0.0,
+            }
+            aufgaben[a_id] = aufgabe
+            projekt["aufgaben"].append(aufgabe)
+        aufgabe["ist_stunden"] += float(ist)
+        if woche_start is not None:
+            projekt["wochen"][woche_start] = projekt["wochen"].get(woche_start, 0.0) + float(ist)
+
+    result = []
+    for projekt in projekte.values():
+        geplant_gesamt = sum(a["geplante_stunden"] or 0.0 for a in projekt["aufgaben"])
+        for aufgabe in projekt["aufgaben"]:
+            aufgabe["ist_stunden"] = round(aufgabe["ist_stunden"], 2)
+            aufgabe["verbrauch_prozent"] = _verbrauch_prozent(aufgabe["ist_stunden"], aufgabe["geplante_stunden"])
+
+        wochen = []
+        kumuliert = 0.0
+        for woche_start in sorted(projekt["wochen"]):
+            ist = projekt["wochen"][woche_start]
+            kumuliert += ist
+            wochen.append({
+                "woche": woche_start,
+                "ist_stunden": round(ist, 2),
+                "kumuliert": round(kumuliert, 2),
+                "rest_stunden": round(geplant_gesamt - kumuliert, 2),
+            })
+
+        result.append({
+            "projekt_id": projekt["projekt_id"],
+            "projekt_name": projekt["projekt_name"],
+            "geplante_stunden": round(geplant_gesamt, 2),
+            "ist_stunden": round(kumuliert, 2),
+            "verbrauch_prozent": _verbrauch_prozent(kumuliert, geplant_gesamt),
+            "aufgaben": projekt["aufgaben"],
+            "wochen": wochen,
+        })
+    return result
+
+def _verbrauch_prozent(ist: float, geplant: float | None) -> float | None:
+    if not geplant:
+        return None
+    return round(ist / geplant * 100, 1)
+
+def _burndown_alerts(burndown: dict, threshold: float) -> list[dict]:
+    alerts = []
+    if burndown["verbrauch_prozent"] is not None and burndown["verbrauch_prozent"] >= threshold:
+        alerts.append({"aufgabe_id": None, "name": burndown["projekt_name"], "verbrauch_prozent": burndown["verbrauch_prozent"]})
+    for aufgabe in burndown["aufgaben"]:
+        if aufgabe["verbrauch_prozent"] is not None and aufgabe["verbrauch_prozent"] >= threshold:
+            alerts.append({"aufgabe_id": aufgabe["aufgabe_id"], "name": aufgabe["name"], "verbrauch_prozent": aufgabe["verbrauch_prozent"]})
+    return alerts
+
+def _get_cached_burndown(db: Session, projekt_id: int | None) -> list[dict]:
+    key = report_cache.ReportKey("burndown", None, projekt_id, date.min, date.max, "week")
+    return report_cache.get_or_compute(key, lambda: _query_burndown(db, projekt_id))
+
+def get_projekt_burndown(db: Session, projekt_id: int, threshold: float | None = None) -> dict | None:
+    """
+    Planned vs. booked hours of one project, per task and per week.
+    If threshold (percent of plan) is given, tasks at or above it are listed in "alerts".
+    """
+    result = _get_cached_burndown(db, projekt_id)
+    if not result:
+        return None
+    burndown = dict(result[0])
+    burndown["alerts"] = _burndown_alerts(burndown, threshold) if threshold is not None else []
+    return burndown
+
+def get_portfolio_burndown(db: Session, threshold: float | None = None) -> list[dict]:
+    """Burndown of all projects, computed with the same single query as get_projekt_burndown."""
+    portfolio = []
+    for entry in _get_cached_burndown(db, None):
+        burndown = dict(entry)
+        burndown["alerts"] = _burndown_alerts(burndown, threshold) if threshold is not None else []
+        portfolio.append(burndown)
+    return portfolio
+
 # ---------- AbwesenheitTyp CRUD ----------
 def get_abwesenheit_typ(db: Session, abwesenheit_typ_id: int) -> models.AbwesenheitTyp | None:
     return db.query(models.AbwesenheitTyp).filter(models.AbwesenheitTyp.id == abwesenheit_typ_id).first()
@@ -404,6 +760,7 @@ def get_abwesenheit_typen(db: Session, skip: int = 0, limit: int = 100) -> list[
 def create_abwesenheit_typ(db: Session, abwesenheit_typ: schemas.AbwesenheitTypCreate) -> models.AbwesenheitTyp:
     db_abwesenheit_typ = models.AbwesenheitTyp(**abwesenheit_typ.model_dump())
     db.add(db_abwesenheit_typ)
+    refdata_cache.notify_change(db, "abwesenheit_typen")
     db.commit()
     db.refresh(db_abwesenheit_typ)
     return db_abwesenheit_typ
@@ -414,6 +771,7 @@ def update_abwesenheit_typ(db: Session, abwesenheit_typ_id: int, abwesenheit_typ
         update_data = abwesenheit_typ_update.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_abwesenheit_typ, key, value)
+        refdata_cache.notify_change(db, "abwesenheit_typen")
         db.commit()
         db.refresh(db_abwesenheit_typ)
     return db_abwesenheit_typ
@@ -422,6 +780,7 @@ def delete_abwesenheit_typ(db: Session, abwesenheit_typ_id: int) -> models.Abwes
     db_abwesenheit_typ = get_abwesenheit_typ(db, abwesenheit_typ_id)
     if db_abwesenheit_typ:
         db.delete(db_abwesenheit_typ)
+        refdata_cache.notify_change(db, "abwesenheit_typen")
         db.commit()
     return db_abwesenheit_typ
 
@@ -437,17 +796,47 @@ def get_abwesenheiten(db: Session, skip: int = 0, limit: int = 100, benutzer_id:
         joinedload(models.Abwesenheit.abwesenheit_typ),
         joinedload(models.Abwesenheit.benutzer)
     )
+    query = query.filter(*_abwesenheit_filters(benutzer_id, abwesenheit_typ_id, status, start_datum, end_datum))
+    return query.offset(skip).limit(limit).all()
+
+def _abwesenheit_filters(benutzer_id: int | None, abwesenheit_typ_id: int | None, status: str | None, start_datum: date | None, end_datum: date | None) -> list:
+    conditions = []
     if benutzer_id is not None:
-        query = query.filter(models.Abwesenheit.benutzer_id == benutzer_id)
+        conditions.append(models.Abwesenheit.benutzer_id == benutzer_id)
     if abwesenheit_typ_id is not None:
-        query = query.filter(models.Abwesenheit.abwesenheit_typ_id == abwesenheit_typ_id)
+        conditions.append(models.Abwesenheit.abwesenheit_typ_id == abwesenheit_typ_id)
     if status is not None:
-        query = query.filter(models.Abwesenheit.status == status)
+        conditions.append(models.Abwesenheit.status == status)
     if start_datum is not None:
-        query = query.filter(models.Abwesenheit.start_datum >= start_datum)
+        conditions.append(models.Abwesenheit.start_datum >= start_datum)
     if end_datum is not None:
-        query = query.filter(models.Abwesenheit.end_datum <= end_datum)
-    return query.offset(skip).limit(limit).all()
+        conditions.append(models.Abwesenheit.end_datum <= end_datum)
+    return conditions
+
+def get_abwesenheiten_rows(db: Session, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, abwesenheit_typ_id: int | None = None, status: str | None = None, start_datum: date | None = None, end_datum: date | None = None) -> list:
+    """
+    Same filters as get_abwesenheiten, but selects only the columns of schemas.Abwesenheit
+    as plain rows (no ORM objects). The list endpoint uses the async variant
+    below, the rows are turned into response dicts by fast_json.py.
+    """
+    return db.execute(_abwesenheiten_rows_stmt(skip, limit, benutzer_id, abwesenheit_typ_id, status, start_datum, end_datum)).all()
+
+async def get_abwesenheiten_rows_async(db: AsyncSession, skip: int = 0, limit: int = 100, benutzer_id: int | None = None, abwesenheit_typ_id: int | None = None, status: str | None = None, start_datum: date | None = None, end_datum: date | None = None) -> list:
+    result = await db.execute(_abwesenheiten_rows_stmt(skip, limit, benutzer_id, abwesenheit_typ_id, status, start_datum, end_datum))
+    return result.all()
+
+def _abwesenheiten_rows_stmt(skip: int, limit: int, benutzer_id: int | None, abwesenheit_typ_id: int | None, status: str | None, start_datum: date | None, end_datum: date | None):
+    a = models.Abwesenheit
+    return select(
+        a.start_datum, a.end_datum, a.grund, a.status,
+        a.id, a.benutzer_id, a.abwesenheit_typ_id, a.genehmigt_von_benutzer_id, a.kommentar_genehmiger,
+        a.erstellt_am, a.aktualisiert_am,
+        models.AbwesenheitTyp.name.label("typ_name"), models.AbwesenheitTyp.beschreibung.label("typ_beschreibung"),
+    ).join(
+        models.AbwesenheitTyp, a.abwesenheit_typ_id == models.AbwesenheitTyp.id
+    ).where(
+        *_abwesenheit_filters(benutzer_id, abwesenheit_typ_id, status, start_datum, end_datum)
+    ).offset(skip).limit(limit)
 
 def get_abwesenheiten_by_benutzer(db: Session, benutzer_id: int, skip: int = 0, limit: int = 100) -> list[models.Abwesenheit]:
     return db.query(models.Abwesenheit).options(
@@ -455,14 +844,24 @@ def get_abwesenheiten_by_benutzer(db: Session, benutzer_id: int, skip: int = 0,
         joinedload(models.Abwesenheit.benutzer)
     ).filter(models.Abwesenheit.benutzer_id == benutzer_id).offset(skip).limit(limit).all()
 
-def create_abwesenheit(db: Session, abwesenheit: schemas.AbwesenheitCreate, beantragt_von_benutzer_id: int = None) -> models.Abwesenheit:
+def add_abwesenheit(db: Session, abwesenheit: schemas.AbwesenheitCreate, beantragt_von_benutzer_id: int = None) -> models.Abwesenheit:
+    """Legt die Abwesenheit an, ohne zu committen (nur flush). Nach dem Commit abwesenheit_created aufrufen."""
     db_abwesenheit = models.Abwesenheit(**abwesenheit.model_dump())
     if beantragt_von_benutzer_id:
         db_abwesenheit.beantragt_von_benutzer_id = beantragt_von_benutzer_id
     db.add(db_abwesenheit)
+    db.flush()
+    return db_abwesenheit
+
+def create_abwesenheit(db: Session, abwesenheit: schemas.AbwesenheitCreate, beantragt_von_benutzer_id: int = None) -> models.Abwesenheit:
+    db_abwesenheit = add_abwesenheit(db, abwesenheit, beantragt_von_benutzer_id)
     db.commit()
     db.refresh(db_abwesenheit)
-    
+    abwesenheit_created(db, db_abwesenheit, beantragt_von_benutzer_id)
+    return db_abwesenheit
+
+def abwesenheit_created(db: Session, db_abwesenheit: models.Abwesenheit, beantragt_von_benutzer_id: int = None) -> None:
+    """Nach dem Commit einer neuen Abwesenheit: E-Mail an den Benutzer."""
     # Send email notification about new absence request
     try:
         from email_utils import send_absence_notification
@@ -503,10 +902,8 @@ def create_abwesenheit(db: Session, abwesenheit: schemas.AbwesenheitCreate, bean
                         comment
                     )
     except Exception as e:
-        print(f"Failed to send absence creation notification: {str(e)}")
+        logger.warning("Failed to send absence creation notification: %s", e)
         # Continue even if email notification fails
-        
-    return db_abwesenheit
 
 def update_abwesenheit(db: Session, abwesenheit_id: int, abwesenheit_update: schemas.AbwesenheitUpdate, genehmiger_id: int = None) -> models.Abwesenheit | None:
     db_abwesenheit = get_abwesenheit(db, abwesenheit_id)
@@ -528,6 +925,7 @@ def update_abwesenheit(db: Session, abwesenheit_id: int, abwesenheit_update: sch
         # Check if status has changed and send notification
         new_status = db_abwesenheit.status
         if new_status != old_status and new_status in ['genehmigt', 'abgelehnt']:
+            metrics.ABSENCES_DECIDED.labels(new_status).inc()
             try:
                 from email_utils import send_absence_notification
                 
@@ -553,7 +951,7 @@ def update_abwesenheit(db: Session, abwesenheit_id: int, abwesenheit_update: sch
                         db_abwesenheit.kommentar_genehmiger
                     )
             except Exception as e:
-                print(f"Failed to send absence notification: {str(e)}")
+                logger.warning("Failed to send absence notification: %s", e)
                 # Continue even if email notification fails
                 
     return db_abwesenheit
@@ -570,8 +968,7 @@ def update_password(db: Session, benutzer_id: int, new_password: str):
     """Update user password"""
     db_benutzer = db.query(models.Benutzer).filter(models.Benutzer.id == benutzer_id).first()
     if db_benutzer:
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        db_benutzer.passwort_hash = pwd_context.hash(new_password)
+        db_benutzer.passwort_hash = get_password_hash(new_password)
         db.commit()
         db.refresh(db_benutzer)
         
@@ -585,7 +982,7 @@ def update_password(db: Session, benutzer_id: int, new_password: str):
                     user_name
                 )
         except Exception as e:
-            print(f"Failed to send password change notification: {str(e)}")
+            logger.warning("Failed to send password change notification: %s", e)
             # Continue even if email notification fails
             
         return db_benutzer
@@ -665,14 +1062,14 @@ def create_initial_data(db: Session):
                 ist_aktiv=True
             )
             create_benutzer(db, benutzer=admin_user)
-            print(f"Default admin user '{admin_username}' created with password 'adminpassword'. Please change this password immediately.")
+            logger.warning("Default admin user '%s' created with password 'adminpassword'. Please change this password immediately.", admin_username)
         else:
-            print("Admin role not found. Could not create default admin user.")
+            logger.error("Admin role not found. Could not create default admin user.")
     else:
-        print(f"Admin user '{admin_username}' already exists.")
+        logger.info("Admin user '%s' already exists.", admin_username)
 
     # You can add more initial data here, e.g., a default project or task
     # default_projekt_name = "Internes Projekt"
     # if not db.query(models.Projekt).filter(models.Projekt.name == default_projekt_name).first():
     #     create_projekt(db, projekt=schemas.ProjektCreate(name=default_projekt_name, beschreibung="Standard internes Projekt"))
-    #     print(f"Default project '{default_projekt_name}' created.")
+    #     logger.info("Default project '%s' created.", default_projekt_name)
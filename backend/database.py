@@ -46,11 +46,19 @@ def init_db():
 """
 # Neue Struktur 
 
+import logging
 import os
 import sys
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+import sqlite_engine
+
+logger = logging.getLogger(__name__)
 
 # 1. Wir suchen die URL in verschiedenen Umgebungsvariablen
 # Render nutzt manchmal INTERNAL_DATABASE_URL für private Verbindungen
@@ -60,10 +68,10 @@ if DATABASE_URL:
     # Fix für SQLAlchemy (postgres:// wird abgewiesen, muss postgresql:// sein)
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    print(f"✅ DATABASE_URL aus Umgebungsvariablen gefunden.")
+    logger.info("DATABASE_URL aus Umgebungsvariablen gefunden.")
 else:
     # 2. Fallback: Lokale Entwicklung (Docker Compose Standardwerte)
-    print(f"⚠️ Keine DATABASE_URL gefunden. Nutze Fallback-Werte (lokal).")
+    logger.warning("Keine DATABASE_URL gefunden. Nutze Fallback-Werte (lokal).")
     DB_USER = os.getenv("POSTGRES_USER", "pm_user")
     DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
     DB_SERVICE_NAME = os.getenv("DATABASE_SERVICE_NAME", "db")
@@ -72,26 +80,191 @@ else:
     
     DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_SERVICE_NAME}:{DB_PORT}/{DB_NAME}"
 
+# Eingebettetes SQLite (DATABASE_URL=sqlite:///pfad/zur/datei.db oder sqlite:// für
+# In-Memory) statt Postgres, Details in sqlite_engine.py
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
 # Sicherheits-Log (Passwort verstecken)
 try:
     safe_host = DATABASE_URL.split("@")[1].split("/")[0]
-    print(f"🔌 Versuche Verbindung zu Host: {safe_host}")
+    logger.info("Versuche Verbindung zu Host: %s", safe_host)
 except:
-    print("🔌 Versuche Verbindung (URL konnte nicht geparst werden)")
+    logger.info("Versuche Verbindung (URL konnte nicht geparst werden)")
+
+# Pool pro Prozess; launcher.py rechnet damit die Worker-Anzahl gegen das Verbindungsbudget
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# Treiber der synchronen Engines: psycopg2 (Standard) oder psycopg 3 (DB_DRIVER=psycopg).
+# psycopg 3 bereitet Statements, die auf einer Verbindung DB_PREPARE_THRESHOLD-mal
+# gelaufen sind, serverseitig vor (kein erneutes Parsen/Planen).
+# DB_PREPARE_THRESHOLD=0 schaltet das Vorbereiten ab (nötig hinter PgBouncer im Transaction-Modus).
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2").lower()
+PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "2"))
+if DB_DRIVER not in ("psycopg2", "psycopg"):
+    raise ValueError(f"DB_DRIVER muss psycopg2 oder psycopg sein, nicht {DB_DRIVER!r}")
+if DB_DRIVER == "psycopg" and psycopg is None:
+    logger.warning("DB_DRIVER=psycopg, aber psycopg 3 ist nicht installiert. Nutze psycopg2.")
+    DB_DRIVER = "psycopg2"
+
+def sync_database_url(url: str):
+    """The URL with the configured sync driver (DATABASE_URL may name any postgres driver or none)."""
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return url
+    return url.set(drivername=f"postgresql+{DB_DRIVER}")
 
-# Engine erstellen
+def _engine_options() -> dict:
+    options = {"pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW}
+    if DB_DRIVER == "psycopg":
+        options["connect_args"] = {"prepare_threshold": PREPARE_THRESHOLD or None}
+    return options
+
+# Engine erstellen. Mit SQLite ist das die eine Schreib-Verbindung, gelesen wird
+# über reader_engine (WAL-Modus, Lesende blockieren den Schreibenden nicht).
+reader_engine = None
 try:
-    engine = create_engine(DATABASE_URL)
+    if IS_SQLITE:
+        engine = sqlite_engine.create_writer(DATABASE_URL)
+        reader_engine = sqlite_engine.create_reader(DATABASE_URL, POOL_SIZE, MAX_OVERFLOW)
+    else:
+        engine = create_engine(sync_database_url(DATABASE_URL), **_engine_options())
 except Exception as e:
-    print(f"❌ KRITISCHER FEHLER beim Erstellen der DB-Engine: {e}")
-    raise e
+    logger.critical("KRITISCHER FEHLER beim Erstellen der DB-Engine: %s", e)
+    raise
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optionale Read-Replica (z.B. Streaming-Replica) für Listen, Reports und Exporte.
+# Ohne REPLICA_DATABASE_URL laufen alle Abfragen gegen den Primary.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+if REPLICA_DATABASE_URL and REPLICA_DATABASE_URL.startswith("postgres://"):
+    REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+replica_engine = None
+if REPLICA_DATABASE_URL and IS_SQLITE:
+    logger.warning("REPLICA_DATABASE_URL wird mit SQLite ignoriert.")
+elif REPLICA_DATABASE_URL:
+    try:
+        replica_engine = create_engine(sync_database_url(REPLICA_DATABASE_URL), **_engine_options())
+        logger.info("Read-Replica konfiguriert: %s", make_url(REPLICA_DATABASE_URL).host)
+    except Exception as e:
+        logger.critical("KRITISCHER FEHLER beim Erstellen der Replica-Engine: %s", e)
+        raise
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from the replica when it was opened for a read-only handler
+    (info["replica"] = True, see replica.py). Flushes and DML always go to the primary,
+    and after the first write the session stays on the primary, so it reads its own writes.
+    With SQLite every session reads from the reader pool until it writes.
+    """
+    primary = engine
+    replica = replica_engine if replica_engine is not None else reader_engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("replica") and self.replica is not None:
+            if not self._flushing and not (clause is not None and getattr(clause, "is_dml", False)):
+                return self.replica
+            self.info["replica"] = False
+        return self.primary
+
+
+@contextmanager
+def on_primary(db: Session):
+    """Temporarily sends the reads of a replica session to the primary (e.g. for cached data)."""
+    if reader_engine is not None:
+        # SQLite-Leser sehen jeden Commit, kein Grund, die Schreib-Verbindung zu belegen
+        yield db
+        return
+    replica = db.info.get("replica", False)
+    db.info["replica"] = False
+    try:
+        yield db
+    finally:
+        db.info["replica"] = replica
+
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine,
+    info={"replica": reader_engine is not None},
+)
 Base = declarative_base()
 
+if reader_engine is not None:
+    @event.listens_for(RoutingSession, "after_transaction_end")
+    def _reads_back_to_reader(session, transaction):
+        # The writer connection is free again after commit/rollback; the next reads
+        # start a new WAL snapshot on a reader, which already contains the commit
+        if transaction.parent is None:
+            session.info["replica"] = True
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# Async-Engine (asyncpg) für die Auth-Dependency und die heißen Lese-Endpunkte,
+# damit diese den Event-Loop nicht blockieren und nicht auf den Threadpool warten.
+# Eigener Pool neben dem synchronen; launcher.py zählt beide zum Verbindungsbudget.
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "5"))
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str):
+    """Same database with the async driver; asyncpg calls psycopg2's sslmode parameter ssl."""
+    url = make_url(url)
+    query = dict(url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}", query=query)
+
+try:
+    if IS_SQLITE:
+        async_engine = sqlite_engine.create_async_reader(DATABASE_URL, ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW)
+    else:
+        async_engine = create_async_engine(
+            async_database_url(DATABASE_URL), pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_MAX_OVERFLOW,
+        )
+except Exception as e:
+    logger.critical("KRITISCHER FEHLER beim Erstellen der Async-DB-Engine: %s", e)
+    raise
+
+async_replica_engine = None
+if REPLICA_DATABASE_URL:
+    async_replica_engine = create_async_engine(
+        async_database_url(REPLICA_DATABASE_URL), pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_MAX_OVERFLOW,
+    )
+
+
+class AsyncRoutingSession(RoutingSession):
+    """Sync side of the async sessions; routes between the sync_engines of the async engines."""
+    primary = async_engine.sync_engine
+    replica = async_replica_engine.sync_engine if async_replica_engine is not None else None
+
+
+# expire_on_commit=False: geladene Objekte bleiben nach dem Commit lesbar, ohne dass
+# ein Attributzugriff außerhalb von await nachladen muss
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=AsyncRoutingSession,
+    autoflush=False, expire_on_commit=False,
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def sync_engines() -> list:
+    """All pools of this process as sync engines (the async ones via sync_engine), for events and dispose."""
+    engines = [engine, async_engine.sync_engine]
+    if reader_engine is not None:
+        engines.append(reader_engine)
+    if replica_engine is not None:
+        engines += [replica_engine, async_replica_engine.sync_engine]
+    return engines
@@ -7,9 +7,8 @@ from datetime import date, datetime, timedelta
 import logging
 from typing import Optional, Tuple
 
-# Configure logging
-log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-logging.basicConfig(level=logging.INFO, format=log_format, handlers=[logging.StreamHandler()])
+import metrics
+
 logger = logging.getLogger(__name__)
 
 # Email server configuration
@@ -62,14 +61,16 @@ def send_email(to_email: str, subject: str, message_html: str, message_text: Opt
         msg.attach(MIMEText(message_html, 'html', 'utf-8'))
 
         context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.send_message(msg)
-            logger.info(f"Email sent successfully to {to_email}")
-            return True, None
+        with metrics.EMAIL_LATENCY.time():
+            with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
+                server.login(SMTP_USERNAME, SMTP_PASSWORD)
+                server.send_message(msg)
+        logger.info(f"Email sent successfully to {to_email}")
+        return True, None
 
     except Exception as e:
         error_message = str(e)
+        metrics.EMAIL_FAILURES.inc()
         logger.error(f"Failed to send email to {to_email}: {error_message}")
         return False, error_message
 
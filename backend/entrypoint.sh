@@ -8,18 +8,12 @@ wait_for_pg() {
     echo "PostgreSQL is ready!"
 }
 
-# Function to apply database migrations
-apply_migrations() {
-    echo "Applying database migrations..."
-    python apply_migration.py
-    echo "Migrations completed!"
-}
-
 # Function to start the application
 start_app() {
     if [ "$ENVIRONMENT" = "production" ]; then
         echo "Starting application in production mode..."
-        gunicorn main:app -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000
+        # Tables, migrations and initial data are prepared once in the gunicorn master
+        exec python launcher.py
     else
         echo "Starting application in development mode..."
         uvicorn main:app --host 0.0.0.0 --port 8000 --reload
@@ -28,6 +22,9 @@ start_app() {
 
 # Main execution
 echo "Starting service with ENVIRONMENT=$ENVIRONMENT"
-wait_for_pg
-apply_migrations
+# Embedded SQLite (DATABASE_URL=sqlite:///...) has no server to wait for
+case "$DATABASE_URL" in
+    sqlite*) ;;
+    *) wait_for_pg ;;
+esac
 start_app
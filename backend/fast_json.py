@@ -0,0 +1,89 @@
+# fast_json.py - Opt-in fast JSON path for the large list endpoints
+#
+# The time entry and absence lists are read as plain column rows (crud.get_*_rows_async)
+# and turned into dicts here. With FAST_JSON_LISTS=1 (and orjson installed) the dicts
+# are serialized with orjson, skipping per-row Pydantic validation; otherwise they go
+# through response_model as usual. The output has to stay identical to
+# what FastAPI produces for schemas.Zeiteintrag/schemas.Abwesenheit: same key order,
+# same value formats for the installed Pydantic major version.
+
+import os
+from decimal import Decimal
+
+import pydantic
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENABLED = orjson is not None and os.getenv("FAST_JSON_LISTS", "false").lower() in ("1", "true", "yes")
+
+PYDANTIC_V2 = pydantic.VERSION.startswith("2")
+
+if orjson is not None:
+    # Pydantic v2 writes UTC datetimes with a "Z" suffix, v1 (isoformat) with "+00:00"
+    _OPTIONS = orjson.OPT_UTC_Z if PYDANTIC_V2 else 0
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        # Pydantic v2 serializes Decimal as string, v1 goes through jsonable_encoder (int/float)
+        return str(value) if PYDANTIC_V2 else decimal_encoder(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _response(items: list) -> Response:
+    return Response(content=orjson.dumps(items, default=_default, option=_OPTIONS), media_type="application/json")
+
+
+def zeiteintrag_dict(row) -> dict:
+    """Row from crud.get_zeiteintraege_rows in the field order of schemas.Zeiteintrag."""
+    return {
+        "datum": row.datum,
+        "startzeit": row.startzeit,
+        "endzeit": row.endzeit,
+        "stunden": row.stunden,
+        "beschreibung": row.beschreibung,
+        "ist_abrechenbar": row.ist_abrechenbar,
+        "id": row.id,
+        "benutzer_id": row.benutzer_id,
+        "aufgabe_id": row.aufgabe_id,
+        "projekt_id": row.projekt_id,
+        "erstellt_am": row.erstellt_am,
+        "aktualisiert_am": row.aktualisiert_am,
+        "projekt": {"id": row.projekt_ref_id, "name": row.projekt_name} if row.projekt_ref_id is not None else None,
+        "aufgabe": {"id": row.aufgabe_ref_id, "name": row.aufgabe_name} if row.aufgabe_ref_id is not None else None,
+    }
+
+
+def abwesenheit_dict(row) -> dict:
+    """Row from crud.get_abwesenheiten_rows in the field order of schemas.Abwesenheit."""
+    return {
+        "start_datum": row.start_datum,
+        "end_datum": row.end_datum,
+        "grund": row.grund,
+        "status": row.status,
+        "id": row.id,
+        "benutzer_id": row.benutzer_id,
+        "abwesenheit_typ_id": row.abwesenheit_typ_id,
+        "genehmigt_von_benutzer_id": row.genehmigt_von_benutzer_id,
+        "kommentar_genehmiger": row.kommentar_genehmiger,
+        "erstellt_am": row.erstellt_am,
+        "aktualisiert_am": row.aktualisiert_am,
+        "abwesenheit_typ": {
+            "name": row.typ_name,
+            "beschreibung": row.typ_beschreibung,
+            "id": row.abwesenheit_typ_id,
+        },
+    }
+
+
+def zeiteintraege_response(rows) -> Response:
+    return _response([zeiteintrag_dict(row) for row in rows])
+
+
+def abwesenheiten_response(rows) -> Response:
+    return _response([abwesenheit_dict(row) for row in rows])
@@ -0,0 +1,77 @@
+# gunicorn.conf.py - Settings and server hooks for the production server
+#
+# Usage: python launcher.py (or gunicorn -c gunicorn.conf.py main:app)
+
+import os
+
+import launcher
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = launcher.worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+pidfile = launcher.PIDFILE
+
+# Import the app once in the master; workers share the imported code copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+# Recycle workers after a number of requests (limits slow memory growth); the jitter
+# keeps them from all restarting at the same moment
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# Time running requests get to finish on SIGTERM/SIGHUP before the worker is killed
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def on_starting(server):
+    # Master, before the first fork: one-time startup side effects
+    import logging_config
+    logging_config.setup_logging()
+    launcher.prepare()
+    # Do not hand the master's pooled connections down to the workers
+    from database import sync_engines
+    for engine in sync_engines():
+        engine.dispose()
+    launcher.check_startup_budget("prepare")
+
+
+def when_ready(server):
+    launcher.check_startup_budget("master ready")
+    # One process running the queued report jobs (report_jobs.py) next to the workers
+    import report_jobs
+    server.report_runner = report_jobs.spawn_runner()
+
+
+def on_exit(server):
+    import report_jobs
+    report_jobs.stop_runner(getattr(server, "report_runner", None))
+
+
+_forks = 0
+
+
+def pre_fork(server, worker):
+    # Only the initial workers count against the startup budget, not the ones
+    # replacing recycled workers or started by a reload
+    global _forks
+    _forks += 1
+    if _forks > server.num_workers:
+        os.environ.pop(launcher.STARTED_AT_ENV, None)
+
+
+def post_fork(server, worker):
+    # The queue listener thread and the pooled sockets of the master do not survive
+    # the fork in a usable state: restart logging, drop inherited connections
+    import logging_config
+    logging_config.setup_logging()
+    from database import sync_engines
+    for engine in sync_engines():
+        engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the Prometheus files of the dead worker so its gauges are not summed anymore
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,206 @@
+# idempotency.py - Idempotency-Key support for POST endpoints
+#
+# Clients (api_error_handler.js after a token refresh, nginx proxy_next_upstream, users
+# clicking twice) may send the same POST more than once. When the request carries an
+# Idempotency-Key header, the first request claims (user, key) in idempotency_keys,
+# runs the write and stores the response. Repeats of the same request get the stored
+# response back (with Idempotent-Replayed: true) without running the write again.
+#
+# - Same key with a different body: 422
+# - Same key while the first request is still running: 409, the client retries later
+# - The write and the stored response are committed together; failed writes release
+#   the key, so the request can be retried with it
+# - A claim without response older than IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS belongs to a
+#   request whose worker died (gunicorn kills workers after GUNICORN_TIMEOUT) and is
+#   claimed anew; its write was not committed either.
+# Keys expire after IDEMPOTENCY_TTL_HOURS; expired rows are removed periodically.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+CLAIM_TIMEOUT = timedelta(seconds=float(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", "120")))
+CLEANUP_INTERVAL_SECONDS = 600
+
+_cleanup_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def request_hash(payload) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cleanup_expired(db: Session) -> int:
+    result = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.ablauf_am < datetime.now(timezone.utc)))
+    db.commit()
+    return result.rowcount
+
+
+def _maybe_cleanup(db: Session) -> None:
+    global _last_cleanup
+    now = time.monotonic()
+    if now - _last_cleanup < CLEANUP_INTERVAL_SECONDS or not _cleanup_lock.acquire(blocking=False):
+        return
+    try:
+        _last_cleanup = now
+        removed = cleanup_expired(db)
+        if removed:
+            logger.info("Removed %d expired idempotency keys", removed)
+    except Exception:
+        db.rollback()
+        logger.exception("Cleanup of expired idempotency keys failed")
+    finally:
+        _cleanup_lock.release()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite returns naive datetimes
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _claim(db: Session, benutzer_id: int, key: str, endpoint: str, body_hash: str) -> models.IdempotencyKey | None:
+    """Claims the key for this request. Returns the existing entry if another request already holds it."""
+    now = datetime.now(timezone.utc)
+    for _ in range(2):
+        db.add(models.IdempotencyKey(
+            benutzer_id=benutzer_id, schluessel=key, endpunkt=endpoint,
+            anfrage_hash=body_hash, ablauf_am=now + TTL,
+        ))
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        existing = db.get(models.IdempotencyKey, (benutzer_id, key), populate_existing=True)
+        if existing is None:
+            continue  # released in the meantime, claim again
+        abandoned = existing.antwort_status is None and _aware(existing.erstellt_am) < now - CLAIM_TIMEOUT
+        if _aware(existing.ablauf_am) > now and not abandoned:
+            return existing
+        if abandoned:
+            logger.warning("Reclaiming abandoned idempotency key of user %s for %s", benutzer_id, endpoint)
+        # Only this entry: a concurrent request may have replaced it already
+        db.execute(delete(models.IdempotencyKey).where(
+            models.IdempotencyKey.benutzer_id == benutzer_id,
+            models.IdempotencyKey.schluessel == key,
+            models.IdempotencyKey.erstellt_am == existing.erstellt_am,
+        ))
+        db.commit()
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency-Key konnte nicht reserviert werden.")
+
+
+def _release(db: Session, benutzer_id: int, key: str) -> None:
+    db.rollback()
+    db.execute(delete(models.IdempotencyKey).where(
+        models.IdempotencyKey.benutzer_id == benutzer_id,
+        models.IdempotencyKey.schluessel == key,
+        models.IdempotencyKey.antwort_status.is_(None),
+    ))
+    db.commit()
+
+
+def _serialize(result, response_model) -> object:
+    if response_model is None:
+        return jsonable_encoder(result)
+    return jsonable_encoder(response_model.model_validate(result, from_attributes=True))
+
+
+def run(
+    db: Session,
+    benutzer_id: int,
+    key: str | None,
+    endpoint: str,
+    payload,
+    write: Callable[[], object],
+    response_model=None,
+    status_code: int = status.HTTP_201_CREATED,
+    after_commit: Callable[[object], None] | None = None,
+):
+    """
+    Runs write() at most once per (user, key). write() only adds and flushes (e.g.
+    crud.add_zeiteintrag); run() commits it, with a key together with the stored response,
+    so a crash or error either keeps both or neither. after_commit(result) runs once the
+    write is committed (metrics, emails). Without a key the result is returned to FastAPI
+    unchanged; with a key the serialized response is stored and returned as JSONResponse.
+    """
+    if key and len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{HEADER} darf höchstens {MAX_KEY_LENGTH} Zeichen lang sein.")
+    if not key:
+        try:
+            result = write()
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        db.refresh(result)
+        _after_commit(after_commit, result)
+        return result
+
+    _maybe_cleanup(db)
+    body_hash = request_hash(payload)
+    existing = _claim(db, benutzer_id, key, endpoint, body_hash)
+    if existing is not None:
+        if existing.endpunkt != endpoint or existing.anfrage_hash != body_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{HEADER} wurde bereits für eine andere Anfrage verwendet.",
+            )
+        if existing.antwort_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Eine Anfrage mit diesem Idempotency-Key wird noch verarbeitet.",
+            )
+        logger.info("Replaying stored response for %s (idempotency key of user %s)", endpoint, benutzer_id)
+        return JSONResponse(
+            content=json.loads(existing.antwort_body),
+            status_code=existing.antwort_status,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        result = write()
+        # Server defaults (erstellt_am) for the response, still in the same transaction
+        db.refresh(result)
+        content = _serialize(result, response_model)
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.benutzer_id == benutzer_id,
+            models.IdempotencyKey.schluessel == key,
+        ).update({"antwort_status": status_code, "antwort_body": json.dumps(content)}, synchronize_session=False)
+        db.commit()
+    except BaseException:
+        # Nothing of the write was committed, the request can be retried with the key
+        _release(db, benutzer_id, key)
+        raise
+    _after_commit(after_commit, result)
+    return JSONResponse(content=content, status_code=status_code)
+
+
+def _after_commit(after_commit: Callable[[object], None] | None, result) -> None:
+    if after_commit is None:
+        return
+    try:
+        after_commit(result)
+    except Exception:
+        # The write is committed; a failed notification must not make the client retry it
+        logger.exception("Post-commit step after an idempotent write failed")
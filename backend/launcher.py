@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Production launcher: starts gunicorn with uvicorn workers via gunicorn.conf.py.
+
+    python launcher.py                   start the server (replaces this process)
+    python launcher.py workers           print the computed worker count and exit
+    python launcher.py reload            gracefully restart all workers (SIGHUP)
+    python launcher.py reload --upgrade  start a new master with new code, then stop the old one
+
+The worker count is the smaller of the CPU based count (2 * CPUs + 1, honouring
+affinity and cgroup quotas) and the number of workers the database connection
+budget allows (DB_CONNECTION_BUDGET / connections per worker). GUNICORN_WORKERS
+overrides both.
+
+The app is preloaded in the master so imported code is shared copy-on-write between
+workers. prepare() (tables, migrations, initial data) runs once in the master before
+the first fork; workers see APP_PREPARED=1 and skip it.
+"""
+import argparse
+import logging
+import math
+import os
+import shutil
+import signal
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PIDFILE = os.getenv("GUNICORN_PIDFILE", "/tmp/gunicorn.pid")
+
+# Connections this deployment may open in total (Postgres max_connections minus
+# headroom for psql, migrations, monitoring and other services)
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "90"))
+# Time from launch until every worker has finished its startup event
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "20"))
+MAX_WORKERS = int(os.getenv("GUNICORN_MAX_WORKERS", "16"))
+
+PREPARED_ENV = "APP_PREPARED"
+STARTED_AT_ENV = "LAUNCHER_STARTED_AT"
+
+
+def cpu_count() -> int:
+    """CPUs this process may actually use (affinity mask and cgroup v2/v1 CPU quota)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+
+def connections_per_worker() -> int:
+    from database import ASYNC_MAX_OVERFLOW, ASYNC_POOL_SIZE, MAX_OVERFLOW, POOL_SIZE
+    # Sync and async pool, +1 for the LISTEN connection of refdata_cache
+    return POOL_SIZE + MAX_OVERFLOW + ASYNC_POOL_SIZE + ASYNC_MAX_OVERFLOW + 1
+
+
+def worker_count() -> int:
+    override = os.getenv("GUNICORN_WORKERS")
+    if override:
+        return max(1, int(override))
+    by_cpu = 2 * cpu_count() + 1
+    by_db = DB_CONNECTION_BUDGET // connections_per_worker()
+    workers = max(1, min(by_cpu, by_db, MAX_WORKERS))
+    if by_db < by_cpu:
+        logger.info(
+            "Worker count limited by DB budget: %d workers (CPU would allow %d, %d connections per worker, budget %d)",
+            workers, by_cpu, connections_per_worker(), DB_CONNECTION_BUDGET,
+        )
+    return workers
+
+
+def is_prepared() -> bool:
+    return os.getenv(PREPARED_ENV) == "1"
+
+
+def prepare() -> None:
+    """Create tables, apply migrations and seed initial data. Runs once before the workers start."""
+    from apply_migration import apply_migration
+    from database import Base, SessionLocal, engine
+    import crud
+    import models  # noqa: F401 - registers the tables on Base.metadata
+
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+
+    try:
+        apply_migration()
+    except Exception:
+        # MigrationError (or a broken connection): start with the schema as it is instead of
+        # taking the whole app down; the failing migration is retried on the next start
+        logger.exception("Error applying database migrations")
+
+    try:
+        logger.info("Attempting to create initial data (roles, absence types, admin user)...")
+        with SessionLocal() as db:
+            crud.create_initial_data(db)
+        logger.info("Initial data creation process completed.")
+    except Exception:
+        logger.exception("Error during initial data creation")
+
+    os.environ[PREPARED_ENV] = "1"
+    logger.info("Startup preparation finished in %.2f s", time.perf_counter() - start)
+
+
+def check_startup_budget(stage: str) -> float:
+    """Logs the time since launch for a startup stage and warns when it exceeds the budget."""
+    started_at = os.getenv(STARTED_AT_ENV)
+    if not started_at:
+        return 0.0
+    elapsed = time.time() - float(started_at)
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        logger.warning(
+            "Startup stage '%s' reached after %.2f s, budget is %.0f s", stage, elapsed, STARTUP_BUDGET_SECONDS,
+        )
+    else:
+        logger.info("Startup stage '%s' reached after %.2f s", stage, elapsed)
+    return elapsed
+
+
+def _read_pid(path: str) -> int | None:
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def reload(upgrade: bool = False, timeout: float = 60.0) -> int:
+    """
+    Without upgrade, SIGHUP makes gunicorn start fresh workers from the preloaded app
+    and stop the old ones gracefully (config changes apply, code stays the same).
+    With upgrade, SIGUSR2 starts a second master that imports the new code; once it
+    has written its pidfile the old master is stopped gracefully. Not usable when
+    gunicorn runs as PID 1 of a container, there a rolling container restart is the
+    equivalent.
+    """
+    old_pid = _read_pid(PIDFILE)
+    if old_pid is None:
+        print(f"No gunicorn master found (pidfile {PIDFILE})", file=sys.stderr)
+        return 1
+
+    if not upgrade:
+        os.kill(old_pid, signal.SIGHUP)
+        return 0
+
+    os.kill(old_pid, signal.SIGUSR2)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        new_pid = _read_pid(PIDFILE)
+        if new_pid is not None and new_pid != old_pid:
+            # Old master stops accepting, finishes running requests within graceful_timeout
+            os.kill(old_pid, signal.SIGTERM)
+            print(f"Switched from master {old_pid} to {new_pid}")
+            return 0
+        time.sleep(0.5)
+    print(f"New master did not come up within {timeout:.0f} s, old master {old_pid} keeps running", file=sys.stderr)
+    return 1
+
+
+def run() -> None:
+    from database import DATABASE_URL, IS_SQLITE
+    import sqlite_engine
+    if IS_SQLITE and sqlite_engine.is_memory(DATABASE_URL):
+        # Every worker would get its own empty database
+        sys.exit("In-memory SQLite (DATABASE_URL=sqlite://) is for tests only, use a database file.")
+    os.environ.setdefault(STARTED_AT_ENV, str(time.time()))
+    # Shared directory for the Prometheus metrics of all workers, emptied on every start
+    multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+    os.chdir(BASE_DIR)
+    os.execvp("gunicorn", ["gunicorn", "-c", os.path.join(BASE_DIR, "gunicorn.conf.py"), "main:app"])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("run", help="start the server (default)")
+    subparsers.add_parser("workers", help="print the computed worker count")
+    reload_parser = subparsers.add_parser("reload", help="gracefully reload the running server")
+    reload_parser.add_argument("--upgrade", action="store_true", help="load new code via a second master")
+    args = parser.parse_args(argv)
+
+    if args.command == "workers":
+        print(worker_count())
+        return 0
+    if args.command == "reload":
+        return reload(upgrade=args.upgrade)
+    run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,6 @@ from typing import List
 from fastapi import FastAPI, Depends, Form, HTTPException, Request, status, Response
 from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.exception_handlers import HTTPException
 from sqlalchemy.orm import Session
@@ -32,10 +31,26 @@ email_config = {
 # Update environment with email configuration
 os.environ.update(email_config)
 
-from database import engine, get_db, Base
+# Configure logging before the other modules log anything at import time
+import logging
+import logging_config
+logging_config.setup_logging()
+logger = logging.getLogger(__name__)
+
+import database
+from database import async_engine, get_db
 import models
 import crud
 import schemas
+import refdata_cache
+import static_assets
+import page_cache
+import metrics
+import sql_profiler
+import launcher
+import replica
+import report_jobs
+import timesheets
 from routers.auth import router as auth_router, get_current_active_user
 from routers import users as users_router
 from routers import projects as projects_router
@@ -44,14 +59,25 @@ from routers import roles as roles_router
 from routers import time_entries as time_entries_router
 from routers import absences as absences_router
 from routers import absence_types as absence_types_router
+from routers import bootstrap as bootstrap_router
+from routers import analytics as analytics_router
+from routers import reports as reports_router
+from routers import search as search_router
 
-Base.metadata.create_all(bind=engine)
+# Primary and replica pools; events of the async engines fire on their sync_engine
+for _engine in database.sync_engines():
+    metrics.instrument_engine(_engine)
+    sql_profiler.instrument_engine(_engine)
 
 app = FastAPI(title="Zeiterfassungstool API")
 
 # Static files and templates - Ensure templates is defined before use in routes
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Files from build_static.py (static/dist/) are served precompressed with immutable caching
+app.mount("/static", static_assets.PrecompressedStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates") # Definition of templates
+static_assets.register_template_globals(templates.env)
+# Pages whose only context is the request are rendered once and served from memory
+pages = page_cache.PageCache(templates.env)
 
 # Include new routers
 app.include_router(auth_router) # Handles /auth/token, /auth/register
@@ -66,6 +92,13 @@ app.include_router(time_entries_router.router, prefix="/api/v1/time-entries", ta
 app.include_router(time_entries_router.router, prefix="/api/v1/time_entries", tags=["Time Entries"])
 app.include_router(absences_router.router, prefix="/api/v1/absences", tags=["Absences"])
 app.include_router(absence_types_router.router, prefix="/api/v1/absence-types", tags=["Absence Types"])
+app.include_router(bootstrap_router.router, prefix="/api/v1/bootstrap", tags=["Bootstrap"])
+app.include_router(analytics_router.router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(reports_router.router, prefix="/api/v1/reports", tags=["Reports"])
+app.include_router(search_router.router, prefix="/api/v1/search", tags=["Search"])
+
+# Prometheus metrics (must be registered before the catch-all route)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
 
 app.add_middleware(
     CORSMiddleware,
@@ -74,66 +107,61 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Clients that just wrote read from the primary for a few seconds (only with a read replica)
+if replica.ENABLED:
+    app.add_middleware(replica.ReplicaStickinessMiddleware)
+# Query counts/DB time per request as X-DB-Queries/Server-Timing headers (non-production only)
+if sql_profiler.ENABLED:
+    app.add_middleware(sql_profiler.SQLProfilerMiddleware)
+# Outside the profiler so its N+1 warnings carry the request id
+app.add_middleware(logging_config.RequestIdMiddleware)
+# Added last so it wraps everything and also measures the CORS handling
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.on_event("startup")
 async def on_startup():
-    # Apply database migrations
-    try:
-        import os
-        from apply_migration import apply_migration
-        print("Starting to apply database migrations...")
-        if not os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")):
-            os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"), exist_ok=True)
-        apply_migration()
-        print("Database migrations applied successfully!")
-    except Exception as e:
-        print(f"Error applying database migrations: {str(e)}")
-        import traceback
-        traceback.print_exc()
-      # Initialize database connection
-    try:
-        print("Application startup: Database tables (based on new models.py) should be created if they didn't exist.")
-        print("Attempting to create initial data (roles, absence types, admin user)...")
-        db = next(get_db())
-        crud.create_initial_data(db)
-        db.close()
-        print("Initial data creation process completed.")
-    except Exception as e:
-        print(f"Error during initial data creation: {e}")
-        import traceback
-        traceback.print_exc()
-        if db is not None:
-            db.close()
+    # Under launcher.py/gunicorn this already ran once in the master before the fork
+    if not launcher.is_prepared():
+        launcher.prepare()
+        # Under gunicorn the master runs the report jobs in a process of their own
+        report_jobs.start_thread()
+
+    # Listen for reference data changes made by other workers/nodes
+    refdata_cache.start_listener()
+    # Replica lag checks; reads stay on the primary until the first check succeeded
+    replica.start_monitor()
+
+    # Render the most visited static pages up front, the rest is rendered on first request
+    pages.warm("Login.html", "index.html", "arbeitszeiten.html", "urlaub.html", "404.html")
+    launcher.check_startup_budget("worker ready")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    refdata_cache.stop_listener()
+    replica.stop_monitor()
+    report_jobs.stop_thread()
+    timesheets.shutdown()
+    await async_engine.dispose()
+    if database.async_replica_engine is not None:
+        await database.async_replica_engine.dispose()
+    logging_config.shutdown_logging()
 
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/login")
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_page(
-    request: Request, 
-    db: Session = Depends(get_db),
-):
-    return templates.TemplateResponse(
-        "index.html", 
-        {
-            "request": request,
-        }
-    )
+async def dashboard_page(request: Request):
+    return pages.response(request, "index.html")
 
 # ---------- HTML‐Seiten (Login, Register, Passwort, Hilfe, specific dashboards) ----------
 # These remain as direct HTML serving routes. 
 # Their POST counterparts for form submission are being phased out or modified to guide towards API usage.
 
 @app.get("/arbeitszeiten/dashboard", response_class=HTMLResponse)
-def az_dashboard(request: Request, db: Session = Depends(get_db)):
-    # This page will need to fetch data via JS from the new API endpoints
-    # For now, it might show stale or no data if crud.get_arbeitszeiten is removed/changed
-    # az_list = crud.get_arbeitszeiten(db) # This was for the old direct DB access
-    return templates.TemplateResponse(
-        "arbeitszeiten.html",
-        {"request": request, "arbeitszeiten": [], "error": None} # Pass empty list for now
-    )
+async def az_dashboard(request: Request):
+    # The page fetches its data via JS from the API (/api/v1/bootstrap)
+    return pages.response(request, "arbeitszeiten.html")
 
 @app.post("/arbeitszeiten/dashboard", response_class=HTMLResponse)
 def az_add(
@@ -161,25 +189,18 @@ def az_add(
     )
 
 @app.get("/urlaube/dashboard", response_class=HTMLResponse)
-def urlaub_dashboard(request: Request, db: Session = Depends(get_db)):
-    # This page will need to fetch data via JS from the new API endpoints
-    # urlaube = crud.get_urlaube(db) # Old direct DB access
-    return templates.TemplateResponse(
-        "urlaub.html",
-        {"request": request, "urlaube": []} # Pass empty list for now
-    )
+async def urlaub_dashboard(request: Request):
+    # The page fetches its data via JS from the API (/api/v1/bootstrap)
+    return pages.response(request, "urlaub.html")
 
 @app.get("/urlaube/genehmigen", response_class=HTMLResponse)
-def urlaub_genehmigen_dashboard(request: Request, db: Session = Depends(get_db)):
+async def urlaub_genehmigen_dashboard(request: Request):
     # Diese Seite dient zur Verwaltung der Urlaubsanträge durch Administratoren und Manager
-    return templates.TemplateResponse(
-        "urlaub_genehmigen.html",
-        {"request": request}
-    )
+    return pages.response(request, "urlaub_genehmigen.html")
 
 @app.get("/login", response_class=HTMLResponse)
-def login_form(request: Request):
-    return templates.TemplateResponse("Login.html", {"request": request, "error": None})
+async def login_form(request: Request):
+    return pages.response(request, "Login.html")
 
 @app.post("/login", response_class=HTMLResponse)
 def login_submit(
@@ -195,7 +216,7 @@ def login_submit(
 
 @app.get("/register", response_class=HTMLResponse)
 def register_form(request: Request, db: Session = Depends(get_db)):
-    rollen = crud.get_rollen(db) # Changed from crud.get_rollen_list(db)
+    rollen = refdata_cache.get_all(db, "rollen")
     return templates.TemplateResponse("register.html", {
         "request": request, "rollen": rollen, "error": None
     })
@@ -211,19 +232,19 @@ def register_submit(
      rolle_id: int    = Form(...),
      db: Session      = Depends(get_db),
  ):
-    rollen = crud.get_rollen(db)
+    rollen = refdata_cache.get_all(db, "rollen")
     return templates.TemplateResponse(
         "register.html",
         {"request": request, "rollen": rollen, "error": "Registration via this form is deprecated. Please use API endpoint /auth/register."}
     )
 
 @app.get("/hilfe", response_class=HTMLResponse)
-def hilfe_page(request: Request):
-    return templates.TemplateResponse("hilfe.html", {"request": request})
+async def hilfe_page(request: Request):
+    return pages.response(request, "hilfe.html")
 
 @app.get("/passwort", response_class=HTMLResponse)
-def passwort_form(request: Request):
-    return templates.TemplateResponse("passwort.html", {"request": request, "message": None})
+async def passwort_form(request: Request):
+    return pages.response(request, "passwort.html")
 
 @app.post("/passwort", response_class=HTMLResponse)
 def passwort_submit(
@@ -251,7 +272,7 @@ def rollen_dashboard_page(
     db: Session = Depends(get_db),
     current_admin: models.Benutzer = Depends(admin_required)
 ):
-    rollen = crud.get_rollen(db)
+    rollen = refdata_cache.get_all(db, "rollen")
     return templates.TemplateResponse(
         "rollen.html",
         {"request": request, "rollen": rollen, "error": None, "current_user": current_admin}
@@ -265,7 +286,7 @@ def rollen_add_form(
     db: Session = Depends(get_db),
     current_admin: models.Benutzer = Depends(admin_required)
 ):
-    rollen = crud.get_rollen(db) # Get roles for template context in case of error
+    rollen = refdata_cache.get_all(db, "rollen") # Get roles for template context in case of error
     db_role = crud.get_rolle_by_name(db, name=name)
     if db_role:
         return templates.TemplateResponse(
@@ -285,53 +306,53 @@ def rollen_add_form(
 # ---------- Direct HTML file routes ----------
 # These routes serve HTML files directly at paths like /arbeitszeiten.html
 @app.get("/arbeitszeiten.html", response_class=HTMLResponse)
-def arbeitszeiten_html(request: Request):
-    return templates.TemplateResponse("arbeitszeiten.html", {"request": request})
+async def arbeitszeiten_html(request: Request):
+    return pages.response(request, "arbeitszeiten.html")
 
 @app.get("/urlaub.html", response_class=HTMLResponse)
-def urlaub_html(request: Request):
-    return templates.TemplateResponse("urlaub.html", {"request": request})
+async def urlaub_html(request: Request):
+    return pages.response(request, "urlaub.html")
 
 @app.get("/rollen.html", response_class=HTMLResponse)
-def rollen_html(request: Request):
-    return templates.TemplateResponse("rollen.html", {"request": request})
+async def rollen_html(request: Request):
+    return pages.response(request, "rollen.html")
 
 @app.get("/admin_benutzer.html", response_class=HTMLResponse)
-def admin_benutzer_html(request: Request):
-    return templates.TemplateResponse("admin_benutzer.html", {"request": request})
+async def admin_benutzer_html(request: Request):
+    return pages.response(request, "admin_benutzer.html")
 
 @app.get("/info.html", response_class=HTMLResponse)
-def info_html(request: Request):
-    return templates.TemplateResponse("info.html", {"request": request})
+async def info_html(request: Request):
+    return pages.response(request, "info.html")
 
 @app.get("/hilfe.html", response_class=HTMLResponse)
-def hilfe_html(request: Request):
-    return templates.TemplateResponse("hilfe.html", {"request": request})
+async def hilfe_html(request: Request):
+    return pages.response(request, "hilfe.html")
 
 @app.get("/passwort.html", response_class=HTMLResponse)
-def passwort_html(request: Request):
-    return templates.TemplateResponse("passwort.html", {"request": request})
+async def passwort_html(request: Request):
+    return pages.response(request, "passwort.html")
 
 @app.get("/index.html", response_class=HTMLResponse)
-def index_html(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+async def index_html(request: Request):
+    return pages.response(request, "index.html")
 
 @app.get("/Login.html", response_class=HTMLResponse)
-def login_html(request: Request):
-    return templates.TemplateResponse("Login.html", {"request": request})
+async def login_html(request: Request):
+    return pages.response(request, "Login.html")
 
 @app.get("/register.html", response_class=HTMLResponse)
 def register_html(request: Request, db: Session = Depends(get_db)):
-    rollen = crud.get_rollen(db)
+    rollen = refdata_cache.get_all(db, "rollen")
     return templates.TemplateResponse("register.html", {"request": request, "rollen": rollen, "error": None})
 
 @app.get("/datenschutz.html", response_class=HTMLResponse)
-def datenschutz_html(request: Request):
-    return templates.TemplateResponse("datenschutz.html", {"request": request})
+async def datenschutz_html(request: Request):
+    return pages.response(request, "datenschutz.html")
 
 @app.get("/impressum.html", response_class=HTMLResponse)
-def impressum_html(request: Request):
-    return templates.TemplateResponse("impressum.html", {"request": request})
+async def impressum_html(request: Request):
+    return pages.response(request, "impressum.html")
 
 @app.get("/health", tags=["health"], include_in_schema=False)
 def health_check():
@@ -342,20 +363,20 @@ def health_check():
 
 # 404 Error Page Route
 @app.get("/404.html", response_class=HTMLResponse)
-def error_404_html(request: Request):
-    return templates.TemplateResponse("404.html", {"request": request})
+async def error_404_html(request: Request):
+    return pages.response(request, "404.html")
 
 # Global 404 Exception Handler
 @app.exception_handler(404)
 async def custom_404_handler(request: Request, exc: HTTPException):
-    return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+    return pages.response(request, "404.html", status_code=404)
 
 # Catch-all route for any unmatched paths (must be last)
 @app.get("/{full_path:path}", response_class=HTMLResponse)
 async def catch_all(request: Request, full_path: str):
     # Only handle paths that look like they should be HTML pages
     if full_path.endswith('.html') or not '.' in full_path:
-        return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+        return pages.response(request, "404.html", status_code=404)
     # For other files (CSS, JS, images, etc.), return 404
     raise HTTPException(status_code=404, detail="File not found")
 
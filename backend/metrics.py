@@ -0,0 +1,240 @@
+# metrics.py - Prometheus metrics
+#
+# GET /metrics exposes request latency per route template, in-flight requests,
+# DB pool usage, email sending, bcrypt load and business counters.
+#
+# Under gunicorn every worker is a separate process. When PROMETHEUS_MULTIPROC_DIR
+# is set (entrypoint.sh does this), prometheus_client writes the values to files in
+# that directory and /metrics aggregates all workers. gunicorn.conf.py removes the
+# files of dead workers.
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+# Optional bearer token for /metrics, unset means open (scraped from the internal network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+NAMESPACE = "zeiterfassung"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+# ---------- HTTP ----------
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"], namespace=NAMESPACE,
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"], namespace=NAMESPACE, buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled",
+    namespace=NAMESPACE, multiprocess_mode="livesum",
+)
+
+# ---------- Database pool ----------
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Open connections held by the SQLAlchemy pool",
+    namespace=NAMESPACE, multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Pool connections currently checked out",
+    namespace=NAMESPACE, multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Pool connection checkouts", namespace=NAMESPACE,
+)
+DB_POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations_total", "Pool connections invalidated after errors", namespace=NAMESPACE,
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replay lag of the read replica as last measured (-1 = unreachable)",
+    namespace=NAMESPACE, multiprocess_mode="max",
+)
+
+# ---------- Email ----------
+EMAIL_LATENCY = Histogram(
+    "email_send_duration_seconds", "Time to send an email via SMTP",
+    namespace=NAMESPACE, buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+EMAIL_FAILURES = Counter(
+    "email_send_failures_total", "Emails that could not be sent", namespace=NAMESPACE,
+)
+
+# ---------- Password hashing ----------
+BCRYPT_IN_PROGRESS = Gauge(
+    "bcrypt_queue_depth", "bcrypt hash/verify calls running or waiting for a CPU",
+    namespace=NAMESPACE, multiprocess_mode="livesum",
+)
+BCRYPT_LATENCY = Histogram(
+    "bcrypt_duration_seconds", "Duration of bcrypt hash/verify calls",
+    ["operation"], namespace=NAMESPACE, buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0),
+)
+
+# ---------- Business ----------
+TIME_ENTRIES_CREATED = Counter(
+    "time_entries_created_total", "Time entries created", namespace=NAMESPACE,
+)
+ABSENCES_DECIDED = Counter(
+    "absences_decided_total", "Absence requests approved or rejected",
+    ["status"], namespace=NAMESPACE,
+)
+
+# ---------- Report cache ----------
+# Hit rate: rate(..._requests_total{result="hit"}) / rate(..._requests_total)
+REPORT_CACHE_REQUESTS = Counter(
+    "report_cache_requests_total", "Report requests by cache result (hit/miss)",
+    ["report", "result"], namespace=NAMESPACE,
+)
+REPORT_CACHE_INVALIDATIONS = Counter(
+    "report_cache_invalidations_total", "Cached report results dropped after writes",
+    ["backend"], namespace=NAMESPACE,
+)
+
+# ---------- Report jobs ----------
+REPORT_JOBS_FINISHED = Counter(
+    "report_jobs_finished_total", "Background report jobs by final status (done/failed)",
+    ["report", "status"], namespace=NAMESPACE,
+)
+REPORT_JOB_DURATION = Histogram(
+    "report_job_duration_seconds", "Run time of background report jobs",
+    ["report"], namespace=NAMESPACE, buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+
+@contextmanager
+def track_bcrypt(operation: str):
+    BCRYPT_IN_PROGRESS.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        BCRYPT_LATENCY.labels(operation).observe(time.perf_counter() - start)
+        BCRYPT_IN_PROGRESS.dec()
+
+
+def instrument_engine(engine) -> None:
+    """Track pool usage through pool events (works per process, aggregated in multiprocess mode)."""
+    pool = engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(pool, "detach")
+    def _on_detach(dbapi_connection, connection_record):
+        # Detached connections (e.g. the LISTEN connection) no longer belong to the pool
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+        DB_POOL_CHECKOUTS.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_INVALIDATIONS.inc()
+
+
+def _route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    # Unmatched paths are not used as labels to keep the cardinality bounded
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware, which would add a task and a
+    memory stream per request). Label children are cached so a request costs a
+    dict lookup plus the observe/inc calls.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._latency_children: dict[tuple, object] = {}
+        self._counter_children: dict[tuple, object] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            method = scope["method"]
+            route = _route_label(scope)
+
+            key = (method, route)
+            latency = self._latency_children.get(key)
+            if latency is None:
+                latency = self._latency_children[key] = HTTP_LATENCY.labels(method, route)
+            latency.observe(duration)
+
+            key = (method, route, status_code)
+            counter = self._counter_children.get(key)
+            if counter is None:
+                counter = self._counter_children[key] = HTTP_REQUESTS.labels(method, route, str(status_code))
+            counter.inc()
+
+
+def _registry():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response(status_code=401)
+    # CONTENT_TYPE_LATEST has its charset already, media_type would append a second one
+    return Response(generate_latest(_registry()), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def mark_process_dead(pid: int) -> None:
+    """Called from gunicorn's child_exit hook."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,4 @@
+-- Index for the burndown aggregation (planned vs. actual hours per task and week)
+-- INCLUDE lets Postgres answer SUM(stunden) with an index-only scan
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_aufgabe_datum
+ON zeiteintraege (aufgabe_id, datum) INCLUDE (stunden);
@@ -0,0 +1,36 @@
+-- Let the database cascade deletes of projects and users instead of the ORM,
+-- and add soft-delete (archive) columns with partial indexes.
+
+-- Foreign keys: only recreated if they do not have the wanted ON DELETE action yet,
+-- because re-adding a constraint validates the whole table
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'aufgaben_projekt_id_fkey' AND confdeltype <> 'c') THEN
+        ALTER TABLE aufgaben DROP CONSTRAINT aufgaben_projekt_id_fkey;
+        ALTER TABLE aufgaben ADD CONSTRAINT aufgaben_projekt_id_fkey
+            FOREIGN KEY (projekt_id) REFERENCES projekte(id) ON DELETE CASCADE;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'abwesenheiten_benutzer_id_fkey' AND confdeltype <> 'c') THEN
+        ALTER TABLE abwesenheiten DROP CONSTRAINT abwesenheiten_benutzer_id_fkey;
+        ALTER TABLE abwesenheiten ADD CONSTRAINT abwesenheiten_benutzer_id_fkey
+            FOREIGN KEY (benutzer_id) REFERENCES benutzer(id) ON DELETE CASCADE;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'abwesenheiten_genehmigt_von_benutzer_id_fkey' AND confdeltype <> 'n') THEN
+        ALTER TABLE abwesenheiten DROP CONSTRAINT abwesenheiten_genehmigt_von_benutzer_id_fkey;
+        ALTER TABLE abwesenheiten ADD CONSTRAINT abwesenheiten_genehmigt_von_benutzer_id_fkey
+            FOREIGN KEY (genehmigt_von_benutzer_id) REFERENCES benutzer(id) ON DELETE SET NULL;
+    END IF;
+END $$;
+
+-- Cascading deletes need indexes on the referencing columns
+CREATE INDEX IF NOT EXISTS ix_aufgaben_projekt_id ON aufgaben (projekt_id);
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_projekt_id ON zeiteintraege (projekt_id);
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_benutzer_datum ON zeiteintraege (benutzer_id, datum);
+CREATE INDEX IF NOT EXISTS ix_abwesenheiten_benutzer_id ON abwesenheiten (benutzer_id);
+
+-- Soft delete
+ALTER TABLE projekte ADD COLUMN IF NOT EXISTS geloescht_am TIMESTAMP WITH TIME ZONE;
+ALTER TABLE benutzer ADD COLUMN IF NOT EXISTS geloescht_am TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS ix_projekte_nicht_archiviert ON projekte (name) WHERE geloescht_am IS NULL;
+CREATE INDEX IF NOT EXISTS ix_benutzer_nicht_archiviert ON benutzer (nachname, vorname) WHERE geloescht_am IS NULL;
@@ -0,0 +1,16 @@
+-- Stored responses for POST requests sent with an Idempotency-Key header,
+-- so retried requests are answered without writing twice
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    benutzer_id INTEGER NOT NULL REFERENCES benutzer(id) ON DELETE CASCADE,
+    schluessel VARCHAR(255) NOT NULL,
+    endpunkt VARCHAR(255) NOT NULL,
+    anfrage_hash VARCHAR(64) NOT NULL,
+    antwort_status INTEGER,
+    antwort_body TEXT,
+    erstellt_am TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    ablauf_am TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (benutzer_id, schluessel)
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_ablauf_am ON idempotency_keys (ablauf_am);
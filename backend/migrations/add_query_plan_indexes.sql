@@ -0,0 +1,8 @@
+-- Indexes found missing by benchmarks/query_plans.py on the synthetic dataset
+
+-- Time entry report over all users for a date range (no user filter)
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_datum ON zeiteintraege (datum);
+
+-- Open absence requests for the approval view; partial, because most absences are decided
+CREATE INDEX IF NOT EXISTS ix_abwesenheiten_beantragt
+ON abwesenheiten (start_datum) WHERE status = 'beantragt';
@@ -0,0 +1,6 @@
+-- SQLite variant of add_query_plan_indexes.sql (SQLite supports partial indexes as well)
+
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_datum ON zeiteintraege (datum);
+
+CREATE INDEX IF NOT EXISTS ix_abwesenheiten_beantragt
+ON abwesenheiten (start_datum) WHERE status = 'beantragt';
@@ -0,0 +1,17 @@
+-- Shared cache for report results (REPORT_CACHE_BACKEND=table), invalidated
+-- inside the transactions that write time entries
+
+CREATE TABLE IF NOT EXISTS report_cache (
+    cache_key VARCHAR(255) PRIMARY KEY,
+    bericht VARCHAR(50) NOT NULL,
+    benutzer_id INTEGER,
+    projekt_id INTEGER,
+    start_datum DATE NOT NULL,
+    end_datum DATE NOT NULL,
+    payload TEXT NOT NULL,
+    erstellt_am TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    ablauf_am TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_report_cache_zeitraum ON report_cache (start_datum, end_datum);
+CREATE INDEX IF NOT EXISTS ix_report_cache_ablauf_am ON report_cache (ablauf_am);
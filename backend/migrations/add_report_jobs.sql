@@ -0,0 +1,25 @@
+-- Queue for long running reports and exports (report_jobs.py). Runners claim
+-- queued jobs with SELECT ... FOR UPDATE SKIP LOCKED.
+
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id SERIAL PRIMARY KEY,
+    benutzer_id INTEGER NOT NULL REFERENCES benutzer(id) ON DELETE CASCADE,
+    bericht VARCHAR(50) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    parameter TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    fortschritt INTEGER NOT NULL DEFAULT 0,
+    versuche INTEGER NOT NULL DEFAULT 0,
+    fehler TEXT,
+    ergebnis BYTEA,
+    ergebnis_bytes INTEGER,
+    erstellt_am TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    gestartet_am TIMESTAMP WITH TIME ZONE,
+    heartbeat_am TIMESTAMP WITH TIME ZONE,
+    beendet_am TIMESTAMP WITH TIME ZONE,
+    ablauf_am TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_report_jobs_status_id ON report_jobs (status, id);
+CREATE INDEX IF NOT EXISTS ix_report_jobs_benutzer_id ON report_jobs (benutzer_id, id);
+CREATE INDEX IF NOT EXISTS ix_report_jobs_ablauf_am ON report_jobs (ablauf_am);
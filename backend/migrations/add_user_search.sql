@@ -0,0 +1,20 @@
+-- Trigram index for the user search (GET /api/v1/users/search, crud.search_benutzer)
+--
+-- Serves substring (LIKE '%...%') and fuzzy (<%) matches over username, names and email.
+-- The expression must stay identical to crud.benutzer_search_text(), otherwise the
+-- planner cannot use the index. pg_trgm is a trusted extension (Postgres 13+): the
+-- database owner can create it without superuser rights.
+--
+-- Without pg_trgm (not installed on the server, or no rights to create it) both steps are
+-- skipped with a notice and the search only finds substrings. Once the extension can be
+-- created, run this file again: python apply_migration.py add_user_search.sql
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS ix_benutzer_suche_trgm ON benutzer
+    USING GIN (lower(username || ' ' || vorname || ' ' || nachname || ' ' || email) gin_trgm_ops);
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE USING MESSAGE = 'pg_trgm not available, user search without trigram index: ' || SQLERRM;
+END
+$$;
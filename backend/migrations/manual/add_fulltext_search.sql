@@ -0,0 +1,18 @@
+-- Full-text search over time entry descriptions and absence reasons (search.py)
+--
+-- Generated tsvector columns with German stemming, kept up to date by Postgres on every
+-- write; the GIN indexes answer the @@ matches and ts_rank reads the stored vectors.
+-- Adding a stored generated column rewrites the table under an exclusive lock, so this
+-- migration is not run at startup. Apply it once in a maintenance window:
+--     python apply_migration.py manual/add_fulltext_search.sql
+-- Until then search.py falls back to LIKE matching ordered by date.
+
+ALTER TABLE zeiteintraege ADD COLUMN IF NOT EXISTS suchvektor tsvector
+    GENERATED ALWAYS AS (to_tsvector('german', coalesce(beschreibung, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_zeiteintraege_suchvektor ON zeiteintraege USING GIN (suchvektor);
+
+ALTER TABLE abwesenheiten ADD COLUMN IF NOT EXISTS suchvektor tsvector
+    GENERATED ALWAYS AS (to_tsvector('german', coalesce(grund, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_abwesenheiten_suchvektor ON abwesenheiten USING GIN (suchvektor);
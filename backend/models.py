@@ -1,6 +1,6 @@
 # models.py
 from sqlalchemy import (
-    Column, Integer, String, Date, Time, ForeignKey, TIMESTAMP, Boolean, Text, Numeric, DateTime
+    Column, Integer, String, Date, Time, ForeignKey, TIMESTAMP, Boolean, Text, Numeric, DateTime, Index, LargeBinary
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -33,12 +33,25 @@ class Benutzer(Base):
     # Using DateTime(timezone=True) for timezone awareness
     erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     aktualisiert_am = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    geloescht_am = Column(DateTime(timezone=True), nullable=True)  # Set when the user is archived (soft delete)
 
     # Relationships
-    rolle = relationship("Rolle", back_populates="benutzer")
-    zeiteintraege = relationship("Zeiteintrag", back_populates="benutzer", cascade="all, delete-orphan")
-    abwesenheiten = relationship("Abwesenheit", foreign_keys="[Abwesenheit.benutzer_id]", back_populates="benutzer", cascade="all, delete-orphan")
-    genehmigte_abwesenheiten = relationship("Abwesenheit", foreign_keys="[Abwesenheit.genehmigt_von_benutzer_id]", back_populates="genehmiger")
+    # Loaded with the user: every authenticated request checks current_user.rolle,
+    # and user lists serialize it for each row
+    rolle = relationship("Rolle", back_populates="benutzer", lazy="joined")
+    # passive_deletes: children are removed by ON DELETE CASCADE in the database instead of
+    # being loaded and deleted one by one by the ORM
+    zeiteintraege = relationship("Zeiteintrag", back_populates="benutzer", cascade="all, delete-orphan", passive_deletes=True)
+    abwesenheiten = relationship("Abwesenheit", foreign_keys="[Abwesenheit.benutzer_id]", back_populates="benutzer", cascade="all, delete-orphan", passive_deletes=True)
+    genehmigte_abwesenheiten = relationship("Abwesenheit", foreign_keys="[Abwesenheit.genehmigt_von_benutzer_id]", back_populates="genehmiger", passive_deletes=True)
+
+    __table_args__ = (
+        # Keeps archived users out of the user lists
+        Index(
+            "ix_benutzer_nicht_archiviert", "nachname", "vorname",
+            postgresql_where=geloescht_am.is_(None), sqlite_where=geloescht_am.is_(None),
+        ),
+    )
 
     def __repr__(self):
         return f"<Benutzer(username=\'{self.username}\')>"
@@ -54,11 +67,20 @@ class Projekt(Base):
     end_datum = Column(Date, nullable=True)
     erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     aktualisiert_am = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    geloescht_am = Column(DateTime(timezone=True), nullable=True)  # Set when the project is archived (soft delete)
 
     # Relationships
-    aufgaben = relationship("Aufgabe", back_populates="projekt", cascade="all, delete-orphan")
+    aufgaben = relationship("Aufgabe", back_populates="projekt", cascade="all, delete-orphan", passive_deletes=True)
     # Denormalized link for easier querying, if kept
-    zeiteintraege = relationship("Zeiteintrag", back_populates="projekt")
+    zeiteintraege = relationship("Zeiteintrag", back_populates="projekt", passive_deletes=True)
+
+    __table_args__ = (
+        # Keeps archived projects out of the project lists
+        Index(
+            "ix_projekte_nicht_archiviert", "name",
+            postgresql_where=geloescht_am.is_(None), sqlite_where=geloescht_am.is_(None),
+        ),
+    )
 
     def __repr__(self):
         return f"<Projekt(name=\'{self.name}\')>"
@@ -67,7 +89,7 @@ class Projekt(Base):
 class Aufgabe(Base):
     __tablename__ = "aufgaben"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    projekt_id = Column(Integer, ForeignKey("projekte.id"), nullable=False)
+    projekt_id = Column(Integer, ForeignKey("projekte.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     beschreibung = Column(Text, nullable=True)
     geplante_stunden = Column(Numeric(5, 2), nullable=True)  # e.g., 40.5 hours
@@ -89,12 +111,12 @@ class Zeiteintrag(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     benutzer_id = Column(Integer, ForeignKey("benutzer.id", ondelete="CASCADE"), nullable=False)
     aufgabe_id = Column(Integer, ForeignKey("aufgaben.id", ondelete="CASCADE"), nullable=False)
-    projekt_id = Column(Integer, ForeignKey("projekte.id", ondelete="CASCADE"), nullable=False)
+    projekt_id = Column(Integer, ForeignKey("projekte.id", ondelete="CASCADE"), nullable=False, index=True)
     datum = Column(Date, nullable=False)
     startzeit = Column(Time(timezone=False), nullable=False)
     endzeit = Column(Time(timezone=False), nullable=False)
     stunden = Column(Numeric(5, 2), nullable=True)  # Automatically calculated from start/end
-    beschreibung = Column(Text, nullable=True)
+    beschreibung = Column(Text, nullable=True)  # Postgres: searchable via the generated column suchvektor (search.py)
     ist_abrechenbar = Column(Boolean, default=True, nullable=False)
     erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     aktualisiert_am = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -104,6 +126,15 @@ class Zeiteintrag(Base):
     aufgabe = relationship("Aufgabe", back_populates="zeiteintraege")
     projekt = relationship("Projekt", back_populates="zeiteintraege")
 
+    __table_args__ = (
+        # Covers the per-task/per-week aggregation of the burndown report
+        Index("ix_zeiteintraege_aufgabe_datum", "aufgabe_id", "datum", postgresql_include=["stunden"]),
+        # Per-user lists and the cascading/batched delete of a user's entries
+        Index("ix_zeiteintraege_benutzer_datum", "benutzer_id", "datum"),
+        # Date range over all users (report without user_id)
+        Index("ix_zeiteintraege_datum", "datum"),
+    )
+
     def __repr__(self):
         return f"<Zeiteintrag(datum='{self.datum}', benutzer_id={self.benutzer_id}, stunden={self.stunden})>"
 
@@ -125,13 +156,13 @@ class AbwesenheitTyp(Base):
 class Abwesenheit(Base):
     __tablename__ = "abwesenheiten"  # Replaces "Urlaub" and includes sick days etc.
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    benutzer_id = Column(Integer, ForeignKey("benutzer.id"), nullable=False)
+    benutzer_id = Column(Integer, ForeignKey("benutzer.id", ondelete="CASCADE"), nullable=False, index=True)
     abwesenheit_typ_id = Column(Integer, ForeignKey("abwesenheit_typen.id"), nullable=False)
     start_datum = Column(Date, nullable=False)
     end_datum = Column(Date, nullable=False)
-    grund = Column(Text, nullable=True)  # Optional reason from user
+    grund = Column(Text, nullable=True)  # Optional reason from user; Postgres: suchvektor, see search.py
     status = Column(String(50), nullable=False, default='beantragt')  # e.g., "beantragt", "genehmigt", "abgelehnt"
-    genehmigt_von_benutzer_id = Column(Integer, ForeignKey("benutzer.id"), nullable=True)
+    genehmigt_von_benutzer_id = Column(Integer, ForeignKey("benutzer.id", ondelete="SET NULL"), nullable=True)
     kommentar_genehmiger = Column(Text, nullable=True)  # Optional comment from approver
     erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     aktualisiert_am = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -141,5 +172,89 @@ class Abwesenheit(Base):
     abwesenheit_typ = relationship("AbwesenheitTyp", back_populates="abwesenheiten")
     genehmiger = relationship("Benutzer", foreign_keys=[genehmigt_von_benutzer_id], back_populates="genehmigte_abwesenheiten")
 
+    __table_args__ = (
+        # Open requests for the approval view; small, because most absences are decided
+        Index(
+            "ix_abwesenheiten_beantragt", "start_datum",
+            postgresql_where=status == "beantragt", sqlite_where=status == "beantragt",
+        ),
+    )
+
     def __repr__(self):
         return f"<Abwesenheit(start_datum=\'{self.start_datum}\', benutzer_id={self.benutzer_id}, typ_id={self.abwesenheit_typ_id})>"
+
+
+class IdempotencyKey(Base):
+    """Stored response of a POST sent with an Idempotency-Key header (see idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    benutzer_id = Column(Integer, ForeignKey("benutzer.id", ondelete="CASCADE"), primary_key=True)
+    schluessel = Column(String(255), primary_key=True)
+    endpunkt = Column(String(255), nullable=False)  # e.g. "POST /api/v1/time-entries/"
+    anfrage_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    antwort_status = Column(Integer, nullable=True)  # NULL while the request is still being processed
+    antwort_body = Column(Text, nullable=True)
+    erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    ablauf_am = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Expiry cleanup
+        Index("ix_idempotency_keys_ablauf_am", "ablauf_am"),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey(benutzer_id={self.benutzer_id}, schluessel='{self.schluessel}')>"
+
+
+class ReportCache(Base):
+    """Cached report result of the shared backend (REPORT_CACHE_BACKEND=table, see report_cache.py)."""
+    __tablename__ = "report_cache"
+    cache_key = Column(String(255), primary_key=True)
+    bericht = Column(String(50), nullable=False)  # e.g. "time_entries", "analytics_pivot"
+    benutzer_id = Column(Integer, nullable=True)  # NULL = all users
+    projekt_id = Column(Integer, nullable=True)  # NULL = all projects
+    start_datum = Column(Date, nullable=False)
+    end_datum = Column(Date, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    ablauf_am = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Invalidation by period, expiry cleanup
+        Index("ix_report_cache_zeitraum", "start_datum", "end_datum"),
+        Index("ix_report_cache_ablauf_am", "ablauf_am"),
+    )
+
+    def __repr__(self):
+        return f"<ReportCache(cache_key='{self.cache_key}')>"
+
+
+class ReportJob(Base):
+    """Report computed in the background by a report_jobs runner (see report_jobs.py)."""
+    __tablename__ = "report_jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    benutzer_id = Column(Integer, ForeignKey("benutzer.id", ondelete="CASCADE"), nullable=False)
+    bericht = Column(String(50), nullable=False)  # e.g. "time_entries", "summary"
+    format = Column(String(10), nullable=False)  # "json" or "csv"
+    parameter = Column(Text, nullable=False)  # JSON: period, filters, rate
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    fortschritt = Column(Integer, nullable=False, default=0)  # percent
+    versuche = Column(Integer, nullable=False, default=0)
+    fehler = Column(Text, nullable=True)
+    ergebnis = Column(LargeBinary, nullable=True)  # gzip-compressed JSON/CSV
+    ergebnis_bytes = Column(Integer, nullable=True)  # uncompressed size
+    erstellt_am = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    gestartet_am = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_am = Column(DateTime(timezone=True), nullable=True)  # last sign of life of the runner
+    beendet_am = Column(DateTime(timezone=True), nullable=True)
+    ablauf_am = Column(DateTime(timezone=True), nullable=True)  # result is deleted after this
+
+    __table_args__ = (
+        # Claiming the next job, finding stale running jobs
+        Index("ix_report_jobs_status_id", "status", "id"),
+        # Job list of a user
+        Index("ix_report_jobs_benutzer_id", "benutzer_id", "id"),
+        Index("ix_report_jobs_ablauf_am", "ablauf_am"),
+    )
+
+    def __repr__(self):
+        return f"<ReportJob(id={self.id}, bericht='{self.bericht}', status='{self.status}')>"
@@ -0,0 +1,150 @@
+# page_cache.py - In-memory cache for HTML pages that only depend on their template
+#
+# Pages are rendered once (lazily or via warm()) and kept together with gzip/brotli
+# variants, an ETag and a Last-Modified date. Requests are answered from memory,
+# including 304 responses for revalidation, without touching the database.
+# With PAGE_CACHE_WATCH=1 every request checks whether the template file changed
+# and re-renders it, so template edits show up without a restart during development.
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from jinja2 import Environment, Template
+
+import static_assets
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+WATCH_TEMPLATES = os.getenv("PAGE_CACHE_WATCH", "false").lower() in ("1", "true", "yes")
+
+# The HTML itself is revalidated on every navigation (cheap 304), so new asset
+# URLs from a static build are picked up immediately
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class CachedPage:
+    template: Template
+    status_code: int
+    body: bytes
+    gzip_body: bytes | None
+    br_body: bytes | None
+    etag: str
+    last_modified: str
+    manifest_mtime: float | None
+
+
+def _mtime(path: str | None) -> float | None:
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() == encoding:
+            return params.strip().replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class PageCache:
+    def __init__(self, env: Environment, watch: bool = WATCH_TEMPLATES):
+        self.env = env
+        self.watch = watch
+        self._lock = threading.Lock()
+        self._pages: dict[tuple, CachedPage] = {}
+
+    def _render(self, name: str, context: dict, status_code: int) -> CachedPage:
+        template = self.env.get_template(name)
+        body = template.render(**context).encode("utf-8")
+        gzip_body = gzip.compress(body, compresslevel=6)
+        br_body = brotli.compress(body, quality=11) if brotli else None
+        manifest_mtime = _mtime(static_assets.MANIFEST_PATH)
+        last_modified = max(filter(None, (_mtime(template.filename), manifest_mtime)), default=None)
+        return CachedPage(
+            template=template,
+            status_code=status_code,
+            body=body,
+            gzip_body=gzip_body if len(gzip_body) < len(body) else None,
+            br_body=br_body if br_body is not None and len(br_body) < len(body) else None,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            last_modified=formatdate(last_modified, usegmt=True) if last_modified else formatdate(usegmt=True),
+            manifest_mtime=manifest_mtime,
+        )
+
+    def _is_stale(self, page: CachedPage) -> bool:
+        if not page.template.is_up_to_date:
+            return True
+        if _mtime(static_assets.MANIFEST_PATH) != page.manifest_mtime:
+            static_assets.load_manifest()
+            return True
+        return False
+
+    def get(self, name: str, context: dict | None = None, status_code: int = 200) -> CachedPage:
+        context = context or {}
+        key = (name, status_code, json.dumps(context, sort_keys=True, default=str))
+        page = self._pages.get(key)
+        if page is None or (self.watch and self._is_stale(page)):
+            page = self._render(name, context, status_code)
+            with self._lock:
+                self._pages[key] = page
+            logger.debug("Rendered page %s", name)
+        return page
+
+    def warm(self, *names: str) -> None:
+        for name in names:
+            self.get(name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def response(self, request: Request, name: str, context: dict | None = None, status_code: int = 200) -> Response:
+        """Response for a cached page, honouring If-None-Match/If-Modified-Since and Accept-Encoding."""
+        page = self.get(name, context, status_code)
+        headers = {
+            "ETag": page.etag,
+            "Last-Modified": page.last_modified,
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if status_code == 200 and self._not_modified(request, page):
+            return Response(status_code=304, headers=headers)
+
+        body = page.body
+        if page.br_body is not None and _accepts(request, "br"):
+            body = page.br_body
+            headers["Content-Encoding"] = "br"
+        elif page.gzip_body is not None and _accepts(request, "gzip"):
+            body = page.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return HTMLResponse(content=body, status_code=page.status_code, headers=headers)
+
+    @staticmethod
+    def _not_modified(request: Request, page: CachedPage) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or page.etag in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(page.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,188 @@
+# refdata_cache.py - In-process cache for reference data (projects, tasks, roles, absence types)
+#
+# Every gunicorn worker keeps its own copy of these small tables. Writes in crud.py
+# call notify_change(), which emits a Postgres NOTIFY inside the writing transaction.
+# A listener thread per worker receives the notification after commit and drops the
+# table from the cache, so all workers on all upstream nodes stay coherent.
+# The TTL is only a safety net for missed notifications.
+# Other caches (report_cache) subscribe() further channels to the same listener.
+
+import logging
+import os
+import select
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import engine, on_primary
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "refdata_changed"
+TTL_SECONDS = float(os.getenv("REFDATA_CACHE_TTL", "300"))
+
+# table name -> (ORM model, response schema)
+TABLES = {
+    "rollen": (models.Rolle, schemas.Rolle),
+    "projekte": (models.Projekt, schemas.Projekt),
+    "aufgaben": (models.Aufgabe, schemas.Aufgabe),
+    "abwesenheit_typen": (models.AbwesenheitTyp, schemas.AbwesenheitTyp),
+}
+
+
+@dataclass
+class _Entry:
+    version: int
+    loaded_at: float
+    rows: list = field(default_factory=list)
+    by_id: dict = field(default_factory=dict)
+
+
+class RefDataCache:
+    def __init__(self, ttl: float = TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {table: 0 for table in TABLES}
+        self._entries: dict[str, _Entry] = {}
+
+    def _entry(self, db: Session, table: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(table)
+            version = self._versions[table]
+        if entry is not None and entry.version == version and time.monotonic() - entry.loaded_at < self.ttl:
+            return entry
+
+        model, schema = TABLES[table]
+        # Always from the primary: a lagging replica could put pre-change rows under the new version
+        with on_primary(db):
+            query = db.query(model)
+            if hasattr(model, "geloescht_am"):
+                # Archived rows are not reference data anymore
+                query = query.filter(model.geloescht_am.is_(None))
+            if model is models.Aufgabe:
+                # Tasks of archived projects go with their project (crud.archive_projekt notifies both)
+                query = query.join(models.Projekt).filter(models.Projekt.geloescht_am.is_(None))
+            rows = [schema.model_validate(obj, from_attributes=True) for obj in query.order_by(model.id).all()]
+        entry = _Entry(version=version, loaded_at=time.monotonic(), rows=rows, by_id={row.id: row for row in rows})
+        with self._lock:
+            # Only keep the result if nothing changed while we were loading
+            if self._versions[table] == version:
+                self._entries[table] = entry
+        return entry
+
+    def get_all(self, db: Session, table: str) -> list:
+        return self._entry(db, table).rows
+
+    def get(self, db: Session, table: str, row_id: int):
+        return self._entry(db, table).by_id.get(row_id)
+
+    def invalidate(self, table: str | None = None) -> None:
+        with self._lock:
+            tables = [table] if table else list(TABLES)
+            for name in tables:
+                if name in self._versions:
+                    self._versions[name] += 1
+                    self._entries.pop(name, None)
+
+
+cache = RefDataCache()
+
+def get_all(db: Session, table: str) -> list:
+    return cache.get_all(db, table)
+
+def get(db: Session, table: str, row_id: int):
+    return cache.get(db, table, row_id)
+
+def notify_change(db: Session, *tables: str) -> None:
+    """
+    Call before db.commit() of a write to a reference table. The NOTIFY is part of
+    the transaction, so other workers only see it once the change is committed.
+    The local worker is invalidated right after the commit.
+    """
+    # Part of a write, so never on the replica
+    db.info["replica"] = False
+    if db.get_bind().dialect.name == "postgresql":
+        for table in tables:
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": table})
+
+    def _invalidate_local(session):
+        for table in tables:
+            cache.invalidate(table)
+
+    event.listen(db, "after_commit", _invalidate_local, once=True)
+
+# ---------- LISTEN thread ----------
+_listener_thread: threading.Thread | None = None
+_stop_event = threading.Event()
+# channel -> handler(payload); payload None means "drop everything" (reconnects, empty NOTIFY)
+_handlers = {CHANNEL: cache.invalidate}
+
+def subscribe(channel: str, handler) -> None:
+    """Register a further channel for the listener thread; call before start_listener()."""
+    _handlers[channel] = handler
+
+def _dispatch(notification) -> None:
+    handler = _handlers.get(notification.channel)
+    if handler is not None:
+        handler(notification.payload or None)
+
+def _invalidate_all() -> None:
+    for handler in _handlers.values():
+        handler(None)
+
+def _listen_loop():
+    while not _stop_event.is_set():
+        connection = None
+        try:
+            # Detach a connection from the pool so the listener does not hold a pool slot
+            connection = engine.raw_connection()
+            connection.detach()
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            for channel in _handlers:
+                cursor.execute(f"LISTEN {channel}")
+            # Notifications may have been missed while (re)connecting
+            _invalidate_all()
+            logger.info("Cache listener on channels %s", ", ".join(_handlers))
+
+            while not _stop_event.is_set():
+                if callable(dbapi_connection.notifies):
+                    # psycopg 3 (DB_DRIVER=psycopg): generator that ends after the timeout
+                    for notification in dbapi_connection.notifies(timeout=5.0):
+                        _dispatch(notification)
+                    continue
+                if select.select([dbapi_connection], [], [], 5.0) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    _dispatch(dbapi_connection.notifies.pop(0))
+        except Exception as e:
+            logger.warning("Cache listener failed, retrying: %s", e)
+            _invalidate_all()
+            _stop_event.wait(5.0)
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+def start_listener() -> None:
+    """Start the per-worker LISTEN thread. Without Postgres only the TTL applies."""
+    global _listener_thread
+    if engine.dialect.name != "postgresql":
+        return
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    _stop_event.clear()
+    _listener_thread = threading.Thread(target=_listen_loop, name="refdata-cache-listener", daemon=True)
+    _listener_thread.start()
+
+def stop_listener() -> None:
+    _stop_event.set()
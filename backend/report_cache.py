@@ -0,0 +1,300 @@
+# report_cache.py - Cache for report results with write-aware invalidation
+#
+# The same monthly reports are requested over and over (several managers, several
+# tabs), and every request rescans the time entries of the period. Results are cached
+# under a ReportKey: report, user/project filter, period, granularity and rate.
+# A write only drops the cached results it can change: those whose user/project scope
+# contains the written entry and whose period contains its date.
+#
+# crud.py calls notify_write() before db.commit(), like refdata_cache.notify_change().
+# REPORT_CACHE_BACKEND selects where results live:
+#   lru    (default) per-process LRU of at most REPORT_CACHE_MAX_ENTRIES results. The
+#          change goes out as a Postgres NOTIFY inside the writing transaction; the
+#          refdata_cache listener thread of every worker on every upstream node drops
+#          the matching results once the write is committed.
+#   table  report_cache table, shared by all workers and nodes. The DELETE of the
+#          matching rows is part of the writing transaction.
+#   off    no caching.
+# Reports are computed on the read replica, which can still lag behind a write that
+# already invalidated them; REPORT_CACHE_TTL bounds how long such a result is served.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, delete, event, func, or_, select, text, true
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import metrics
+import models
+import refdata_cache
+from database import engine, reader_engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.getenv("REPORT_CACHE_BACKEND", "lru").lower()
+MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL", "300"))
+CLEANUP_INTERVAL_SECONDS = 600
+
+CHANNEL = "report_cache_changed"
+# pg_notify payloads are limited to 8000 bytes; larger change sets drop everything
+MAX_PAYLOAD_BYTES = 7900
+
+
+@dataclass(frozen=True)
+class ReportKey:
+    report: str
+    benutzer_id: int | None  # None = all users
+    projekt_id: int | None  # None = all projects
+    start: date
+    end: date
+    granularity: str = "entries"
+    rate: float | None = None
+    variant: str = ""  # further report specific parameters
+
+    @property
+    def cache_key(self) -> str:
+        return "|".join(str(value) for value in (
+            self.report, self.benutzer_id, self.projekt_id, self.start, self.end,
+            self.granularity, self.rate, self.variant,
+        ))
+
+
+@dataclass(frozen=True)
+class Change:
+    """Written time entries of a user/project (None = all) between von and bis (None = open)."""
+    benutzer_id: int | None = None
+    projekt_id: int | None = None
+    von: date | None = None
+    bis: date | None = None
+
+    @classmethod
+    def entry(cls, benutzer_id: int, projekt_id: int, datum: date) -> "Change":
+        return cls(benutzer_id, projekt_id, datum, datum)
+
+    def affects(self, key: ReportKey) -> bool:
+        return (
+            (self.benutzer_id is None or key.benutzer_id is None or key.benutzer_id == self.benutzer_id)
+            and (self.projekt_id is None or key.projekt_id is None or key.projekt_id == self.projekt_id)
+            and (self.bis is None or key.start <= self.bis)
+            and (self.von is None or self.von <= key.end)
+        )
+
+
+def _merge(changes) -> list[Change]:
+    """One change per user/project, covering all of its dates."""
+    merged: dict[tuple, Change] = {}
+    for change in changes:
+        scope = (change.benutzer_id, change.projekt_id)
+        other = merged.get(scope)
+        if other is not None:
+            change = Change(
+                change.benutzer_id, change.projekt_id,
+                None if other.von is None or change.von is None else min(other.von, change.von),
+                None if other.bis is None or change.bis is None else max(other.bis, change.bis),
+            )
+        merged[scope] = change
+    return list(merged.values())
+
+
+def _encode(changes: list[Change] | None) -> str:
+    if changes is None:
+        return ""
+    payload = json.dumps([
+        [c.benutzer_id, c.projekt_id, c.von and c.von.isoformat(), c.bis and c.bis.isoformat()] for c in changes
+    ], separators=(",", ":"))
+    return payload if len(payload) <= MAX_PAYLOAD_BYTES else ""
+
+
+def _decode(payload: str | None) -> list[Change] | None:
+    if not payload:
+        return None
+    try:
+        return [
+            Change(b, p, v and date.fromisoformat(v), e and date.fromisoformat(e))
+            for b, p, v, e in json.loads(payload)
+        ]
+    except (ValueError, TypeError):
+        logger.warning("Invalid report cache notification: %r", payload)
+        return None
+
+
+class LRUBackend:
+    name = "lru"
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[ReportKey, tuple[float, Any]] = OrderedDict()
+        self._generation = 0  # bumped on every invalidation, guards against storing stale results
+
+    def get(self, key: ReportKey) -> tuple[Any, int]:
+        with self._lock:
+            generation = self._generation
+            item = self._entries.get(key)
+            if item is None:
+                return None, generation
+            if time.monotonic() - item[0] >= self.ttl:
+                del self._entries[key]
+                return None, generation
+            self._entries.move_to_end(key)
+            return item[1], generation
+
+    def put(self, key: ReportKey, value, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def notify(self, db: Session, changes: list[Change] | None) -> None:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": _encode(changes)})
+
+    def invalidate(self, changes: list[Change] | None) -> int:
+        with self._lock:
+            self._generation += 1
+            if changes is None:
+                keys = list(self._entries)
+            else:
+                keys = [key for key in self._entries if any(change.affects(key) for change in changes)]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            metrics.REPORT_CACHE_INVALIDATIONS.labels(self.name).inc(len(keys))
+        return len(keys)
+
+
+class TableBackend:
+    name = "table"
+
+    def __init__(self, ttl: float = TTL_SECONDS):
+        self.ttl = timedelta(seconds=ttl)
+        self._cleanup_lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def get(self, key: ReportKey) -> tuple[Any, int]:
+        table = models.ReportCache
+        # Never from the Postgres replica: it could still hold rows the primary already deleted.
+        # The SQLite readers see the same file without taking the writer lock.
+        bind = reader_engine or engine
+        with bind.connect() as connection:
+            payload = connection.execute(
+                select(table.payload).where(table.cache_key == key.cache_key, table.ablauf_am > datetime.now(timezone.utc))
+            ).scalar()
+        return (json.loads(payload) if payload is not None else None), 0
+
+    def put(self, key: ReportKey, value, generation: int) -> None:
+        table = models.ReportCache
+        insert = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        values = dict(
+            cache_key=key.cache_key, bericht=key.report, benutzer_id=key.benutzer_id, projekt_id=key.projekt_id,
+            start_datum=key.start, end_datum=key.end, payload=json.dumps(value, separators=(",", ":")),
+            ablauf_am=datetime.now(timezone.utc) + self.ttl,
+        )
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.cache_key],
+            set_={"payload": stmt.excluded.payload, "ablauf_am": stmt.excluded.ablauf_am, "erstellt_am": func.now()},
+        )
+        try:
+            with engine.begin() as connection:
+                connection.execute(stmt)
+            self._maybe_cleanup()
+        except Exception as e:
+            # Caching is best effort, the report itself was computed
+            logger.warning("Storing report %s in the cache failed: %s", key.cache_key, e)
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_cleanup = now
+            with engine.begin() as connection:
+                connection.execute(delete(models.ReportCache).where(models.ReportCache.ablauf_am < datetime.now(timezone.utc)))
+        finally:
+            self._cleanup_lock.release()
+
+    def notify(self, db: Session, changes: list[Change] | None) -> None:
+        table = models.ReportCache
+        condition = true()
+        if changes is not None:
+            condition = or_(*(and_(
+                true() if c.benutzer_id is None else or_(table.benutzer_id.is_(None), table.benutzer_id == c.benutzer_id),
+                true() if c.projekt_id is None else or_(table.projekt_id.is_(None), table.projekt_id == c.projekt_id),
+                true() if c.bis is None else table.start_datum <= c.bis,
+                true() if c.von is None else table.end_datum >= c.von,
+            ) for c in changes))
+        removed = db.execute(delete(table).where(condition)).rowcount
+        if removed:
+            metrics.REPORT_CACHE_INVALIDATIONS.labels(self.name).inc(removed)
+
+    def invalidate(self, changes: list[Change] | None) -> int:
+        # Already done by the DELETE in the writing transaction
+        return 0
+
+
+def _create_backend():
+    if BACKEND == "lru":
+        return LRUBackend()
+    if BACKEND == "table":
+        return TableBackend()
+    if BACKEND == "off":
+        return None
+    raise ValueError(f"Unknown REPORT_CACHE_BACKEND '{BACKEND}', expected lru, table or off")
+
+
+backend = _create_backend()
+
+if isinstance(backend, LRUBackend):
+    refdata_cache.subscribe(CHANNEL, lambda payload: backend.invalidate(_decode(payload)))
+
+
+def get_or_compute(key: ReportKey, compute: Callable[[], Any]):
+    """
+    Cached result for key, otherwise compute() (stored in JSON-compatible form, so hits
+    and misses return the same values).
+    """
+    if backend is None:
+        return jsonable_encoder(compute())
+    value, generation = backend.get(key)
+    if value is not None:
+        metrics.REPORT_CACHE_REQUESTS.labels(key.report, "hit").inc()
+        return value
+    metrics.REPORT_CACHE_REQUESTS.labels(key.report, "miss").inc()
+    value = jsonable_encoder(compute())
+    backend.put(key, value, generation)
+    return value
+
+
+def notify_write(db: Session, *changes: Change) -> None:
+    """
+    Call before db.commit() of a write that changes report results: time entries,
+    names of users, projects and tasks shown in reports, or tasks and planned hours (burndown). Without changes every cached
+    report is dropped. Other workers only see the invalidation once the write is committed.
+    """
+    if backend is None:
+        return
+    merged = _merge(changes) if changes else None
+    # Part of a write, so never on the replica
+    db.info["replica"] = False
+    backend.notify(db, merged)
+
+    def _invalidate_local(session):
+        backend.invalidate(merged)
+
+    event.listen(db, "after_commit", _invalidate_local, once=True)
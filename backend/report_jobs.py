@@ -0,0 +1,439 @@
+#!/usr/bin/env python
+# report_jobs.py - DB-backed queue for long running reports and exports
+#
+# Year-long company reports and exports take longer than nginx's proxy_read_timeout
+# and would hold a worker thread the whole time. POST /api/v1/reports/jobs only inserts
+# a row into report_jobs (status "queued"); a runner claims queued jobs with
+# SELECT ... FOR UPDATE SKIP LOCKED and computes them in a process pool of
+# REPORT_JOBS_CONCURRENCY processes. A job computes its period month by month and
+# writes its progress to the row; the result (JSON or CSV, stored gzipped) can be
+# downloaded until ablauf_am, then it is deleted.
+#
+# Runners:
+#   - under launcher.py the gunicorn master starts one runner process (this file) next
+#     to the web workers and stops it on shutdown (REPORT_JOBS_RUNNER=false disables it),
+#   - in development (uvicorn) the app runs the runner loop in a thread,
+#   - further runners, e.g. on other nodes: python report_jobs.py. SKIP LOCKED hands
+#     every job to exactly one of them, no extra services needed.
+# A job whose runner died (no heartbeat for REPORT_JOBS_STALE_SECONDS) is queued again,
+# at most REPORT_JOBS_MAX_ATTEMPTS times in total.
+#
+# Usage (from backend/):
+#     python report_jobs.py [--concurrency N]
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import case, delete, func, select, update
+
+import metrics
+import models
+import replica
+from database import SessionLocal, engine
+import sqlite_engine
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CONCURRENCY = int(os.getenv("REPORT_JOBS_CONCURRENCY", "2"))
+RUNNER_ENABLED = os.getenv("REPORT_JOBS_RUNNER", "true").lower() in ("1", "true", "yes")
+RESULT_TTL = timedelta(hours=float(os.getenv("REPORT_JOBS_RESULT_TTL_HOURS", "24")))
+STALE_SECONDS = float(os.getenv("REPORT_JOBS_STALE_SECONDS", "600"))
+MAX_ATTEMPTS = int(os.getenv("REPORT_JOBS_MAX_ATTEMPTS", "3"))
+POLL_SECONDS = float(os.getenv("REPORT_JOBS_POLL_SECONDS", "2"))
+MAINTENANCE_INTERVAL_SECONDS = 60
+
+# Starlette appends "; charset=utf-8" to text/* media types itself
+FORMATS = {"json": "application/json", "csv": "text/csv"}
+
+
+class JobCancelled(Exception):
+    """The job row was deleted (cancelled) or taken over while it was running."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------- Reports ----------
+# Every report returns the rows of one month; the job concatenates them and renders
+# JSON or CSV. The row keys of time_entries are those of GET /time-entries/report.
+
+def _months(start: date, end: date) -> list[tuple[date, date]]:
+    months = []
+    von = start
+    while von <= end:
+        next_month = (von.replace(day=1) + timedelta(days=32)).replace(day=1)
+        bis = min(end, next_month - timedelta(days=1))
+        months.append((von, bis))
+        von = next_month
+    return months
+
+
+def _filters(params: dict, von: date, bis: date) -> list:
+    z = models.Zeiteintrag
+    filters = [z.datum >= von, z.datum <= bis]
+    if params.get("user_id") is not None:
+        filters.append(z.benutzer_id == params["user_id"])
+    if params.get("project_id") is not None:
+        filters.append(z.projekt_id == params["project_id"])
+    return filters
+
+
+def _time_entries_rows(db, params: dict, von: date, bis: date) -> list[dict]:
+    z, b, p, a = models.Zeiteintrag, models.Benutzer, models.Projekt, models.Aufgabe
+    rate = params["hourly_rate"]
+    stmt = (
+        select(
+            z.id, z.datum, z.benutzer_id, b.vorname, b.nachname, z.projekt_id, p.name, z.aufgabe_id, a.name,
+            z.startzeit, z.endzeit, z.stunden, z.beschreibung, z.ist_abrechenbar,
+        )
+        .select_from(z)
+        .outerjoin(b, b.id == z.benutzer_id)
+        .outerjoin(p, p.id == z.projekt_id)
+        .outerjoin(a, a.id == z.aufgabe_id)
+        .where(*_filters(params, von, bis))
+        .order_by(z.datum, z.id)
+    )
+    rows = []
+    for (id_, datum, benutzer_id, vorname, nachname, projekt_id, projekt, aufgabe_id, aufgabe,
+         startzeit, endzeit, stunden, beschreibung, abrechenbar) in db.execute(stmt):
+        hours = float(stunden) if stunden is not None else None
+        rows.append({
+            "id": id_,
+            "date": datum,
+            "user_id": benutzer_id,
+            "user_name": f"{vorname} {nachname}" if vorname is not None else "Unknown",
+            "project_id": projekt_id,
+            "project_name": projekt or "Unknown",
+            "task_id": aufgabe_id,
+            "task_name": aufgabe or "Unknown",
+            "start_time": startzeit.strftime("%H:%M") if startzeit else None,
+            "end_time": endzeit.strftime("%H:%M") if endzeit else None,
+            "duration_decimal": hours,
+            "description": beschreibung,
+            "is_billable": abrechenbar,
+            "earnings": hours * rate if hours is not None else 0.0,
+        })
+    return rows
+
+
+def _summary_rows(db, params: dict, von: date, bis: date) -> list[dict]:
+    z, b, p = models.Zeiteintrag, models.Benutzer, models.Projekt
+    rate = params["hourly_rate"]
+    hours = func.coalesce(func.sum(z.stunden), 0)
+    billable = func.coalesce(func.sum(case((z.ist_abrechenbar, z.stunden), else_=0)), 0)
+    stmt = (
+        select(z.benutzer_id, b.vorname, b.nachname, z.projekt_id, p.name, hours, billable, func.count())
+        .select_from(z)
+        .outerjoin(b, b.id == z.benutzer_id)
+        .outerjoin(p, p.id == z.projekt_id)
+        .where(*_filters(params, von, bis))
+        .group_by(z.benutzer_id, b.vorname, b.nachname, z.projekt_id, p.name)
+        .order_by(z.benutzer_id, z.projekt_id)
+    )
+    month = von.strftime("%Y-%m")
+    return [
+        {
+            "month": month,
+            "user_id": benutzer_id,
+            "user_name": f"{vorname} {nachname}" if vorname is not None else "Unknown",
+            "project_id": projekt_id,
+            "project_name": projekt or "Unknown",
+            "entries": count,
+            "hours": float(total),
+            "billable_hours": float(total_billable),
+            "earnings": float(total) * rate,
+        }
+        for benutzer_id, vorname, nachname, projekt_id, projekt, total, total_billable, count in db.execute(stmt)
+    ]
+
+
+REPORTS = {
+    "time_entries": _time_entries_rows,
+    "summary": _summary_rows,
+}
+
+
+def _render(report: str, fmt: str, params: dict, rows: list[dict]) -> bytes:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        columns = list(rows[0]) if rows else []
+        # Semicolon and BOM: opens directly in a German Excel
+        writer = csv.DictWriter(buffer, fieldnames=columns, delimiter=";")
+        writer.writeheader()
+        writer.writerows(rows)
+        return ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    key = "entries" if report == "time_entries" else "rows"
+    total_hours = sum(row["duration_decimal"] or 0 for row in rows) if report == "time_entries" else sum(row["hours"] for row in rows)
+    payload = {
+        "report": report,
+        "parameters": params,
+        "total_hours": total_hours,
+        "total_earnings": total_hours * params["hourly_rate"],
+        "distinct_users_count": len({row["user_id"] for row in rows}),
+        key: rows,
+    }
+    if report == "time_entries":
+        payload["total_work_days"] = len({row["date"] for row in rows})
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+
+
+# ---------- Queue ----------
+def enqueue(db, benutzer_id: int, report: str, fmt: str, params: dict) -> models.ReportJob:
+    job = models.ReportJob(
+        benutzer_id=benutzer_id, bericht=report, format=fmt,
+        parameter=json.dumps(jsonable_encoder(params)), status="queued",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_next() -> int | None:
+    """Marks the oldest queued job as running and returns its id; None if the queue is empty."""
+    job = models.ReportJob
+    next_id = (
+        select(job.id).where(job.status == "queued").order_by(job.id).limit(1)
+        # Concurrent runners skip the row instead of waiting for it (SQLite: BEGIN IMMEDIATE serializes)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    now = _now()
+    with engine.begin() as connection:
+        return connection.execute(
+            update(job).where(job.id == next_id).values(
+                status="running", fortschritt=0, versuche=job.versuche + 1,
+                gestartet_am=now, heartbeat_am=now, fehler=None,
+            ).returning(job.id)
+        ).scalar()
+
+
+def _update_running(job_id: int, **values) -> None:
+    job = models.ReportJob
+    with engine.begin() as connection:
+        result = connection.execute(update(job).where(job.id == job_id, job.status == "running").values(**values))
+    if result.rowcount == 0:
+        raise JobCancelled(job_id)
+
+
+def _requeue_or_fail(condition, reason: str) -> int:
+    """Running jobs matching condition go back to the queue, or fail after MAX_ATTEMPTS."""
+    job = models.ReportJob
+    now = _now()
+    with engine.begin() as connection:
+        result = connection.execute(
+            update(job).where(job.status == "running", condition).values(
+                status=case((job.versuche < MAX_ATTEMPTS, "queued"), else_="failed"),
+                fehler=reason,
+                beendet_am=case((job.versuche < MAX_ATTEMPTS, None), else_=now),
+                ablauf_am=case((job.versuche < MAX_ATTEMPTS, None), else_=now + RESULT_TTL),
+            )
+        )
+    return result.rowcount
+
+
+def _maintenance() -> None:
+    job = models.ReportJob
+    stale = _requeue_or_fail(job.heartbeat_am < _now() - timedelta(seconds=STALE_SECONDS), "Runner ohne Lebenszeichen")
+    if stale:
+        logger.warning("Requeued %d report jobs without heartbeat", stale)
+    with engine.begin() as connection:
+        removed = connection.execute(delete(job).where(job.ablauf_am < _now())).rowcount
+    if removed:
+        logger.info("Removed %d expired report jobs", removed)
+
+
+# ---------- Execution (in the pool processes) ----------
+def _init_process() -> None:
+    # Spawned: fresh imports and connection pools, only logging needs to be set up
+    import logging_config
+    logging_config.setup_logging()
+
+
+def execute(job_id: int) -> str:
+    """Computes one claimed job and stores its result. Returns the final status."""
+    started = time.perf_counter()
+    db = SessionLocal()
+    # The reports only read, the read replica takes the load if there is one and it is
+    # not behind. No lag monitor runs in the pool processes: measure once per job.
+    if replica.ENABLED:
+        replica.check_lag()
+    db.info["replica"] = replica.replica_usable()
+    report = "unknown"
+    try:
+        job = db.get(models.ReportJob, job_id)
+        if job is None:
+            raise JobCancelled(job_id)
+        report, fmt, params = job.bericht, job.format, json.loads(job.parameter)
+        db.rollback()
+        compute = REPORTS[report]
+        months = _months(date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"]))
+        rows = []
+        for done, (von, bis) in enumerate(months, 1):
+            rows += compute(db, params, von, bis)
+            # One short read transaction per month, no snapshot held for the whole year
+            db.rollback()
+            # The last 10 % are rendering and compressing the result
+            _update_running(job_id, fortschritt=done * 90 // len(months), heartbeat_am=_now())
+
+        content = _render(report, fmt, params, rows)
+        now = _now()
+        _update_running(
+            job_id, status="done", fortschritt=100, ergebnis=gzip.compress(content, compresslevel=6),
+            ergebnis_bytes=len(content), beendet_am=now, ablauf_am=now + RESULT_TTL,
+        )
+        status = "done"
+        logger.info("Report job %s (%s, %d rows) done in %.1f s", job_id, report, len(rows), time.perf_counter() - started)
+    except JobCancelled:
+        logger.info("Report job %s was cancelled", job_id)
+        return "cancelled"
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        status = "failed"
+        now = _now()
+        try:
+            _update_running(job_id, status="failed", fehler=str(e)[:2000], beendet_am=now, ablauf_am=now + RESULT_TTL)
+        except JobCancelled:
+            pass
+    finally:
+        db.close()
+    metrics.REPORT_JOBS_FINISHED.labels(report, status).inc()
+    metrics.REPORT_JOB_DURATION.labels(report).observe(time.perf_counter() - started)
+    return status
+
+
+# ---------- Runner ----------
+def _executor(concurrency: int):
+    if engine.dialect.name == "sqlite" and sqlite_engine.is_memory(engine.url):
+        # Other processes cannot see an in-memory database
+        return ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="report-job")
+    # spawn, not fork: the runner may have threads and open connections
+    return ProcessPoolExecutor(
+        max_workers=concurrency, mp_context=multiprocessing.get_context("spawn"), initializer=_init_process,
+    )
+
+
+def run(stop: threading.Event, concurrency: int = CONCURRENCY) -> None:
+    """Claims and runs jobs until stop is set, at most concurrency at a time."""
+    job = models.ReportJob
+    executor = _executor(concurrency)
+    running: dict[Future, int] = {}
+    last_maintenance = 0.0
+    logger.info("Report job runner started (concurrency %d)", concurrency)
+    try:
+        while not stop.is_set():
+            try:
+                for future in [future for future in running if future.done()]:
+                    job_id = running.pop(future)
+                    if future.exception() is not None:
+                        # The process died (e.g. out of memory); execute() handles everything else
+                        logger.error("Report job %s crashed: %s", job_id, future.exception())
+                        _requeue_or_fail(job.id == job_id, f"Prozess abgebrochen: {future.exception()}")
+                        if isinstance(future.exception(), BrokenProcessPool):
+                            if running:
+                                _requeue_or_fail(job.id.in_(list(running.values())), "Prozess abgebrochen")
+                            running.clear()
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            executor = _executor(concurrency)
+                            break
+
+                if running:
+                    with engine.begin() as connection:
+                        connection.execute(
+                            update(job).where(job.id.in_(list(running.values())), job.status == "running")
+                            .values(heartbeat_am=_now())
+                        )
+                if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL_SECONDS:
+                    last_maintenance = time.monotonic()
+                    _maintenance()
+
+                while len(running) < concurrency:
+                    job_id = claim_next()
+                    if job_id is None:
+                        break
+                    logger.info("Report job %s claimed", job_id)
+                    running[executor.submit(execute, job_id)] = job_id
+            except Exception as e:
+                logger.warning("Report job runner iteration failed: %s", e)
+            stop.wait(POLL_SECONDS)
+    finally:
+        if running:
+            # Picked up again by this or another runner; a still running computation
+            # can no longer store its result (status is not "running" anymore)
+            _requeue_or_fail(job.id.in_(list(running.values())), "Runner beendet")
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Report job runner stopped")
+
+
+# In-process runner (development)
+_runner_thread: threading.Thread | None = None
+_stop_event = threading.Event()
+
+
+def start_thread() -> None:
+    global _runner_thread
+    if not RUNNER_ENABLED or (_runner_thread is not None and _runner_thread.is_alive()):
+        return
+    _stop_event.clear()
+    _runner_thread = threading.Thread(target=run, args=(_stop_event,), name="report-job-runner", daemon=True)
+    _runner_thread.start()
+
+
+def stop_thread() -> None:
+    _stop_event.set()
+
+
+# Runner process next to gunicorn (gunicorn.conf.py)
+def spawn_runner() -> subprocess.Popen | None:
+    if not RUNNER_ENABLED:
+        return None
+    return subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "report_jobs.py")], cwd=BASE_DIR)
+
+
+def stop_runner(process: subprocess.Popen | None, timeout: float = 10.0) -> None:
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs queued report jobs.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="reports computed at the same time (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    import logging_config
+    logging_config.setup_logging()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run(stop, args.concurrency)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 import crud
 import models
 import schemas
+import refdata_cache
 from database import get_db
 from routers.auth import get_current_active_user, admin_required
 
@@ -24,7 +25,7 @@ def read_absence_types_api(
     db: Session = Depends(get_db),
     current_user: models.Benutzer = Depends(get_current_active_user) # Allow all users to read absence types
 ):
-    return crud.get_abwesenheit_typen(db, skip=skip, limit=limit)
+    return refdata_cache.get_all(db, "abwesenheit_typen")[skip:skip + limit]
 
 @router.get("/{absence_type_id}", response_model=schemas.AbwesenheitTyp)
 def read_absence_type_api(
@@ -1,12 +1,17 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
 
 import crud
 import models
 import schemas
+import refdata_cache
+import fast_json
+import idempotency
 from database import get_db
+from replica import get_async_read_db
 from routers.auth import get_current_active_user
 
 router = APIRouter()
@@ -14,6 +19,7 @@ router = APIRouter()
 @router.post("/", response_model=schemas.Abwesenheit, status_code=status.HTTP_201_CREATED)
 def create_abwesenheit_api(
     abwesenheit_in: schemas.AbwesenheitCreate,
+    idempotency_key: str | None = Header(None, alias=idempotency.HEADER),
     db: Session = Depends(get_db),
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
@@ -23,29 +29,39 @@ def create_abwesenheit_api(
     elif current_user.id != abwesenheit_in.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
          raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to create absence for another user")
     
-    if not crud.get_abwesenheit_typ(db, abwesenheit_in.abwesenheit_typ_id):
+    if not refdata_cache.get(db, "abwesenheit_typen", abwesenheit_in.abwesenheit_typ_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"AbwesenheitTyp mit ID {abwesenheit_in.abwesenheit_typ_id} nicht gefunden")
     
-    return crud.create_abwesenheit(db=db, abwesenheit=abwesenheit_in, beantragt_von_benutzer_id=current_user.id)
+    # Retries with the same Idempotency-Key get the stored response instead of a second request (and email)
+    return idempotency.run(
+        db, current_user.id, idempotency_key, "POST /api/v1/absences/", abwesenheit_in,
+        lambda: crud.add_abwesenheit(db=db, abwesenheit=abwesenheit_in, beantragt_von_benutzer_id=current_user.id),
+        response_model=schemas.Abwesenheit,
+        after_commit=lambda absence: crud.abwesenheit_created(db, absence, current_user.id),
+    )
 
 @router.get("/", response_model=List[schemas.Abwesenheit])
-def read_abwesenheiten_api(
+async def read_abwesenheiten_api(
     skip: int = 0, limit: int = 100,
     benutzer_id: int | None = None,
     abwesenheit_typ_id: int | None = None,
     status_filter: str | None = None,
     start_datum: date | None = None,
     end_datum: date | None = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
     if current_user.rolle.name.lower() not in ["administrator", "manager"]:
         if benutzer_id is not None and benutzer_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view absences for this user")
-        benutzer_id_to_filter = benutzer_id if benutzer_id is not None else current_user.id
-        return crud.get_abwesenheiten(db, skip=skip, limit=limit, benutzer_id=benutzer_id_to_filter, abwesenheit_typ_id=abwesenheit_typ_id, status=status_filter, start_datum=start_datum, end_datum=end_datum)
-    
-    return crud.get_abwesenheiten(db, skip=skip, limit=limit, benutzer_id=benutzer_id, abwesenheit_typ_id=abwesenheit_typ_id, status=status_filter, start_datum=start_datum, end_datum=end_datum)
+        benutzer_id = current_user.id
+
+    # Hot read path: plain column rows over the async engine, no ORM objects that could lazy load
+    rows = await crud.get_abwesenheiten_rows_async(db, skip=skip, limit=limit, benutzer_id=benutzer_id, abwesenheit_typ_id=abwesenheit_typ_id, status=status_filter, start_datum=start_datum, end_datum=end_datum)
+    if fast_json.ENABLED:
+        # Serialized with orjson, same output as response_model
+        return fast_json.abwesenheiten_response(rows)
+    return [fast_json.abwesenheit_dict(row) for row in rows]
 
 @router.get("/{abwesenheit_id}", response_model=schemas.Abwesenheit)
 def read_abwesenheit_api(
@@ -92,7 +108,7 @@ def update_abwesenheit_api(
         if abwesenheit_update.status in ['genehmigt', 'abgelehnt'] and abwesenheit_update.status != db_ab.status:
             genehmiger_id_to_pass = current_user.id
 
-    if abwesenheit_update.abwesenheit_typ_id and abwesenheit_update.abwesenheit_typ_id != db_ab.abwesenheit_typ_id and not crud.get_abwesenheit_typ(db, abwesenheit_update.abwesenheit_typ_id):
+    if abwesenheit_update.abwesenheit_typ_id and abwesenheit_update.abwesenheit_typ_id != db_ab.abwesenheit_typ_id and not refdata_cache.get(db, "abwesenheit_typen", abwesenheit_update.abwesenheit_typ_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"AbwesenheitTyp mit ID {abwesenheit_update.abwesenheit_typ_id} nicht gefunden")
 
     updated_ab = crud.update_abwesenheit(db, abwesenheit_id=abwesenheit_id, abwesenheit_update=abwesenheit_update, genehmiger_id=genehmiger_id_to_pass)
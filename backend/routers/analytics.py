@@ -0,0 +1,185 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import analytics
+import fast_json
+import models
+import report_cache
+from replica import get_read_db
+from .auth import get_current_active_user
+
+router = APIRouter(
+    tags=["analytics"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Longest period per request, a pivot over two years is the largest view in the UI
+MAX_DAYS = 2 * 366
+
+Dimension = Literal["user", "project", "task"]
+
+_NAME_COLUMNS = {
+    "user": (models.Benutzer.id, models.Benutzer.vorname, models.Benutzer.nachname),
+    "project": (models.Projekt.id, models.Projekt.name),
+    "task": (models.Aufgabe.id, models.Aufgabe.name),
+}
+
+
+def _check_request(start_date: date, end_date: date, user_id: int | None, current_user: models.Benutzer) -> int | None:
+    """Validates the period and returns the user filter (regular users only see themselves)."""
+    if not analytics.ENABLED:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Auswertungen benötigen NumPy.")
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date liegt vor start_date.")
+    if (end_date - start_date).days >= MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Zeitraum ist auf {MAX_DAYS} Tage begrenzt.")
+    if current_user.rolle.name.lower() not in ["administrator", "manager"]:
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view time entries for this user")
+        return current_user.id
+    return user_id
+
+
+def _keys(entries: analytics.Entries, dimension: str):
+    return {
+        "user": entries.benutzer_id,
+        "project": entries.projekt_id,
+        "task": entries.aufgabe_id,
+        "week": entries.week,
+    }[dimension]
+
+
+def _labels(db: Session, dimension: str, ids) -> list:
+    """Labels in the order of ids: ISO date of the Monday for weeks, {id, name} otherwise."""
+    if dimension == "week":
+        return [analytics.week_monday(week).isoformat() for week in ids.tolist()]
+    columns = _NAME_COLUMNS[dimension]
+    names = {}
+    for row in db.execute(select(*columns).where(columns[0].in_(ids.tolist()))):
+        names[row[0]] = " ".join(part for part in row[1:] if part)
+    return [{"id": id_, "name": names.get(id_, "Unknown")} for id_ in ids.tolist()]
+
+
+def _response(payload: dict) -> Response:
+    if fast_json.orjson is not None:
+        return Response(content=fast_json.orjson.dumps(payload), media_type="application/json")
+    return JSONResponse(content=payload)
+
+
+def _minutes(values) -> list:
+    # bincount sums in float64, exact for whole minutes
+    return values.round().astype("int64").tolist()
+
+
+@router.get("/pivot")
+def pivot_api(
+    start_date: date,
+    end_date: date,
+    rows: Dimension = "user",
+    columns: Literal["week", "user", "project", "task"] = "week",
+    user_id: int | None = None,
+    project_id: int | None = None,
+    billable_only: bool = False,
+    percentiles: str | None = Query(None, description="Comma separated, e.g. 50,90: percentiles of every row"),
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """
+    Booked minutes as a matrix, e.g. users x weeks for a heatmap or users x projects.
+    Week columns cover every week of the period, also empty ones; other dimensions
+    only contain ids with entries.
+    """
+    user_id = _check_request(start_date, end_date, user_id, current_user)
+    if rows == columns:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="rows und columns müssen verschieden sein.")
+    try:
+        q = [float(value) for value in percentiles.split(",")] if percentiles else []
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="percentiles muss eine Liste von Zahlen sein.")
+    if any(not 0 <= value <= 100 for value in q):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="percentiles müssen zwischen 0 und 100 liegen.")
+
+    key = report_cache.ReportKey(
+        "analytics_pivot", user_id, project_id, start_date, end_date, f"{rows}x{columns}",
+        variant=f"billable={billable_only};q={','.join(f'{value:g}' for value in q)}",
+    )
+    return _response(report_cache.get_or_compute(
+        key, lambda: _pivot(db, start_date, end_date, rows, columns, user_id, project_id, billable_only, q),
+    ))
+
+
+def _pivot(db: Session, start_date: date, end_date: date, rows: str, columns: str,
+           user_id: int | None, project_id: int | None, billable_only: bool, q: list[float]) -> dict:
+    entries = analytics.load_entries(
+        db, start_date, end_date,
+        benutzer_ids=[user_id] if user_id is not None else None,
+        projekt_ids=[project_id] if project_id is not None else None,
+    )
+    values = entries.minutes
+    if billable_only:
+        values = values * entries.billable
+
+    column_labels = None
+    if columns == "week":
+        column_labels = analytics.np.arange(analytics.week_number(start_date), analytics.week_number(end_date) + 1)
+    row_ids, column_ids, matrix = analytics.pivot(_keys(entries, rows), _keys(entries, columns), values, column_labels)
+
+    payload = {
+        "unit": "minutes",
+        "rows": _labels(db, rows, row_ids),
+        "columns": _labels(db, columns, column_ids),
+        "values": _minutes(matrix),
+        "row_totals": _minutes(matrix.sum(axis=1)),
+        "column_totals": _minutes(matrix.sum(axis=0)),
+    }
+    if q:
+        payload["percentiles"] = {
+            f"{value:g}": row.round(1).tolist() for value, row in zip(q, analytics.percentiles(matrix, q))
+        }
+    return payload
+
+
+@router.get("/cube")
+def cube_api(
+    start_date: date,
+    end_date: date,
+    user_id: int | None = None,
+    project_id: int | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """
+    Booked minutes per user x project x week as sparse cells [user, project, week, minutes];
+    the first three are indexes into users, projects and weeks.
+    """
+    user_id = _check_request(start_date, end_date, user_id, current_user)
+    key = report_cache.ReportKey("analytics_cube", user_id, project_id, start_date, end_date, "user x project x week")
+    return _response(report_cache.get_or_compute(key, lambda: _cube(db, start_date, end_date, user_id, project_id)))
+
+
+def _cube(db: Session, start_date: date, end_date: date, user_id: int | None, project_id: int | None) -> dict:
+    entries = analytics.load_entries(
+        db, start_date, end_date,
+        benutzer_ids=[user_id] if user_id is not None else None,
+        projekt_ids=[project_id] if project_id is not None else None,
+    )
+    (users, projects, weeks), sums = analytics.group_by(
+        [entries.benutzer_id, entries.projekt_id, entries.week], entries.minutes,
+    )
+    user_ids, user_index = analytics.np.unique(users, return_inverse=True)
+    project_ids, project_index = analytics.np.unique(projects, return_inverse=True)
+    week_ids, week_index = analytics.np.unique(weeks, return_inverse=True)
+    cells = analytics.np.column_stack([user_index, project_index, week_index, sums.round().astype("int64")])
+
+    return {
+        "unit": "minutes",
+        "users": _labels(db, "user", user_ids),
+        "projects": _labels(db, "project", project_ids),
+        "weeks": _labels(db, "week", week_ids),
+        "cells": cells.tolist(),
+    }
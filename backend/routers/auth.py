@@ -1,13 +1,15 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
 
 import crud
 import schemas
 import models
-from database import get_db 
+from database import get_async_db, get_db
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -33,7 +35,9 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(schemas.oauth2_scheme), db: Session = Depends(get_db)) -> models.Benutzer:
+# Runs on every authenticated request: async session, so the lookup neither blocks the
+# event loop nor waits for a threadpool slot
+async def get_current_user(token: str = Depends(schemas.oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> models.Benutzer:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -47,20 +51,23 @@ async def get_current_user(token: str = Depends(schemas.oauth2_scheme), db: Sess
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_benutzer_by_username(db, username=username)
+    # rolle is loaded in the same query (lazy="joined"); the returned user is only read
+    # afterwards, nothing on it may be lazy loaded outside the async session
+    user = await crud.get_benutzer_by_username_async(db, username=username)
     if user is None:
         raise credentials_exception
         
     # Make sure role information is loaded
     if user.rolle is None:
-        user.rolle = crud.get_rolle(db, rolle_id=user.rolle_id)
+        user.rolle = await db.get(models.Rolle, user.rolle_id)
         if user.rolle is None:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                               detail="User role not found")
     return user
 
 async def get_current_active_user(current_user: models.Benutzer = Depends(get_current_user)) -> models.Benutzer:
-    if not current_user.ist_aktiv:
+    # Archived users keep their ist_aktiv flag (restored as it was), but are inactive meanwhile
+    if not current_user.ist_aktiv or current_user.geloescht_am is not None:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
@@ -84,9 +91,10 @@ def admin_or_manager_required(current_user: models.Benutzer = Depends(get_curren
     return current_user
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_benutzer_by_username(db, username=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.passwort_hash):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await crud.get_benutzer_by_username_async(db, username=form_data.username)
+    # bcrypt takes ~100 ms of CPU, keep it off the event loop
+    if not user or not await run_in_threadpool(crud.verify_password, form_data.password, user.passwort_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -120,11 +128,10 @@ def register_user(user_in: schemas.BenutzerCreate, db: Session = Depends(get_db)
 @router.post("/verify-password")
 async def verify_current_password(
     password_data: schemas.PasswordVerify,
-    current_user: models.Benutzer = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.Benutzer = Depends(get_current_user)
 ):
     """Verify if the provided password matches the current user's password"""
-    is_valid = crud.verify_password(password_data.password, current_user.passwort_hash)
+    is_valid = await run_in_threadpool(crud.verify_password, password_data.password, current_user.passwort_hash)
     if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
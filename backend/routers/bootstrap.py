@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import schemas
+import refdata_cache
+from database import on_primary
+from replica import get_read_db
+from .auth import get_current_active_user
+
+router = APIRouter(
+    tags=["bootstrap"],
+)
+
+def _load_projects(db: Session):
+    return refdata_cache.get_all(db, "projekte")
+
+def _load_tasks(db: Session):
+    return refdata_cache.get_all(db, "aufgaben")
+
+def _load_absence_types(db: Session):
+    return refdata_cache.get_all(db, "abwesenheit_typen")
+
+def _load_time_entries(db: Session, benutzer_id: int | None, skip: int, limit: int):
+    entries = crud.get_zeiteintraege(db, skip=skip, limit=limit, benutzer_id=benutzer_id)
+    return [schemas.Zeiteintrag.model_validate(entry, from_attributes=True) for entry in entries]
+
+def _load_absences(db: Session, benutzer_id: int | None, status_filter: str | None, limit: int):
+    absences = crud.get_abwesenheiten(db, limit=limit, benutzer_id=benutzer_id, status=status_filter)
+    return [schemas.Abwesenheit.model_validate(absence, from_attributes=True) for absence in absences]
+
+def _load_employees(db: Session):
+    rows = db.query(models.Benutzer.id, models.Benutzer.vorname, models.Benutzer.nachname).order_by(
+        models.Benutzer.nachname, models.Benutzer.vorname
+    ).all()
+    return [schemas.BenutzerMinimal(id=row.id, vorname=row.vorname, nachname=row.nachname) for row in rows]
+
+@router.get("", response_model=schemas.Bootstrap)
+def read_bootstrap_api(
+    view: schemas.BootstrapView,
+    skip: int = 0,
+    limit: int = 100,
+    mine: bool = True,
+    status_filter: str | None = "beantragt",
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user)
+):
+    """
+    Return all data a page needs on first load in one response.
+    - arbeitszeiten: user, projects, tasks and time entries (skip/limit; all users' for admins/managers,
+      like GET /time-entries/)
+    - urlaub: user, absence types and absences (only the user's own unless mine=false for admins/managers)
+    - genehmigen: user, absence types, employees and absences filtered by status_filter (admins/managers only)
+    Sections the view does not use are null. All queries share the request's session, so a
+    bootstrap call holds one connection like any other request.
+    """
+    is_manager_or_admin = current_user.rolle.name.lower() in ["administrator", "manager"]
+    result = {"view": view, "user": schemas.Benutzer.model_validate(current_user, from_attributes=True)}
+
+    # Entries, absences and employees may come from the read replica (get_read_db),
+    # reference data is cached and loaded from the primary
+    if view == schemas.BootstrapView.arbeitszeiten:
+        with on_primary(db):
+            result["projects"] = _load_projects(db)
+            result["tasks"] = _load_tasks(db)
+        benutzer_id = None if is_manager_or_admin else current_user.id
+        result["time_entries"] = _load_time_entries(db, benutzer_id, skip, limit)
+    elif view == schemas.BootstrapView.urlaub:
+        benutzer_id = None if (not mine and is_manager_or_admin) else current_user.id
+        with on_primary(db):
+            result["absence_types"] = _load_absence_types(db)
+        result["absences"] = _load_absences(db, benutzer_id, None, limit)
+    elif view == schemas.BootstrapView.genehmigen:
+        if not is_manager_or_admin:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrator or Manager privileges required")
+        with on_primary(db):
+            result["absence_types"] = _load_absence_types(db)
+        result["employees"] = _load_employees(db)
+        result["absences"] = _load_absences(db, None, status_filter, limit)
+    return result
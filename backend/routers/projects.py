@@ -1,13 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from fastapi import Response # Add Response import
 
 import crud
 import models
 import schemas
+import refdata_cache
 from database import get_db
-from .auth import admin_required, get_current_active_user # Import dependencies
+from .auth import admin_required, admin_or_manager_required, get_current_active_user # Import dependencies
 
 router = APIRouter(
     tags=["projects"],
@@ -38,8 +39,35 @@ def read_projects_api(
     """
     Retrieve a list of projects.
     """
-    projects = crud.get_projekte(db, skip=skip, limit=limit)
-    return projects
+    projects = refdata_cache.get_all(db, "projekte")
+    return projects[skip:skip + limit]
+
+# Must be declared before /{project_id}, otherwise "burndown" is parsed as a project id
+@router.get("/burndown", response_model=List[schemas.ProjektBurndown])
+def read_portfolio_burndown_api(
+    threshold: float | None = Query(None, gt=0, description="Alert when booked hours reach this percentage of plan"),
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(admin_or_manager_required)
+):
+    """
+    Planned vs. booked hours for all projects, per task and per week. Admin or Manager access required.
+    """
+    return crud.get_portfolio_burndown(db, threshold=threshold)
+
+@router.get("/{project_id}/burndown", response_model=schemas.ProjektBurndown)
+def read_project_burndown_api(
+    project_id: int,
+    threshold: float | None = Query(None, gt=0, description="Alert when booked hours reach this percentage of plan"),
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(admin_or_manager_required)
+):
+    """
+    Planned vs. booked hours of a project, per task and per week. Admin or Manager access required.
+    """
+    burndown = crud.get_projekt_burndown(db, projekt_id=project_id, threshold=threshold)
+    if burndown is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Projekt nicht gefunden")
+    return burndown
 
 @router.get("/{project_id}", response_model=schemas.Projekt)
 def read_project_api(
@@ -73,23 +101,39 @@ def update_project_api(
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_project_api(
     project_id: int, 
+    archive: bool = False,
     db: Session = Depends(get_db),
     current_user: models.Benutzer = Depends(get_current_active_user) # Jeder authentifizierte Benutzer kann Projekte löschen
 ):
     """
     Delete a project. Authenticated access required.
+    Tasks and time entries are removed by ON DELETE CASCADE (time entries in batches).
+    With archive=true the project is only hidden (soft delete) and can be restored.
     """
-    # Before deleting a project, consider if related entities (tasks, time entries) should also be handled (e.g., deleted or disassociated)
-    # This might require cascading deletes in the DB or explicit deletion logic here.
-    # For now, we assume the CRUD operation handles direct deletion or the DB handles cascades.
-    
     db_project = crud.get_projekt(db, projekt_id=project_id) # Check if project exists
     if not db_project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Projekt nicht gefunden")
 
-    success = crud.delete_projekt(db, projekt_id=project_id)
+    if archive:
+        success = crud.archive_projekt(db, projekt_id=project_id)
+    else:
+        success = crud.delete_projekt(db, projekt_id=project_id)
     if not success:
         # This condition might be hard to reach if get_projekt already confirmed existence
         # and delete_projekt raises an error for other reasons or if the DB constraint prevents deletion.
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Projekt konnte nicht gelöscht werden (evtl. بسبب Abhängigkeiten)")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/{project_id}/restore", response_model=schemas.Projekt)
+def restore_project_api(
+    project_id: int, 
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(admin_or_manager_required)
+):
+    """
+    Restore an archived project. Admin or manager access required.
+    """
+    db_project = crud.restore_projekt(db, projekt_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Projekt nicht gefunden")
+    return db_project
@@ -0,0 +1,205 @@
+import gzip
+import json
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, defer
+
+import models
+import report_jobs
+import schemas
+import timesheets
+from database import get_db
+from replica import get_read_db
+from .auth import get_current_active_user
+
+router = APIRouter(
+    tags=["reports"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Longest period of a report job and queued/running jobs per user
+MAX_DAYS = 3 * 366
+MAX_PENDING_PER_USER = int(os.getenv("REPORT_JOBS_MAX_PENDING_PER_USER", "5"))
+
+
+def _is_manager(user: models.Benutzer) -> bool:
+    return user.rolle.name.lower() in ["administrator", "manager"]
+
+
+def _job_dict(job: models.ReportJob) -> dict:
+    return {
+        "id": job.id,
+        "report": job.bericht,
+        "format": job.format,
+        "status": job.status,
+        "progress": job.fortschritt,
+        "parameters": json.loads(job.parameter),
+        "error": job.fehler,
+        "result_bytes": job.ergebnis_bytes,
+        "created_at": job.erstellt_am,
+        "started_at": job.gestartet_am,
+        "finished_at": job.beendet_am,
+        "expires_at": job.ablauf_am,
+    }
+
+
+def _get_job(db: Session, job_id: int, current_user: models.Benutzer, with_result: bool = False) -> models.ReportJob:
+    query = db.query(models.ReportJob).filter(models.ReportJob.id == job_id)
+    if not with_result:
+        query = query.options(defer(models.ReportJob.ergebnis))
+    job = query.first()
+    # Other users' jobs are not found, not forbidden: ids do not reveal foreign jobs
+    if job is None or (job.benutzer_id != current_user.id and current_user.rolle.name.lower() != "administrator"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Berichtsauftrag nicht gefunden")
+    return job
+
+
+@router.post("/jobs", response_model=schemas.ReportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job_api(
+    request_body: schemas.ReportJobCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """
+    Queues a report over a long period. Poll GET /jobs/{id} for status and progress,
+    then fetch the result from GET /jobs/{id}/download.
+    """
+    if request_body.end_date < request_body.start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date liegt vor start_date.")
+    if (request_body.end_date - request_body.start_date).days >= MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Zeitraum ist auf {MAX_DAYS} Tage begrenzt.")
+    params = request_body.model_dump(exclude={"report", "format"})
+    if not _is_manager(current_user):
+        if params["user_id"] is not None and params["user_id"] != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view time entries for this user")
+        params["user_id"] = current_user.id
+
+    pending = db.scalar(
+        select(func.count()).select_from(models.ReportJob).where(
+            models.ReportJob.benutzer_id == current_user.id,
+            models.ReportJob.status.in_(["queued", "running"]),
+        )
+    )
+    if pending >= MAX_PENDING_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Es laufen bereits {pending} Berichtsaufträge, bitte warten bis diese fertig sind.",
+        )
+
+    job = report_jobs.enqueue(db, current_user.id, request_body.report, request_body.format, params)
+    response.headers["Location"] = f"/api/v1/reports/jobs/{job.id}"
+    return _job_dict(job)
+
+
+@router.get("/jobs", response_model=List[schemas.ReportJob])
+def read_report_jobs_api(
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """The current user's report jobs, newest first."""
+    jobs = (
+        db.query(models.ReportJob)
+        .options(defer(models.ReportJob.ergebnis))
+        .filter(models.ReportJob.benutzer_id == current_user.id)
+        .order_by(models.ReportJob.id.desc())
+        .limit(50)
+        .all()
+    )
+    return [_job_dict(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.ReportJob)
+def read_report_job_api(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    return _job_dict(_get_job(db, job_id, current_user))
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job_api(
+    job_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    # Expired jobs are deleted by the runner and end up as 404
+    job = _get_job(db, job_id, current_user, with_result=True)
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Bericht ist nicht verfügbar (Status: {job.status}).")
+
+    params = _job_dict(job)["parameters"]
+    filename = f"bericht_{job.bericht}_{params['start_date']}_{params['end_date']}.{job.format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        # Stored gzipped, sent as is
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return Response(content=job.ergebnis, media_type=report_jobs.FORMATS[job.format], headers=headers)
+    return Response(content=gzip.decompress(job.ergebnis), media_type=report_jobs.FORMATS[job.format], headers=headers)
+
+
+@router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_report_job_api(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """Cancels a queued or running job, or deletes a finished one with its result."""
+    job = _get_job(db, job_id, current_user)
+    db.delete(job)
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Monthly timesheets (PDF) ----------
+def _check_timesheets() -> None:
+    if not timesheets.ENABLED:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Stundenzettel benötigen fpdf2.")
+
+
+@router.get("/timesheets/{year}/{month}/{user_id}.pdf")
+def timesheet_pdf_api(
+    year: int = Path(..., ge=2000, le=2100),
+    month: int = Path(..., ge=1, le=12),
+    user_id: int = Path(...),
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """Timesheet of one employee and month for signing; regular users only get their own."""
+    _check_timesheets()
+    if user_id != current_user.id and not _is_manager(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view time entries for this user")
+    sheets = timesheets.load_month(db, year, month, [user_id])
+    if not sheets:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden")
+    # Rendered in the process pool; this thread only waits
+    pdf = timesheets.render_one(sheets[0])
+    return Response(
+        content=pdf, media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{timesheets.filename(sheets[0])}"'},
+    )
+
+
+@router.get("/timesheets/{year}/{month}.zip")
+def timesheets_zip_api(
+    year: int = Path(..., ge=2000, le=2100),
+    month: int = Path(..., ge=1, le=12),
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """Timesheets of all employees of a month as a ZIP archive, streamed while rendering."""
+    _check_timesheets()
+    if not _is_manager(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nur Manager können alle Stundenzettel herunterladen.")
+    sheets = timesheets.load_month(db, year, month)
+    return StreamingResponse(
+        timesheets.zip_stream(timesheets.render(sheets)), media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="stundenzettel_{year:04d}-{month:02d}.zip"'},
+    )
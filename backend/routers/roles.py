@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 import crud
 import models
 import schemas
+import refdata_cache
 from database import get_db
 from .auth import admin_required, admin_or_manager_required # Import both dependencies from auth.py
 
@@ -39,8 +40,8 @@ def read_roles_api(
     """
     Retrieve a list of roles. Admin or Manager access required.
     """
-    roles = crud.get_rollen(db, skip=skip, limit=limit)
-    return roles
+    roles = refdata_cache.get_all(db, "rollen")
+    return roles[skip:skip + limit]
 
 @router.get("/{role_id}", response_model=schemas.Rolle)
 def read_role_api(
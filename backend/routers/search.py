@@ -0,0 +1,84 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+import search
+from replica import get_read_db
+from .auth import get_current_active_user
+
+router = APIRouter(
+    tags=["search"],
+    responses={404: {"description": "Not found"}},
+)
+
+Sort = Literal["relevance", "date"]
+
+
+def _own_user_id(current_user: models.Benutzer, benutzer_id: int | None, detail: str) -> int | None:
+    """Regular users only search their own entries."""
+    if current_user.rolle.name.lower() in ["administrator", "manager"]:
+        return benutzer_id
+    if benutzer_id is not None and benutzer_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+    return current_user.id
+
+
+def _search(db: Session, target: search.Target, q: str, **kwargs) -> dict:
+    try:
+        items, next_cursor = search.search(db, target, q, **kwargs)
+    except search.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/time-entries", response_model=schemas.ZeiteintragSuche)
+def search_zeiteintraege_api(
+    q: str = Query(..., min_length=1, max_length=200, description='Words, "phrases", OR and -exclusions'),
+    benutzer_id: int | None = None,
+    projekt_id: int | None = None,
+    aufgabe_id: int | None = None,
+    start_datum: date | None = None,
+    end_datum: date | None = None,
+    sort: Sort = "relevance",
+    limit: int = Query(50, ge=1, le=search.MAX_LIMIT),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """
+    Time entries whose description matches q, best matches (or newest with sort=date) first.
+    For the next page pass the returned next_cursor with otherwise unchanged parameters.
+    """
+    benutzer_id = _own_user_id(current_user, benutzer_id, "Not authorized to view time entries for this user")
+    return _search(
+        db, search.TIME_ENTRIES, q,
+        filters={"benutzer_id": benutzer_id, "projekt_id": projekt_id, "aufgabe_id": aufgabe_id},
+        start_date=start_datum, end_date=end_datum, sort=sort, limit=limit, cursor=cursor,
+    )
+
+
+@router.get("/absences", response_model=schemas.AbwesenheitSuche)
+def search_abwesenheiten_api(
+    q: str = Query(..., min_length=1, max_length=200, description='Words, "phrases", OR and -exclusions'),
+    benutzer_id: int | None = None,
+    abwesenheit_typ_id: int | None = None,
+    status_filter: str | None = None,
+    start_datum: date | None = None,
+    end_datum: date | None = None,
+    sort: Sort = "relevance",
+    limit: int = Query(50, ge=1, le=search.MAX_LIMIT),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(get_current_active_user),
+):
+    """Absences whose reason matches q; periods overlapping start_datum..end_datum."""
+    benutzer_id = _own_user_id(current_user, benutzer_id, "Not authorized to view absences for this user")
+    return _search(
+        db, search.ABSENCES, q,
+        filters={"benutzer_id": benutzer_id, "abwesenheit_typ_id": abwesenheit_typ_id, "status": status_filter},
+        start_date=start_datum, end_date=end_datum, sort=sort, limit=limit, cursor=cursor,
+    )
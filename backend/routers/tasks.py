@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 import crud
 import models
 import schemas
+import refdata_cache
 from database import get_db
 from .auth import get_current_active_user, admin_required
 
@@ -51,10 +52,10 @@ def read_tasks_api(
         # db_project = crud.get_projekt(db, projekt_id=projekt_id)
         # if not db_project:
         #     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Projekt mit ID {projekt_id} nicht gefunden")
-        tasks = crud.get_aufgaben_by_projekt(db, projekt_id=projekt_id, skip=skip, limit=limit)
+        tasks = [task for task in refdata_cache.get_all(db, "aufgaben") if task.projekt_id == projekt_id]
     else:
-        tasks = crud.get_aufgaben(db, skip=skip, limit=limit)
-    return tasks
+        tasks = refdata_cache.get_all(db, "aufgaben")
+    return tasks[skip:skip + limit]
 
 @router.get("/{task_id}", response_model=schemas.Aufgabe)
 def read_task_api(
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
 from datetime import date, datetime, time
@@ -8,7 +9,12 @@ from decimal import Decimal
 import crud
 import models
 import schemas
+import refdata_cache
+import report_cache
+import fast_json
+import idempotency
 from database import get_db
+from replica import get_async_read_db, get_read_db
 from routers.auth import get_current_active_user
 
 router = APIRouter()
@@ -16,6 +22,7 @@ router = APIRouter()
 @router.post("/", response_model=schemas.Zeiteintrag, status_code=status.HTTP_201_CREATED)
 def create_zeiteintrag_api(
     zeiteintrag_in: schemas.ZeiteintragCreate,
+    idempotency_key: str | None = Header(None, alias=idempotency.HEADER),
     db: Session = Depends(get_db),
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
@@ -25,15 +32,21 @@ def create_zeiteintrag_api(
     elif current_user.id != zeiteintrag_in.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to create time entry for another user")
     
-    if zeiteintrag_in.projekt_id and not crud.get_projekt(db, zeiteintrag_in.projekt_id):
+    if zeiteintrag_in.projekt_id and not refdata_cache.get(db, "projekte", zeiteintrag_in.projekt_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Projekt mit ID {zeiteintrag_in.projekt_id} nicht gefunden")
-    if zeiteintrag_in.aufgabe_id and not crud.get_aufgabe(db, zeiteintrag_in.aufgabe_id):
+    if zeiteintrag_in.aufgabe_id and not refdata_cache.get(db, "aufgaben", zeiteintrag_in.aufgabe_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Aufgabe mit ID {zeiteintrag_in.aufgabe_id} nicht gefunden")
     
-    return crud.create_zeiteintrag(db=db, zeiteintrag=zeiteintrag_in, current_user_id=current_user.id)
+    # Retries with the same Idempotency-Key get the stored response instead of a second entry
+    return idempotency.run(
+        db, current_user.id, idempotency_key, "POST /api/v1/time-entries/", zeiteintrag_in,
+        lambda: crud.add_zeiteintrag(db=db, zeiteintrag=zeiteintrag_in, current_user_id=current_user.id),
+        response_model=schemas.Zeiteintrag,
+        after_commit=lambda entry: crud.zeiteintrag_created(db, entry),
+    )
 
 @router.get("/", response_model=List[schemas.Zeiteintrag])
-def read_zeiteintraege_api(
+async def read_zeiteintraege_api(
     skip: int = 0, limit: int = 100,
     benutzer_id: int | None = None,
     projekt_id: int | None = None,
@@ -41,89 +54,26 @@ def read_zeiteintraege_api(
     start_datum: date | None = None,
     end_datum: date | None = None,
     is_billable: bool | None = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
     if current_user.rolle.name.lower() not in ["administrator", "manager"]:
         if benutzer_id is not None and benutzer_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view time entries for this user")
-        benutzer_id_to_filter = benutzer_id if benutzer_id is not None else current_user.id
-        
-        # Add the is_billable filter
-        if is_billable is not None:
-            return [entry for entry in crud.get_zeiteintraege(
-                db, skip=skip, limit=limit, benutzer_id=benutzer_id_to_filter, 
-                projekt_id=projekt_id, aufgabe_id=aufgabe_id, 
-                start_datum=start_datum, end_datum=end_datum
-            ) if entry.ist_abrechenbar == is_billable]
-        
-        return crud.get_zeiteintraege(
-            db, skip=skip, limit=limit, benutzer_id=benutzer_id_to_filter, 
-            projekt_id=projekt_id, aufgabe_id=aufgabe_id, 
-            start_datum=start_datum, end_datum=end_datum
-        )
-    
-    # For admin/manager users - apply is_billable filter if provided
-    if is_billable is not None:
-        return [entry for entry in crud.get_zeiteintraege(
-            db, skip=skip, limit=limit, benutzer_id=benutzer_id, 
-            projekt_id=projekt_id, aufgabe_id=aufgabe_id, 
-            start_datum=start_datum, end_datum=end_datum
-        ) if entry.ist_abrechenbar == is_billable]
-    
-    return crud.get_zeiteintraege(
-        db, skip=skip, limit=limit, benutzer_id=benutzer_id, 
-        projekt_id=projekt_id, aufgabe_id=aufgabe_id, 
+        benutzer_id = current_user.id
+
+    # Hot read path: plain column rows over the async engine, no ORM objects that could lazy load
+    rows = await crud.get_zeiteintraege_rows_async(
+        db, skip=skip, limit=limit, benutzer_id=benutzer_id,
+        projekt_id=projekt_id, aufgabe_id=aufgabe_id,
         start_datum=start_datum, end_datum=end_datum
     )
-
-@router.get("/{zeiteintrag_id}", response_model=schemas.Zeiteintrag)
-def read_zeiteintrag_api(
-    zeiteintrag_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Benutzer = Depends(get_current_active_user)
-):
-    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
-    if not db_ze:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
-    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this time entry")
-    return db_ze
-
-@router.put("/{zeiteintrag_id}", response_model=schemas.Zeiteintrag)
-def update_zeiteintrag_api(
-    zeiteintrag_id: int,
-    zeiteintrag_update: schemas.ZeiteintragUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.Benutzer = Depends(get_current_active_user)
-):
-    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
-    if not db_ze:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
-    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this time entry")
-    if zeiteintrag_update.projekt_id and zeiteintrag_update.projekt_id != db_ze.projekt_id and not crud.get_projekt(db, zeiteintrag_update.projekt_id):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Projekt mit ID {zeiteintrag_update.projekt_id} nicht gefunden")
-    if zeiteintrag_update.aufgabe_id and zeiteintrag_update.aufgabe_id != db_ze.aufgabe_id and not crud.get_aufgabe(db, zeiteintrag_update.aufgabe_id):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Aufgabe mit ID {zeiteintrag_update.aufgabe_id} nicht gefunden")
-    updated_ze = crud.update_zeiteintrag(db, zeiteintrag_id, zeiteintrag_update)
-    if not updated_ze:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Update failed")
-    return updated_ze
-
-@router.delete("/{zeiteintrag_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_zeiteintrag_api(
-    zeiteintrag_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Benutzer = Depends(get_current_active_user)
-):
-    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
-    if not db_ze:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
-    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
-         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this time entry")
-    crud.delete_zeiteintrag(db, zeiteintrag_id)
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    if is_billable is not None:
+        rows = [row for row in rows if row.ist_abrechenbar == is_billable]
+    if fast_json.ENABLED:
+        # Serialized with orjson, same output as response_model
+        return fast_json.zeiteintraege_response(rows)
+    return [fast_json.zeiteintrag_dict(row) for row in rows]
 
 @router.get("/report", response_model=Dict[str, Any])
 def get_time_entries_report(
@@ -131,7 +81,7 @@ def get_time_entries_report(
     end_date: date,
     user_id: int | None = None,
     hourly_rate: float = 100.0,  # Default hourly rate for earnings calculation
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
     """
@@ -149,7 +99,14 @@ def get_time_entries_report(
             )
         # Set user_id to current user's ID for regular users
         user_id = current_user.id
-    
+
+    # Same report for every manager/tab until a write touches its user and period
+    key = report_cache.ReportKey("time_entries", user_id, None, start_date, end_date, "entries", hourly_rate)
+    return report_cache.get_or_compute(
+        key, lambda: _time_entries_report(db, user_id, start_date, end_date, hourly_rate),
+    )
+
+def _time_entries_report(db: Session, user_id: int | None, start_date: date, end_date: date, hourly_rate: float) -> Dict[str, Any]:
     # Get all time entries matching the criteria
     time_entries = crud.get_zeiteintraege(
         db, 
@@ -157,7 +114,8 @@ def get_time_entries_report(
         limit=1000,  # Use a reasonable limit 
         benutzer_id=user_id,
         start_datum=start_date,
-        end_datum=end_date
+        end_datum=end_date,
+        with_benutzer=True
     )
     
     if not time_entries:
@@ -211,3 +169,51 @@ def get_time_entries_report(
         "distinct_users_count": distinct_users_count,
         "entries": formatted_entries
     }
+
+@router.get("/{zeiteintrag_id}", response_model=schemas.Zeiteintrag)
+def read_zeiteintrag_api(
+    zeiteintrag_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user)
+):
+    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
+    if not db_ze:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
+    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
+         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this time entry")
+    return db_ze
+
+@router.put("/{zeiteintrag_id}", response_model=schemas.Zeiteintrag)
+def update_zeiteintrag_api(
+    zeiteintrag_id: int,
+    zeiteintrag_update: schemas.ZeiteintragUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user)
+):
+    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
+    if not db_ze:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
+    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
+         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this time entry")
+    if zeiteintrag_update.projekt_id and zeiteintrag_update.projekt_id != db_ze.projekt_id and not refdata_cache.get(db, "projekte", zeiteintrag_update.projekt_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Projekt mit ID {zeiteintrag_update.projekt_id} nicht gefunden")
+    if zeiteintrag_update.aufgabe_id and zeiteintrag_update.aufgabe_id != db_ze.aufgabe_id and not refdata_cache.get(db, "aufgaben", zeiteintrag_update.aufgabe_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Aufgabe mit ID {zeiteintrag_update.aufgabe_id} nicht gefunden")
+    updated_ze = crud.update_zeiteintrag(db, zeiteintrag_id, zeiteintrag_update)
+    if not updated_ze:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Update failed")
+    return updated_ze
+
+@router.delete("/{zeiteintrag_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_zeiteintrag_api(
+    zeiteintrag_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.Benutzer = Depends(get_current_active_user)
+):
+    db_ze = crud.get_zeiteintrag(db, zeiteintrag_id)
+    if not db_ze:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zeiteintrag nicht gefunden")
+    if current_user.id != db_ze.benutzer_id and current_user.rolle.name.lower() not in ["administrator", "manager"]:
+         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this time entry")
+    crud.delete_zeiteintrag(db, zeiteintrag_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,13 +1,14 @@
 \
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from sqlalchemy.orm import Session
 
 import crud
 import models
 import schemas
 from database import get_db
-from .auth import admin_required, get_current_active_user
+from replica import get_read_db
+from .auth import admin_or_manager_required, admin_required, get_current_active_user
 
 router = APIRouter(
     tags=["users"],
@@ -17,8 +18,7 @@ router = APIRouter(
 # Moved /me routes before /{user_id} routes to avoid path parameter conflicts
 
 @router.get("/me", response_model=schemas.Benutzer)
-def read_current_user_api(
-    db: Session = Depends(get_db),
+async def read_current_user_api(
     current_user: models.Benutzer = Depends(get_current_active_user)
 ):
     """
@@ -103,15 +103,38 @@ def update_user_preferences(
 def read_users_api(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db), 
+    include_archived: bool = False,
+    ids: List[int] | None = Query(None),
+    db: Session = Depends(get_read_db), 
     current_admin: models.Benutzer = Depends(admin_required)
 ):
     """
     Retrieve a list of users. Admin access required.
+    Archived users are only included with include_archived=true.
+    ids (repeatable) restricts the list to these users, e.g. the results of /search.
     """
-    users = crud.get_benutzer_list(db, skip=skip, limit=limit)
+    users = crud.get_benutzer_list(db, skip=skip, limit=limit, include_archived=include_archived, ids=ids)
     return users
 
+# Before /{user_id}, otherwise "search" would be taken for a user id
+@router.get("/search", response_model=List[schemas.BenutzerMinimal])
+def search_users_api(
+    q: str | None = Query(None, max_length=100),
+    rolle_id: int | None = None,
+    ist_aktiv: bool | None = None,
+    include_archived: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: models.Benutzer = Depends(admin_or_manager_required)
+):
+    """
+    Users matching q in username, first/last name or email, as id/name pairs for
+    typeaheads and filters. Admin or manager access required.
+    """
+    return crud.search_benutzer(
+        db, q=q, rolle_id=rolle_id, ist_aktiv=ist_aktiv, include_archived=include_archived, limit=limit
+    )
+
 @router.get("/{user_id}", response_model=schemas.Benutzer)
 def read_user_api(
     user_id: int, 
@@ -167,17 +190,36 @@ def update_user_api(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user_api(
     user_id: int, 
+    archive: bool = False,
     db: Session = Depends(get_db), 
     current_admin: models.Benutzer = Depends(admin_required)
 ):
     """
     Delete a user. Admin access required.
+    With archive=true the user is only deactivated and hidden (soft delete) and can be restored.
     """
-    success = crud.delete_benutzer(db, benutzer_id=user_id)
+    if archive:
+        success = crud.archive_benutzer(db, benutzer_id=user_id)
+    else:
+        success = crud.delete_benutzer(db, benutzer_id=user_id)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden oder konnte nicht gelöscht werden")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+@router.post("/{user_id}/restore", response_model=schemas.Benutzer)
+def restore_user_api(
+    user_id: int, 
+    db: Session = Depends(get_db), 
+    current_admin: models.Benutzer = Depends(admin_required)
+):
+    """
+    Restore an archived user. Admin access required.
+    """
+    db_user = crud.restore_benutzer(db, benutzer_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Benutzer nicht gefunden")
+    return db_user
+
 @router.put("/{user_id}/password", response_model=dict)
 def update_user_password(
     user_id: int,
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import date, datetime, time
 from decimal import Decimal
+from enum import Enum
 from fastapi.security import OAuth2PasswordBearer # Added import
 
 # Helper Pydantic Config
@@ -58,6 +59,7 @@ class Benutzer(BenutzerBase):
     rolle_id: int
     erstellt_am: datetime
     aktualisiert_am: datetime
+    geloescht_am: Optional[datetime] = None # Set for archived entries
     rolle: Rolle # Nested schema for relationship
 
     class Config(OrmConfig):
@@ -85,6 +87,7 @@ class Projekt(ProjektBase):
     id: int
     erstellt_am: datetime
     aktualisiert_am: datetime
+    geloescht_am: Optional[datetime] = None # Set for archived entries
     # aufgaben: List['Aufgabe'] = [] # Avoid circular import for now, handle in specific response models if needed
 
     class Config(OrmConfig):
@@ -171,6 +174,35 @@ class Zeiteintrag(ZeiteintragBase):
     class Config(OrmConfig):
         pass
 
+# ---------- Burndown Schemas ----------
+class BurndownAufgabe(BaseModel):
+    aufgabe_id: int
+    name: str
+    geplante_stunden: Optional[float] = None
+    ist_stunden: float
+    verbrauch_prozent: Optional[float] = None # None if no plan is set
+
+class BurndownWoche(BaseModel):
+    woche: date # Monday of the week
+    ist_stunden: float
+    kumuliert: float
+    rest_stunden: float
+
+class BurndownAlert(BaseModel):
+    aufgabe_id: Optional[int] = None # None means the whole project
+    name: str
+    verbrauch_prozent: float
+
+class ProjektBurndown(BaseModel):
+    projekt_id: int
+    projekt_name: str
+    geplante_stunden: float
+    ist_stunden: float
+    verbrauch_prozent: Optional[float] = None
+    aufgaben: List[BurndownAufgabe] = []
+    wochen: List[BurndownWoche] = []
+    alerts: List[BurndownAlert] = []
+
 # ---------- AbwesenheitTyp Schemas ----------
 class AbwesenheitTypBase(BaseModel):
     name: str
@@ -223,6 +255,31 @@ class Abwesenheit(AbwesenheitBase):
     class Config(OrmConfig):
         pass
 
+# ---------- Bootstrap Schemas ----------
+class BootstrapView(str, Enum):
+    arbeitszeiten = "arbeitszeiten"
+    urlaub = "urlaub"
+    genehmigen = "genehmigen"
+
+class BenutzerMinimal(BaseModel):
+    id: int
+    vorname: str
+    nachname: str
+
+    class Config(OrmConfig):
+        pass
+
+class Bootstrap(BaseModel):
+    """Everything a page needs on first load. Fields not used by the view are null."""
+    view: BootstrapView
+    user: Benutzer
+    projects: Optional[List[Projekt]] = None
+    tasks: Optional[List[Aufgabe]] = None
+    time_entries: Optional[List[Zeiteintrag]] = None
+    absence_types: Optional[List[AbwesenheitTyp]] = None
+    absences: Optional[List[Abwesenheit]] = None
+    employees: Optional[List[BenutzerMinimal]] = None
+
 # Schemas for JWT Token
 class Token(BaseModel):
     access_token: str
@@ -260,4 +317,60 @@ class ProjektDetails(Projekt):
 
 class AufgabeDetails(Aufgabe):
     projekt: Projekt
-    zeiteintraege: List[Zeiteintrag] = []
\ No newline at end of file
+    zeiteintraege: List[Zeiteintrag] = []
+
+# ---------- Report job Schemas ----------
+class ReportJobCreate(BaseModel):
+    report: Literal["time_entries", "summary"]
+    format: Literal["json", "csv"] = "json"
+    start_date: date
+    end_date: date
+    user_id: Optional[int] = None
+    project_id: Optional[int] = None
+    hourly_rate: float = 100.0
+
+class ReportJob(BaseModel):
+    id: int
+    report: str
+    format: str
+    status: str
+    progress: int
+    parameters: dict
+    error: Optional[str] = None
+    result_bytes: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+# ---------- Search Schemas ----------
+class ZeiteintragTreffer(BaseModel):
+    id: int
+    benutzer_id: int
+    projekt_id: int
+    aufgabe_id: int
+    datum: date
+    startzeit: time
+    endzeit: time
+    stunden: Optional[Decimal] = None
+    beschreibung: Optional[str] = None
+    ist_abrechenbar: bool
+    rank: Optional[float] = None  # None without ranking (SQLite)
+
+class ZeiteintragSuche(BaseModel):
+    items: List[ZeiteintragTreffer]
+    next_cursor: Optional[str] = None  # pass as cursor for the next page, None on the last one
+
+class AbwesenheitTreffer(BaseModel):
+    id: int
+    benutzer_id: int
+    abwesenheit_typ_id: int
+    start_datum: date
+    end_datum: date
+    status: str
+    grund: Optional[str] = None
+    rank: Optional[float] = None
+
+class AbwesenheitSuche(BaseModel):
+    items: List[AbwesenheitTreffer]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,185 @@
+# search.py - Full-text search over time entry descriptions and absence reasons
+#
+# Postgres: generated tsvector columns "suchvektor" with German stemming and GIN indexes
+# (migrations/manual/add_fulltext_search.sql, applied by hand as it rewrites the tables).
+# They are not mapped in models.py, because SQLite databases get their schema from
+# create_all and know neither tsvector nor to_tsvector.
+# The query is parsed with websearch_to_tsquery: words, "phrases", OR and -exclusions.
+#
+# Results are ordered by relevance (ts_rank over the stored vectors) or by date, newest
+# first, and paginated by keyset: the cursor holds the sort value and id of the last row
+# of a page, so later pages do not scan and discard the earlier ones like OFFSET does.
+# Broad terms match many rows that all have to be ranked; sort=date is cheaper for them.
+#
+# SQLite (embedded mode) and Postgres without the suchvektor columns: no stemming and no
+# ranking. Every word has to occur in the text (LIKE on lower(), on SQLite
+# case-insensitive only for ASCII letters) and results are ordered by date.
+
+import base64
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+from sqlalchemy import REAL, cast, func, literal, literal_column, select, text, tuple_
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+SORTS = ("relevance", "date")
+MAX_LIMIT = 100
+# A missing suchvektor column is looked up again after this, so applying the manual
+# migration takes effect without a restart
+VECTOR_RECHECK_SECONDS = 300
+
+# Words and "phrases", optionally excluded with a leading minus
+_TERM = re.compile(r'(-?)(?:"([^"]*)"|(\S+))')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+_vector_lock = threading.Lock()
+_vector_columns: dict[str, tuple[bool, float]] = {}  # table -> (exists, checked at)
+
+
+def _has_vector(db: Session, table: str) -> bool:
+    """Whether the Postgres table has the suchvektor column (cached)."""
+    with _vector_lock:
+        cached = _vector_columns.get(table)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < VECTOR_RECHECK_SECONDS):
+        return cached[0]
+    exists = db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM information_schema.columns"
+        " WHERE table_schema = current_schema() AND table_name = :table AND column_name = 'suchvektor')"
+    ), {"table": table}).scalar()
+    if not exists and cached is None:
+        logger.warning(
+            "%s has no suchvektor column, full-text search falls back to LIKE "
+            "(apply migrations/manual/add_fulltext_search.sql)", table,
+        )
+    with _vector_lock:
+        _vector_columns[table] = (bool(exists), time.monotonic())
+    return bool(exists)
+
+
+@dataclass(frozen=True)
+class Target:
+    model: type
+    text: str  # searched column
+    start: str  # date columns: sort order and period filter (overlap for absences)
+    end: str
+    columns: tuple[str, ...]
+
+
+TIME_ENTRIES = Target(
+    models.Zeiteintrag, "beschreibung", "datum", "datum",
+    ("id", "benutzer_id", "projekt_id", "aufgabe_id", "datum", "startzeit", "endzeit", "stunden",
+     "beschreibung", "ist_abrechenbar"),
+)
+ABSENCES = Target(
+    models.Abwesenheit, "grund", "start_datum", "end_datum",
+    ("id", "benutzer_id", "abwesenheit_typ_id", "start_datum", "end_datum", "status", "grund"),
+)
+
+
+def _encode_cursor(sort: str, value, last_id: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, last_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if cursor_sort != sort or not isinstance(last_id, int):
+            raise ValueError(cursor_sort)
+        value = float(value) if sort == "relevance" else date.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Ungültiger Cursor (gehört er zu einer anderen Suche oder Sortierung?)")
+    return value, last_id
+
+
+def _like_terms(q: str) -> list[tuple[bool, str]]:
+    """(excluded, lower-case pattern) for the SQLite fallback."""
+    terms = []
+    for minus, phrase, word in _TERM.findall(q):
+        term = (phrase or word).strip().lower()
+        if term:
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            terms.append((bool(minus), f"%{escaped}%"))
+    return terms
+
+
+def search(
+    db: Session,
+    target: Target,
+    q: str,
+    filters: dict[str, Any] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    sort: str = "relevance",
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    One page of matches as dicts (columns of target plus "rank") and the cursor of the
+    next page (None on the last one). filters are equality conditions on columns of target.
+    Raises InvalidCursor for a cursor of another sort order or a tampered one.
+    """
+    model = target.model
+    limit = max(1, min(limit, MAX_LIMIT))
+    fulltext = db.get_bind().dialect.name == "postgresql" and _has_vector(db, model.__tablename__)
+    if not fulltext:
+        sort = "date"
+    text_column = getattr(model, target.text)
+    start_column = getattr(model, target.start)
+
+    stmt = select(*(getattr(model, name) for name in target.columns))
+    if fulltext:
+        vector = literal_column(f"{model.__tablename__}.suchvektor")
+        tsquery = func.websearch_to_tsquery(literal_column("'german'::regconfig"), q)
+        rank = func.ts_rank(vector, tsquery)
+        stmt = stmt.add_columns(rank.label("rank")).where(vector.bool_op("@@")(tsquery))
+    else:
+        rank = None
+        stmt = stmt.add_columns(literal(None).label("rank"))
+        terms = _like_terms(q)
+        if not any(not excluded for excluded, _ in terms):
+            return [], None
+        searched = func.lower(func.coalesce(text_column, ""))
+        for excluded, pattern in terms:
+            condition = searched.like(pattern, escape="\\")
+            stmt = stmt.where(~condition if excluded else condition)
+
+    for name, value in (filters or {}).items():
+        if value is not None:
+            stmt = stmt.where(getattr(model, name) == value)
+    if start_date is not None:
+        stmt = stmt.where(getattr(model, target.end) >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(start_column <= end_date)
+
+    order = rank if sort == "relevance" else start_column
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort)
+        # Same float4 as ts_rank returned, so the row of the cursor compares equal
+        value = cast(literal(value), REAL) if sort == "relevance" else literal(value)
+        stmt = stmt.where(tuple_(order, model.id) < tuple_(value, literal(last_id)))
+    stmt = stmt.order_by(order.desc(), model.id.desc()).limit(limit + 1)
+
+    rows = [dict(row._mapping) for row in db.execute(stmt)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, last["rank"] if sort == "relevance" else last[target.start], last["id"])
+    return rows, next_cursor
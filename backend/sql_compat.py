@@ -0,0 +1,82 @@
+# sql_compat.py - SQL expressions with dialect-specific fallbacks
+#
+# Queries use these instead of Postgres-only functions, so they also run on the
+# embedded SQLite database (see sqlite_engine.py).
+
+from sqlalchemy import Boolean, Date, Float, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class week_start(FunctionElement):
+    """Monday of the week of a date, as a date."""
+    type = Date()
+    name = "week_start"
+    inherit_cache = True
+
+
+@compiles(week_start)
+def _week_start_postgresql(element, compiler, **kw):
+    return f"CAST(date_trunc('week', {compiler.process(element.clauses, **kw)}) AS DATE)"
+
+
+@compiles(week_start, "sqlite")
+def _week_start_sqlite(element, compiler, **kw):
+    # 'weekday 0' moves to the next Sunday (or stays on it), six days back is its Monday
+    return f"date({compiler.process(element.clauses, **kw)}, 'weekday 0', '-6 days')"
+
+
+class epoch_day(FunctionElement):
+    """Days since 1970-01-01 of a date, as an integer."""
+    type = Integer()
+    name = "epoch_day"
+    inherit_cache = True
+
+
+@compiles(epoch_day)
+def _epoch_day_postgresql(element, compiler, **kw):
+    # date - date is an integer number of days in Postgres
+    return f"({compiler.process(element.clauses, **kw)} - DATE '1970-01-01')"
+
+
+@compiles(epoch_day, "sqlite")
+def _epoch_day_sqlite(element, compiler, **kw):
+    return f"CAST(julianday({compiler.process(element.clauses, **kw)}) - 2440587.5 AS INTEGER)"
+
+
+class word_similarity(FunctionElement):
+    """pg_trgm similarity of a search term to the best matching part of a text (0..1)."""
+    type = Float()
+    name = "word_similarity"
+    inherit_cache = True
+
+
+@compiles(word_similarity)
+def _word_similarity_postgresql(element, compiler, **kw):
+    return f"word_similarity({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(word_similarity, "sqlite")
+def _word_similarity_sqlite(element, compiler, **kw):
+    # No trigrams in SQLite: every match ranks the same
+    return "0.0"
+
+
+class word_similar(FunctionElement):
+    """Search term (first argument) is similar to a part of the text, i.e. term <% text (pg_trgm, GIN indexable)."""
+    type = Boolean()
+    name = "word_similar"
+    inherit_cache = True
+
+
+@compiles(word_similar)
+def _word_similar_postgresql(element, compiler, **kw):
+    term, text = element.clauses
+    # As an operator expression, so the % is escaped for pyformat drivers (psycopg2)
+    return f"({compiler.process(term.bool_op('<%')(text), **kw)})"
+
+
+@compiles(word_similar, "sqlite")
+def _word_similar_sqlite(element, compiler, **kw):
+    # Fuzzy matching is Postgres only, SQLite finds substrings only
+    return "0"
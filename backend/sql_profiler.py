@@ -0,0 +1,152 @@
+# sql_profiler.py - Per-request SQL profiling and N+1 detection
+#
+# SQLAlchemy cursor events time every statement. Statements slower than
+# SLOW_QUERY_MS are always logged. When the profiler is enabled (SQL_PROFILER=1, or
+# by default outside production) SQLProfilerMiddleware additionally
+#   - counts queries and DB time per request and returns them as
+#     X-DB-Queries and Server-Timing headers,
+#   - warns when the same statement shape runs N_PLUS_ONE_THRESHOLD times or more
+#     in one request (typical N+1 pattern from lazy loading in a loop),
+#   - runs EXPLAIN (ANALYZE, BUFFERS) for slow SELECTs of requests that send
+#     "X-Debug-Explain: 1" (or for all requests with SQL_PROFILER_EXPLAIN=1) and logs the plan.
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_mode = os.getenv("SQL_PROFILER", "auto").lower()
+if _mode == "auto":
+    ENABLED = os.getenv("ENVIRONMENT", "development").lower() != "production"
+else:
+    ENABLED = _mode in ("1", "true", "yes", "on")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+EXPLAIN_ALWAYS = os.getenv("SQL_PROFILER_EXPLAIN", "false").lower() in ("1", "true", "yes")
+EXPLAIN_HEADER = b"x-debug-explain"
+
+
+@dataclass
+class RequestProfile:
+    explain: bool = False
+    queries: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.queries += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar("sql_profile", default=None)
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+")
+_PARAM_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    """Statement with parameters and expanded IN lists collapsed, used to group repeats."""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("?", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+def current_profile() -> RequestProfile | None:
+    return _current_profile.get()
+
+
+def _explain(cursor, statement: str, parameters) -> str | None:
+    """Runs EXPLAIN (ANALYZE, BUFFERS) on the statement's connection. SELECTs only, since ANALYZE executes it."""
+    if not _SELECT_RE.match(statement):
+        return None
+    if re.search(r"\bFOR\s+(UPDATE|SHARE)\b", statement, re.IGNORECASE):
+        return None
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+        return "\n".join(row[0] for row in explain_cursor.fetchall())
+    except Exception as e:
+        logger.warning("EXPLAIN failed: %s", e)
+        return None
+    finally:
+        explain_cursor.close()
+
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_profiler_start")
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, duration)
+
+        if duration * 1000 >= SLOW_QUERY_MS:
+            plan = None
+            # Not on async drivers: their adapted cursors cannot run a second statement synchronously
+            if not executemany and engine.dialect.name == "postgresql" and not engine.dialect.is_async and (
+                EXPLAIN_ALWAYS or (profile is not None and profile.explain)
+            ):
+                plan = _explain(cursor, statement, parameters)
+            if plan:
+                logger.warning("Slow query (%.1f ms): %s\n%s", duration * 1000, statement, plan)
+            else:
+                logger.warning("Slow query (%.1f ms): %s", duration * 1000, statement)
+
+
+class SQLProfilerMiddleware:
+    """Collects a RequestProfile per HTTP request and reports it in the response headers."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        explain = EXPLAIN_ALWAYS or any(
+            name == EXPLAIN_HEADER and value in (b"1", b"true") for name, value in scope["headers"]
+        )
+        profile = RequestProfile(explain=explain)
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(profile.queries))
+                headers.append("Server-Timing", f'db;dur={profile.duration * 1000:.1f};desc="{profile.queries} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            for shape, count in profile.repeated_shapes():
+                logger.warning(
+                    "Possible N+1 in %s %s: statement ran %d times: %s",
+                    scope["method"], scope["path"], count, shape[:500],
+                )
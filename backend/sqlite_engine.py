@@ -0,0 +1,131 @@
+# sqlite_engine.py - Engines for the embedded SQLite mode
+#
+# DATABASE_URL=sqlite:////data/zeiterfassung.db runs the app without a Postgres server
+# (single-node installs, development). DATABASE_URL=sqlite:// is an in-memory database
+# that lives as long as the process, for API test runs with FastAPI's TestClient
+# (no database server, tables are created in milliseconds by launcher.prepare()).
+#
+# Per process there is one writer connection and a pool of reader connections:
+#   - the database runs in WAL mode, so readers never block the writer and see every
+#     committed write as soon as their next transaction starts,
+#   - the writer pool holds exactly one connection: writes of one process queue in the
+#     pool instead of failing with "database is locked"; writes of other processes wait
+#     up to SQLITE_BUSY_TIMEOUT_MS for the file lock (BEGIN IMMEDIATE takes it up front,
+#     so a transaction never fails halfway when upgrading from read to write),
+#   - database.RoutingSession sends reads to the readers and flushes/DML to the writer.
+# The in-memory database uses a shared cache instead of WAL (same data for all
+# connections of the process, including the aiosqlite ones) and read_uncommitted, so
+# readers do not take table locks that would make the writer fail.
+
+import logging
+import os
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+# How long a write waits for the writer connection of its own process
+WRITER_TIMEOUT_SECONDS = float(os.getenv("SQLITE_WRITER_TIMEOUT_SECONDS", "30"))
+
+MEMORY_URI = "file:zeiterfassung?mode=memory&cache=shared"
+
+# Keeps the in-memory database alive while the pools open and close their connections
+_memory_keeper: sqlite3.Connection | None = None
+
+
+def is_memory(url) -> bool:
+    url = make_url(url)
+    database = url.database or ""
+    return database in ("", ":memory:") or "mode=memory" in database or url.query.get("mode") == "memory"
+
+
+def normalize_url(url):
+    """File URLs unchanged; any in-memory URL becomes the shared-cache database of this process."""
+    global _memory_keeper
+    url = make_url(url)
+    if not is_memory(url):
+        return url
+    if _memory_keeper is None:
+        _memory_keeper = sqlite3.connect(MEMORY_URI, uri=True, check_same_thread=False)
+    return url.set(database=MEMORY_URI, query={"uri": "true"})
+
+
+def _pragmas(url, writer: bool, query_only: bool) -> list[str]:
+    pragmas = []
+    if writer and not is_memory(url):
+        # Persistent in the database file; a no-op once the file is in WAL mode
+        pragmas.append("PRAGMA journal_mode = WAL")
+    pragmas += [
+        f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+        "PRAGMA foreign_keys = ON",  # ON DELETE CASCADE/SET NULL of the models
+        "PRAGMA synchronous = NORMAL",  # in WAL mode only a power loss can lose the last commits
+        f"PRAGMA cache_size = {-CACHE_MB * 1024}",
+        "PRAGMA temp_store = MEMORY",
+        f"PRAGMA mmap_size = {MMAP_MB * 1024 * 1024}",
+    ]
+    if query_only:
+        # Writes routed to a reader by mistake fail loudly instead of competing for the lock
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _engine_options(url) -> dict:
+    # SQLAlchemy's isolation level READ UNCOMMITTED is PRAGMA read_uncommitted, which it
+    # would reset on every checkout if it were set in the connect event
+    return {"isolation_level": "READ UNCOMMITTED"} if is_memory(url) else {}
+
+
+def _configure(engine, url, writer: bool, query_only: bool = False) -> None:
+    pragmas = _pragmas(url, writer, query_only)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Transactions are started by the "begin" event below, not by the sqlite3 module
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if writer else "BEGIN")
+
+
+def create_writer(url):
+    url = normalize_url(url)
+    engine = create_engine(
+        url, poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=WRITER_TIMEOUT_SECONDS,
+        connect_args={"check_same_thread": False}, **_engine_options(url),
+    )
+    _configure(engine, url, writer=True)
+    logger.info("SQLite-Datenbank: %s", "in-memory" if is_memory(url) else url.database)
+    return engine
+
+
+def create_reader(url, pool_size: int, max_overflow: int):
+    url = normalize_url(url)
+    engine = create_engine(
+        url, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow,
+        connect_args={"check_same_thread": False}, **_engine_options(url),
+    )
+    _configure(engine, url, writer=False, query_only=True)
+    return engine
+
+
+def create_async_reader(url, pool_size: int, max_overflow: int):
+    """aiosqlite pool for the async read paths (auth dependency, list endpoints)."""
+    url = normalize_url(url).set(drivername="sqlite+aiosqlite")
+    engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=max_overflow, **_engine_options(url),
+    )
+    # Not query_only: the async sessions have no writer to route to
+    _configure(engine.sync_engine, url, writer=False)
+    return engine
@@ -95,6 +95,17 @@ async function handleApiResponse(response, errorContext, successCallback, errorC
     return null;
 }
 
+/**
+ * Creates a new value for the Idempotency-Key header
+ * @returns {string} Random unique key
+ */
+function newIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(16)}-${Math.random().toString(16).slice(2)}-${Math.random().toString(16).slice(2)}`;
+}
+
 /**
  * Enhanced fetch with automatic error handling
  * @param {string} url - API endpoint URL
@@ -126,6 +137,12 @@ async function fetchWithErrorHandling(url, options = {}, errorContext = 'API-Anf
         if (options.headers) {
             mergedOptions.headers = { ...defaultOptions.headers, ...options.headers };
         }
+
+        // POSTs get an Idempotency-Key; the retry after a token refresh sends the same key,
+        // so the server does not apply the write twice
+        if ((mergedOptions.method || 'GET').toUpperCase() === 'POST' && !mergedOptions.headers['Idempotency-Key']) {
+            mergedOptions.headers = { ...mergedOptions.headers, 'Idempotency-Key': newIdempotencyKey() };
+        }
         
         const response = await fetch(url, mergedOptions);
         
@@ -212,5 +229,6 @@ function getFallbackData(dataType) {
 window.ApiErrorHandler = {
     handleApiResponse,
     fetchWithErrorHandling,
+    newIdempotencyKey,
     getFallbackData
 };
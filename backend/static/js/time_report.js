@@ -0,0 +1,93 @@
+/**
+ * Stundenzettel (monthly timesheet PDFs) for BBQ GmbH Zeiterfassung
+ * Downloads the PDF of the logged-in user from /api/v1/reports/timesheets/{year}/{month}/{user_id}.pdf;
+ * the PDFs are rendered on the server.
+ */
+
+function timesheetToken() {
+    const token = localStorage.getItem('accessToken');
+    if (!token) {
+        window.location.href = '/login.html?message=Session abgelaufen. Bitte erneut anmelden.';
+        throw new Error('Unauthorized - No token');
+    }
+    return token;
+}
+
+async function downloadFile(url, fallbackName) {
+    const response = await fetch(url, { headers: { 'Authorization': `Bearer ${timesheetToken()}` } });
+    if (!response.ok) {
+        let detail = `HTTP ${response.status}`;
+        try {
+            detail = (await response.json()).detail || detail;
+        } catch (e) {
+            // Kein JSON im Fehlerfall
+        }
+        throw new Error(detail);
+    }
+    const disposition = response.headers.get('Content-Disposition') || '';
+    const match = disposition.match(/filename="([^"]+)"/);
+    const blob = await response.blob();
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(blob);
+    link.download = match ? match[1] : fallbackName;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+}
+
+async function currentUserId() {
+    const response = await fetch('/api/v1/users/me', { headers: { 'Authorization': `Bearer ${timesheetToken()}` } });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    return (await response.json()).id;
+}
+
+/**
+ * Downloads the timesheet of a month; without userId the one of the logged-in user.
+ */
+async function downloadTimesheet(year, month, userId) {
+    const id = userId || await currentUserId();
+    await downloadFile(`/api/v1/reports/timesheets/${year}/${month}/${id}.pdf`, `stundenzettel_${year}-${month}.pdf`);
+}
+
+/**
+ * Downloads the timesheets of all employees of a month as ZIP (managers only).
+ */
+async function downloadTimesheetArchive(year, month) {
+    await downloadFile(`/api/v1/reports/timesheets/${year}/${month}.zip`, `stundenzettel_${year}-${month}.zip`);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('timesheet-form');
+    if (!form) {
+        return;
+    }
+    const monthInput = document.getElementById('timesheet-month');
+    const status = document.getElementById('timesheet-status');
+    // Default: previous month, the one that gets signed
+    const now = new Date();
+    const previous = new Date(now.getFullYear(), now.getMonth() - 1, 1);
+    monthInput.value = `${previous.getFullYear()}-${String(previous.getMonth() + 1).padStart(2, '0')}`;
+
+    form.addEventListener('submit', async (event) => {
+        event.preventDefault();
+        const [year, month] = monthInput.value.split('-').map(Number);
+        if (!year || !month) {
+            return;
+        }
+        const button = form.querySelector('button[type="submit"]');
+        button.disabled = true;
+        status.textContent = 'Stundenzettel wird erstellt...';
+        try {
+            await downloadTimesheet(year, month);
+            status.textContent = '';
+        } catch (error) {
+            console.error('Stundenzettel konnte nicht erstellt werden:', error);
+            status.textContent = `Fehler: ${error.message}`;
+        } finally {
+            button.disabled = false;
+        }
+    });
+});
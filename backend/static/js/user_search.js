@@ -0,0 +1,76 @@
+/**
+ * Benutzersuche (typeahead) for BBQ GmbH Zeiterfassung
+ * Searches users on the server (GET /api/v1/users/search: username, names and email,
+ * tolerant of typos) instead of loading the whole user list into the page.
+ */
+
+async function searchUsers({ q = '', rolleId = null, istAktiv = null, limit = 20 } = {}) {
+    const token = localStorage.getItem('accessToken');
+    if (!token) {
+        window.location.href = '/login.html?message=Session abgelaufen. Bitte erneut anmelden.';
+        throw new Error('Unauthorized - No token');
+    }
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (q) params.set('q', q);
+    if (rolleId) params.set('rolle_id', rolleId);
+    if (istAktiv !== null) params.set('ist_aktiv', String(istAktiv));
+
+    const response = await fetch(`/api/v1/users/search?${params}`, { headers: { 'Authorization': `Bearer ${token}` } });
+    if (!response.ok) {
+        throw new Error(`Benutzersuche fehlgeschlagen (HTTP ${response.status})`);
+    }
+    return response.json();
+}
+
+function userLabel(user) {
+    return `${user.vorname} ${user.nachname} (#${user.id})`;
+}
+
+/**
+ * Typeahead on a text input: suggestions are shown in a datalist while typing,
+ * onSelect(user) is called with the chosen user, or with null when the input is cleared.
+ */
+function attachUserTypeahead(input, onSelect, { minLength = 2, delay = 250, limit = 10 } = {}) {
+    const datalist = document.createElement('datalist');
+    datalist.id = `${input.id}-suggestions`;
+    input.after(datalist);
+    input.setAttribute('list', datalist.id);
+    input.setAttribute('autocomplete', 'off');
+
+    let suggestions = [];
+    let timer = null;
+    let sequence = 0;
+
+    input.addEventListener('input', () => {
+        const value = input.value.trim();
+        const chosen = suggestions.find(user => userLabel(user) === value);
+        if (chosen) {
+            onSelect(chosen);
+            return;
+        }
+        if (!value) {
+            onSelect(null);
+        }
+        clearTimeout(timer);
+        if (value.length < minLength) {
+            return;
+        }
+        timer = setTimeout(async () => {
+            // Ältere Antworten verwerfen, wenn inzwischen weiter getippt wurde
+            const current = ++sequence;
+            try {
+                const users = await searchUsers({ q: value, limit });
+                if (current !== sequence) return;
+                suggestions = users;
+                datalist.innerHTML = '';
+                users.forEach(user => {
+                    const option = document.createElement('option');
+                    option.value = userLabel(user);
+                    datalist.appendChild(option);
+                });
+            } catch (error) {
+                console.error('Fehler bei der Benutzersuche:', error);
+            }
+        }, delay);
+    });
+}
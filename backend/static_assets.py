@@ -0,0 +1,156 @@
+# static_assets.py - Fingerprinted static assets (see build_static.py)
+#
+# build_static.py writes content-hashed copies of static/ to static/dist/ together
+# with .gz/.br variants, resized/WebP/AVIF image variants and a manifest.json.
+# Templates resolve URLs through asset_url()/image_url()/picture(), which fall back
+# to the plain /static/ files when no build has been run (local development).
+
+import json
+import logging
+import os
+from html import escape
+from mimetypes import guess_type
+
+import anyio
+from markupsafe import Markup
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIRNAME = "dist"
+DIST_DIR = os.path.join(STATIC_DIR, DIST_DIRNAME)
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+STATIC_URL = "/static/"
+
+# Hashed files never change, everything else is revalidated via ETag/Last-Modified
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Image formats offered as <source> elements, best compression first
+PICTURE_FORMATS = (("avif", "image/avif"), ("webp", "image/webp"))
+
+_manifest: dict | None = None
+
+
+def variant_name(path: str, width: int | None = None, fmt: str | None = None) -> str:
+    """Logical manifest key of an image variant, e.g. images/logo-128w.webp."""
+    stem, ext = os.path.splitext(path)
+    if width:
+        stem = f"{stem}-{width}w"
+    return f"{stem}.{fmt}" if fmt else f"{stem}{ext}"
+
+
+def load_manifest() -> dict:
+    global _manifest
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        logger.info("No static asset manifest at %s, serving unhashed files", MANIFEST_PATH)
+        _manifest = {}
+    return _manifest
+
+
+def get_manifest() -> dict:
+    return _manifest if _manifest is not None else load_manifest()
+
+
+def asset_url(path: str) -> str:
+    """URL of a static file, the fingerprinted copy if the build produced one."""
+    path = path.lstrip("/")
+    hashed = get_manifest().get(path)
+    if hashed:
+        return f"{STATIC_URL}{DIST_DIRNAME}/{hashed}"
+    return f"{STATIC_URL}{path}"
+
+
+def _variant_key(path: str, width: int | None, fmt: str | None) -> str | None:
+    """Manifest key of the variant; images smaller than width only have the full-size variant."""
+    manifest = get_manifest()
+    for key in (variant_name(path, width, fmt), variant_name(path, None, fmt)):
+        if key in manifest:
+            return key
+    return None
+
+
+def image_url(path: str, width: int | None = None, fmt: str | None = None) -> str:
+    """
+    URL of a resized and/or converted image variant. Falls back to the original
+    format and then the original image if the variant was not built.
+    """
+    key = _variant_key(path, width, fmt) if fmt else None
+    return asset_url(key or _variant_key(path, width, None) or path)
+
+
+def picture(path: str, width: int | None = None, alt: str = "", **attrs) -> Markup:
+    """<picture> with AVIF/WebP sources for the variants that exist and an <img> fallback."""
+    sources = []
+    for fmt, mime in PICTURE_FORMATS:
+        key = _variant_key(path, width, fmt)
+        if key:
+            sources.append(f'<source type="{mime}" srcset="{escape(asset_url(key))}">')
+    img_attrs = "".join(f' {escape(name.replace("_", "-"))}="{escape(str(value))}"' for name, value in attrs.items())
+    img = f'<img src="{escape(image_url(path, width))}" alt="{escape(alt)}"{img_attrs}>'
+    return Markup(f"<picture>{''.join(sources)}{img}</picture>")
+
+
+def register_template_globals(env) -> None:
+    env.globals.update(asset_url=asset_url, image_url=image_url, picture=picture)
+
+
+def _accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the .br/.gz files written by build_static.py when the
+    client accepts them, and sets long-lived caching for fingerprinted files.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        immutable = path.replace("\\", "/").startswith(f"{DIST_DIRNAME}/")
+        response = None
+        if immutable and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+            if immutable:
+                response.headers.setdefault("Vary", "Accept-Encoding")
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        request_headers = Headers(scope=scope)
+        accepted = _accepted_encodings(request_headers)
+        media_type = guess_type(path)[0] or "application/octet-stream"
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
@@ -0,0 +1,52 @@
+# API tests against the embedded SQLite mode in memory, no Postgres needed:
+#     cd backend && python -m pytest tests
+# One app startup per run (schema and initial data, a few seconds), then every test
+# works on the same database; tests create their own projects instead of relying on
+# rows of other tests.
+
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules (import schemas, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Before anything imports database.py: the API tests run against a per-process in-memory
+# SQLite database (see sqlite_engine.py), without emails and without the report job pool
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DISABLE_EMAIL_SENDING"] = "true"
+os.environ["REPORT_JOBS_RUNNER"] = "false"
+
+ADMIN = {"username": "admin", "password": "adminpassword"}
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """TestClient logged in as the default admin user."""
+    from fastapi.testclient import TestClient
+
+    # Startup creates the schema and the initial data (roles, absence types, admin user)
+    with TestClient(app) as client:
+        response = client.post("/auth/token", data=ADMIN)
+        assert response.status_code == 200, response.text
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield client
+
+
+@pytest.fixture
+def project(client):
+    """A new project with one task of 10 planned hours."""
+    projekt = client.post("/api/v1/projects/", json={"name": "Testprojekt", "start_datum": "2025-01-01"})
+    assert projekt.status_code == 201, projekt.text
+    aufgabe = client.post("/api/v1/tasks/", json={
+        "name": "Umsetzung", "projekt_id": projekt.json()["id"], "geplante_stunden": "10",
+    })
+    assert aufgabe.status_code == 201, aufgabe.text
+    return {"projekt": projekt.json(), "aufgabe": aufgabe.json()}
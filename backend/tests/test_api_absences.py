@@ -0,0 +1,26 @@
+def _urlaub_id(client):
+    types = client.get("/api/v1/absence-types/").json()
+    return next(t["id"] for t in types if t["name"] == "Urlaub")
+
+
+def test_create_update_delete_list(client):
+    me = client.get("/api/v1/users/me").json()
+    created = client.post("/api/v1/absences/", json={
+        "benutzer_id": me["id"], "abwesenheit_typ_id": _urlaub_id(client),
+        "start_datum": "2025-07-01", "end_datum": "2025-07-04", "grund": "Sommerurlaub",
+    })
+    assert created.status_code == 201, created.text
+    absence = created.json()
+    assert absence["status"] == "beantragt"
+    assert absence["abwesenheit_typ"]["name"] == "Urlaub"
+
+    updated = client.put(f"/api/v1/absences/{absence['id']}", json={"status": "genehmigt"})
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["status"] == "genehmigt"
+
+    listed = client.get("/api/v1/absences/", params={"benutzer_id": me["id"]})
+    assert listed.status_code == 200, listed.text
+    assert absence["id"] in {row["id"] for row in listed.json()}
+
+    assert client.delete(f"/api/v1/absences/{absence['id']}").status_code == 204
+    assert client.get(f"/api/v1/absences/{absence['id']}").status_code == 404
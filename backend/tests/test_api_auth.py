@@ -0,0 +1,15 @@
+def test_login_and_me(client):
+    me = client.get("/api/v1/users/me")
+    assert me.status_code == 200, me.text
+    assert me.json()["username"] == "admin"
+    assert me.json()["rolle"]["name"] == "Administrator"
+
+
+def test_login_wrong_password(client):
+    response = client.post("/auth/token", data={"username": "admin", "password": "falsch"})
+    assert response.status_code == 401
+
+
+def test_me_requires_token(client):
+    response = client.get("/api/v1/users/me", headers={"Authorization": ""})
+    assert response.status_code == 401
@@ -0,0 +1,28 @@
+def test_burndown(client, project):
+    projekt_id = project["projekt"]["id"]
+    client.post("/api/v1/time-entries/", json={
+        "datum": "2025-03-03", "startzeit": "08:00:00", "endzeit": "12:00:00",
+        "projekt_id": projekt_id, "aufgabe_id": project["aufgabe"]["id"],
+    })
+    response = client.get(f"/api/v1/projects/{projekt_id}/burndown")
+    assert response.status_code == 200, response.text
+    burndown = response.json()
+    assert burndown["geplante_stunden"] == 10
+    assert burndown["ist_stunden"] == 4
+    assert burndown["verbrauch_prozent"] == 40
+
+
+def test_archive_and_restore(client, project):
+    projekt_id = project["projekt"]["id"]
+    aufgabe_id = project["aufgabe"]["id"]
+
+    assert client.delete(f"/api/v1/projects/{projekt_id}", params={"archive": True}).status_code == 204
+    assert projekt_id not in {p["id"] for p in client.get("/api/v1/projects/").json()}
+    # Tasks of archived projects are not offered any more (refdata cache)
+    assert aufgabe_id not in {t["id"] for t in client.get("/api/v1/tasks/").json()}
+
+    restored = client.post(f"/api/v1/projects/{projekt_id}/restore")
+    assert restored.status_code == 200, restored.text
+    assert restored.json()["geloescht_am"] is None
+    assert projekt_id in {p["id"] for p in client.get("/api/v1/projects/").json()}
+    assert aufgabe_id in {t["id"] for t in client.get("/api/v1/tasks/").json()}
@@ -0,0 +1,39 @@
+def _entry(project, **overrides):
+    entry = {
+        "datum": "2025-03-03", "startzeit": "08:00:00", "endzeit": "12:30:00", "beschreibung": "Konzept",
+        "projekt_id": project["projekt"]["id"], "aufgabe_id": project["aufgabe"]["id"],
+    }
+    entry.update(overrides)
+    return entry
+
+
+def test_create_update_delete(client, project):
+    created = client.post("/api/v1/time-entries/", json=_entry(project))
+    assert created.status_code == 201, created.text
+    entry = created.json()
+    assert entry["stunden"] == "4.50"
+    assert entry["projekt"] == {"id": project["projekt"]["id"], "name": "Testprojekt"}
+
+    updated = client.put(f"/api/v1/time-entries/{entry['id']}", json={"endzeit": "10:00:00", "beschreibung": "Review"})
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["beschreibung"] == "Review"
+
+    assert client.delete(f"/api/v1/time-entries/{entry['id']}").status_code == 204
+    assert client.get(f"/api/v1/time-entries/{entry['id']}").status_code == 404
+
+
+def test_list(client, project):
+    ids = {client.post("/api/v1/time-entries/", json=_entry(project, datum=day)).json()["id"] for day in ("2025-03-04", "2025-03-05")}
+    response = client.get("/api/v1/time-entries/", params={"projekt_id": project["projekt"]["id"]})
+    assert response.status_code == 200, response.text
+    assert {row["id"] for row in response.json()} == ids
+
+
+def test_idempotent_create(client, project):
+    headers = {"Idempotency-Key": "test-idempotent-create"}
+    first = client.post("/api/v1/time-entries/", json=_entry(project), headers=headers)
+    repeat = client.post("/api/v1/time-entries/", json=_entry(project), headers=headers)
+    assert first.status_code == repeat.status_code == 201
+    assert repeat.headers["Idempotent-Replayed"] == "true"
+    assert repeat.json() == first.json()
+    assert len(client.get("/api/v1/time-entries/", params={"projekt_id": project["projekt"]["id"]}).json()) == 1
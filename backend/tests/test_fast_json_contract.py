@@ -0,0 +1,88 @@
+# Contract between fast_json.py and the response_model path: with FAST_JSON_LISTS on or
+# off, the time entry and absence lists have to come out byte for byte the same.
+#     cd backend && python -m pytest tests
+
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+pytest.importorskip("orjson")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import fast_json
+import schemas
+
+UTC = timezone.utc
+CEST = timezone(timedelta(hours=2))
+
+ZEITEINTRAG_ROWS = [
+    SimpleNamespace(
+        id=1, benutzer_id=7, projekt_id=3, aufgabe_id=11,
+        datum=date(2025, 3, 31), startzeit=time(8, 0), endzeit=time(12, 30), stunden=Decimal("4.50"),
+        beschreibung="Überstunden für Kunde „Müller“ – Ticket #12", ist_abrechenbar=True,
+        erstellt_am=datetime(2025, 3, 31, 12, 30, 5, 123456, tzinfo=UTC),
+        aktualisiert_am=datetime(2025, 3, 31, 14, 0, tzinfo=CEST),
+        projekt_ref_id=3, projekt_name="Relaunch", aufgabe_ref_id=11, aufgabe_name="Konzept",
+    ),
+    SimpleNamespace(
+        id=2, benutzer_id=7, projekt_id=4, aufgabe_id=12,
+        datum=date(2025, 4, 1), startzeit=time(13, 15, 30), endzeit=time(17, 0), stunden=None,
+        beschreibung=None, ist_abrechenbar=False,
+        # SQLite returns naive datetimes
+        erstellt_am=datetime(2025, 4, 1, 17, 0), aktualisiert_am=datetime(2025, 4, 1, 17, 0, 0, 1),
+        projekt_ref_id=None, projekt_name=None, aufgabe_ref_id=None, aufgabe_name=None,
+    ),
+]
+
+ABWESENHEIT_ROWS = [
+    SimpleNamespace(
+        id=5, benutzer_id=7, abwesenheit_typ_id=1, genehmigt_von_benutzer_id=2,
+        start_datum=date(2025, 7, 1), end_datum=date(2025, 7, 14), grund="Sommerurlaub", status="genehmigt",
+        kommentar_genehmiger="Gute Erholung!", typ_name="Urlaub", typ_beschreibung=None,
+        erstellt_am=datetime(2025, 5, 2, 9, 0, tzinfo=UTC), aktualisiert_am=datetime(2025, 5, 3, 10, 0, tzinfo=CEST),
+    ),
+    SimpleNamespace(
+        id=6, benutzer_id=8, abwesenheit_typ_id=2, genehmigt_von_benutzer_id=None,
+        start_datum=date(2025, 2, 3), end_datum=date(2025, 2, 3), grund=None, status="beantragt",
+        kommentar_genehmiger=None, typ_name="Krankheit", typ_beschreibung="Mit Attest ab Tag 3",
+        erstellt_am=datetime(2025, 2, 3, 7, 45), aktualisiert_am=datetime(2025, 2, 3, 7, 45),
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Both branches of the list handlers in routers/time_entries.py and routers/absences.py
+    app = FastAPI()
+
+    @app.get("/model/time-entries", response_model=List[schemas.Zeiteintrag])
+    def time_entries_model():
+        return [fast_json.zeiteintrag_dict(row) for row in ZEITEINTRAG_ROWS]
+
+    @app.get("/fast/time-entries", response_model=List[schemas.Zeiteintrag])
+    def time_entries_fast():
+        return fast_json.zeiteintraege_response(ZEITEINTRAG_ROWS)
+
+    @app.get("/model/absences", response_model=List[schemas.Abwesenheit])
+    def absences_model():
+        return [fast_json.abwesenheit_dict(row) for row in ABWESENHEIT_ROWS]
+
+    @app.get("/fast/absences", response_model=List[schemas.Abwesenheit])
+    def absences_fast():
+        return fast_json.abwesenheiten_response(ABWESENHEIT_ROWS)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["time-entries", "absences"])
+def test_fast_path_matches_response_model(client, path):
+    expected = client.get(f"/model/{path}")
+    actual = client.get(f"/fast/{path}")
+    assert expected.status_code == actual.status_code == 200
+    assert actual.content == expected.content
+    assert actual.headers["content-type"] == expected.headers["content-type"]
@@ -0,0 +1,131 @@
+# timesheet_pdf.py - PDF layout of the monthly timesheet (Stundenzettel)
+#
+# Only plain data in, PDF bytes out: this module runs in the process pool of
+# timesheets.py and deliberately imports nothing of the app (no database, no models).
+# Without fpdf2 installed ENABLED is False and the timesheet endpoints answer 501.
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, time
+
+try:
+    from fpdf import FPDF
+except ImportError:
+    FPDF = None
+
+ENABLED = FPDF is not None
+
+# Part of the cache key of timesheets.py: bump when the layout changes
+LAYOUT_VERSION = 1
+
+MONTHS = ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli", "August",
+          "September", "Oktober", "November", "Dezember"]
+WEEKDAYS = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+
+@dataclass(frozen=True)
+class Day:
+    datum: date
+    stunden: float = 0.0
+    beginn: time | None = None
+    ende: time | None = None
+    eintraege: int = 0
+    abwesenheit: str | None = None  # name of the approved absence type
+
+
+@dataclass(frozen=True)
+class Timesheet:
+    benutzer_id: int
+    name: str
+    year: int
+    month: int
+    days: tuple[Day, ...]  # every day of the month
+
+    @property
+    def total_hours(self) -> float:
+        return round(sum(day.stunden for day in self.days), 2)
+
+    @property
+    def work_days(self) -> int:
+        return sum(1 for day in self.days if day.eintraege)
+
+    @property
+    def absences(self) -> dict[str, int]:
+        """Absence days per type, weekends not counted."""
+        counts: dict[str, int] = {}
+        for day in self.days:
+            if day.abwesenheit and day.datum.weekday() < 5:
+                counts[day.abwesenheit] = counts.get(day.abwesenheit, 0) + 1
+        return counts
+
+    @property
+    def title(self) -> str:
+        return f"Stundenzettel {MONTHS[self.month - 1]} {self.year}"
+
+
+def _text(value) -> str:
+    # The built-in PDF fonts cover Latin-1 (German umlauts included), nothing beyond
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+def _hours(value: float) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def render_pdf(sheet: Timesheet) -> bytes:
+    pdf = FPDF(orientation="P", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_title(sheet.title)
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", "B", 15)
+    pdf.cell(0, 9, _text(sheet.title), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 10)
+    last_day = calendar.monthrange(sheet.year, sheet.month)[1]
+    pdf.cell(0, 6, _text(f"Mitarbeiter: {sheet.name} (Nr. {sheet.benutzer_id})"), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 6, f"Zeitraum: 01.{sheet.month:02d}.{sheet.year} - {last_day:02d}.{sheet.month:02d}.{sheet.year}",
+             new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(3)
+
+    columns = [("Datum", 22), ("Tag", 12), ("Beginn", 20), ("Ende", 20), ("Stunden", 22), ("Einträge", 20), ("Bemerkung", 64)]
+    pdf.set_font("Helvetica", "B", 9)
+    pdf.set_fill_color(220, 228, 240)
+    for label, width in columns:
+        pdf.cell(width, 6, _text(label), border=1, fill=True)
+    pdf.ln()
+
+    pdf.set_font("Helvetica", "", 9)
+    pdf.set_fill_color(240, 240, 240)
+    for day in sheet.days:
+        weekend = day.datum.weekday() >= 5
+        values = [
+            day.datum.strftime("%d.%m."),
+            WEEKDAYS[day.datum.weekday()],
+            day.beginn.strftime("%H:%M") if day.beginn else "",
+            day.ende.strftime("%H:%M") if day.ende else "",
+            _hours(day.stunden) if day.eintraege else "",
+            str(day.eintraege) if day.eintraege else "",
+            day.abwesenheit or "",
+        ]
+        for (_, width), value in zip(columns, values):
+            pdf.cell(width, 5.5, _text(value), border=1, fill=weekend)
+        pdf.ln()
+
+    pdf.ln(3)
+    pdf.set_font("Helvetica", "B", 10)
+    pdf.cell(0, 6, _text(f"Summe Stunden: {_hours(sheet.total_hours)}    Arbeitstage: {sheet.work_days}"),
+             new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 10)
+    for name, days in sorted(sheet.absences.items()):
+        pdf.cell(0, 6, _text(f"{name}: {days} Tag(e)"), new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(18)
+    y = pdf.get_y()
+    pdf.line(15, y, 90, y)
+    pdf.line(120, y, 195, y)
+    pdf.set_font("Helvetica", "", 8)
+    pdf.set_xy(15, y + 1)
+    pdf.cell(75, 4, "Datum, Unterschrift Mitarbeiter")
+    pdf.set_xy(120, y + 1)
+    pdf.cell(75, 4, "Datum, Unterschrift Vorgesetzter")
+    return bytes(pdf.output())
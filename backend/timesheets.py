@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# timesheets.py - Monthly PDF timesheets (Stundenzettel) per employee
+#
+# load_month() reads the days of a month for one or all employees with a single
+# aggregated query (time entries summed per user and day, approved absences in the
+# same UNION ALL). Rendering is CPU bound and would pin a web worker, so the PDFs are
+# rendered in a process pool of TIMESHEET_PROCESSES processes (timesheet_pdf.py,
+# which has no database access); request handlers only wait for the result.
+#
+# Closed months (TIMESHEET_CLOSE_AFTER_DAYS after their end) are cached as files in
+# TIMESHEET_CACHE_DIR, shared by all workers of the node. The file name contains a
+# hash of the timesheet's data, so a late correction yields a new file instead of a
+# stale PDF; open months are rendered every time.
+#
+# Batch mode for all employees of a month: render() yields the PDFs in order while at
+# most a few are in flight, zip_stream() turns them into a ZIP archive chunk by chunk
+# (GET /api/v1/reports/timesheets/{year}/{month}.zip, or files/ZIP via the CLI).
+#
+# Usage (from backend/):
+#     python timesheets.py 2025-03 --out /tmp/stundenzettel
+#     python timesheets.py 2025-03 --zip /tmp/stundenzettel-2025-03.zip [--user 7]
+
+import argparse
+import calendar
+import collections
+import hashlib
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, Iterator
+
+from sqlalchemy import func, literal_column, null, or_, select, union_all
+from sqlalchemy.orm import Session
+
+import models
+import timesheet_pdf
+from timesheet_pdf import Day, Timesheet
+
+logger = logging.getLogger(__name__)
+
+ENABLED = timesheet_pdf.ENABLED
+PROCESSES = int(os.getenv("TIMESHEET_PROCESSES", "2"))
+CLOSE_AFTER_DAYS = int(os.getenv("TIMESHEET_CLOSE_AFTER_DAYS", "5"))
+CACHE_DIR = os.getenv("TIMESHEET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "zeiterfassung-timesheets"))
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def month_range(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def is_closed(year: int, month: int, today: date | None = None) -> bool:
+    """Closed months do not change anymore (bookings are late by a few days at most)."""
+    today = today or date.today()
+    return today > month_range(year, month)[1] + timedelta(days=CLOSE_AFTER_DAYS)
+
+
+# ---------- Data ----------
+def load_month(db: Session, year: int, month: int, benutzer_ids: list[int] | None = None) -> list[Timesheet]:
+    """
+    Timesheets of a month, sorted by name: the given users, or all active users and
+    everybody with entries or absences in the month.
+    """
+    first, last = month_range(year, month)
+    z, a, t = models.Zeiteintrag, models.Abwesenheit, models.AbwesenheitTyp
+
+    entries = (
+        select(
+            literal_column("'entry'").label("art"), z.benutzer_id, z.datum.label("von"), z.datum.label("bis"),
+            func.sum(z.stunden).label("stunden"), func.min(z.startzeit).label("beginn"),
+            func.max(z.endzeit).label("ende"), func.count().label("eintraege"), null().label("typ"),
+        )
+        .where(z.datum >= first, z.datum <= last)
+        .group_by(z.benutzer_id, z.datum)
+    )
+    absences = (
+        select(
+            literal_column("'absence'"), a.benutzer_id, a.start_datum, a.end_datum,
+            null(), null(), null(), null(), t.name,
+        )
+        .join(t, t.id == a.abwesenheit_typ_id)
+        .where(a.status == "genehmigt", a.start_datum <= last, a.end_datum >= first)
+    )
+    if benutzer_ids is not None:
+        entries = entries.where(z.benutzer_id.in_(benutzer_ids))
+        absences = absences.where(a.benutzer_id.in_(benutzer_ids))
+
+    days: dict[int, dict[date, Day]] = collections.defaultdict(dict)
+    for art, benutzer_id, von, bis, stunden, beginn, ende, eintraege, typ in db.execute(union_all(entries, absences)):
+        user_days = days[benutzer_id]
+        if art == "entry":
+            previous = user_days.get(von)
+            user_days[von] = Day(
+                datum=von, stunden=round(float(stunden or 0), 2), beginn=beginn, ende=ende, eintraege=eintraege,
+                abwesenheit=previous.abwesenheit if previous else None,
+            )
+            continue
+        current = max(von, first)
+        while current <= min(bis, last):
+            previous = user_days.get(current)
+            user_days[current] = Day(
+                datum=current, stunden=previous.stunden if previous else 0.0,
+                beginn=previous.beginn if previous else None, ende=previous.ende if previous else None,
+                eintraege=previous.eintraege if previous else 0, abwesenheit=typ,
+            )
+            current += timedelta(days=1)
+
+    b = models.Benutzer
+    users = select(b.id, b.vorname, b.nachname).order_by(b.nachname, b.vorname, b.id)
+    if benutzer_ids is not None:
+        users = users.where(b.id.in_(benutzer_ids))
+    else:
+        users = users.where(or_(b.geloescht_am.is_(None), b.id.in_(list(days))))
+
+    sheets = []
+    for benutzer_id, vorname, nachname in db.execute(users):
+        user_days = days.get(benutzer_id, {})
+        sheets.append(Timesheet(
+            benutzer_id=benutzer_id, name=f"{vorname} {nachname}", year=year, month=month,
+            days=tuple(user_days.get(first + timedelta(days=i)) or Day(datum=first + timedelta(days=i))
+                       for i in range((last - first).days + 1)),
+        ))
+    return sheets
+
+
+# ---------- Rendering ----------
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: the web worker has threads and open connections that must not be forked
+            _executor = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _cache_path(sheet: Timesheet) -> str:
+    digest = hashlib.sha256(repr((timesheet_pdf.LAYOUT_VERSION, sheet)).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(CACHE_DIR, f"{sheet.year:04d}-{sheet.month:02d}", f"{sheet.benutzer_id}-{digest}.pdf")
+
+
+def _read_cache(sheet: Timesheet) -> bytes | None:
+    try:
+        with open(_cache_path(sheet), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(sheet: Timesheet, pdf: bytes) -> None:
+    path = _cache_path(sheet)
+    directory, name = os.path.split(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Older versions of this timesheet (data corrected after closing)
+        prefix = f"{sheet.benutzer_id}-"
+        for other in os.listdir(directory):
+            if other.startswith(prefix) and other != name:
+                os.remove(os.path.join(directory, other))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not cache timesheet %s: %s", path, e)
+
+
+def render(sheets: Iterable[Timesheet], window: int | None = None) -> Iterator[tuple[Timesheet, bytes]]:
+    """
+    PDFs of the sheets in order. Cached ones are read from disk, the others rendered in
+    the process pool with at most window sheets in flight (results are not piled up
+    when the consumer, e.g. a slow download, is behind).
+    """
+    window = window or 2 * PROCESSES
+    pending: collections.deque[tuple[Timesheet, bool, bytes | Future]] = collections.deque()
+
+    def _result(item) -> tuple[Timesheet, bytes]:
+        sheet, closed, result = item
+        if isinstance(result, Future):
+            result = result.result()
+            if closed:
+                _write_cache(sheet, result)
+        return sheet, result
+
+    for sheet in sheets:
+        closed = is_closed(sheet.year, sheet.month)
+        cached = _read_cache(sheet) if closed else None
+        pending.append((sheet, closed, cached if cached is not None else _pool().submit(timesheet_pdf.render_pdf, sheet)))
+        while len(pending) > window or (pending and not isinstance(pending[0][2], Future)):
+            yield _result(pending.popleft())
+    while pending:
+        yield _result(pending.popleft())
+
+
+def render_one(sheet: Timesheet) -> bytes:
+    return next(render([sheet]))[1]
+
+
+def filename(sheet: Timesheet) -> str:
+    name = "".join(c if c.isalnum() else "_" for c in sheet.name)
+    return f"stundenzettel_{sheet.year:04d}-{sheet.month:02d}_{sheet.benutzer_id}_{name}.pdf"
+
+
+class _Chunks:
+    """Write-only, unseekable file object collecting what zipfile writes."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def zip_stream(rendered: Iterable[tuple[Timesheet, bytes]]) -> Iterator[bytes]:
+    """ZIP archive of the PDFs, yielded one file at a time (never the whole archive in memory)."""
+    sink = _Chunks()
+    # PDFs are compressed already
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for sheet, pdf in rendered:
+            archive.writestr(filename(sheet), pdf)
+            yield sink.take()
+    yield sink.take()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Renders the monthly timesheets of all (or some) employees.")
+    parser.add_argument("month", help="YYYY-MM")
+    parser.add_argument("--user", type=int, action="append", help="only this user id (repeatable)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directory for one PDF per employee")
+    target.add_argument("--zip", help="ZIP archive to write")
+    args = parser.parse_args(argv)
+
+    if not ENABLED:
+        sys.exit("fpdf2 is not installed (pip install fpdf2).")
+    year, month = (int(part) for part in args.month.split("-"))
+
+    from database import SessionLocal
+    with SessionLocal() as db:
+        sheets = load_month(db, year, month, args.user)
+
+    count = 0
+    try:
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            for sheet, pdf in render(sheets):
+                with open(os.path.join(args.out, filename(sheet)), "wb") as f:
+                    f.write(pdf)
+                count += 1
+        else:
+            with open(args.zip, "wb") as f:
+                for chunk in zip_stream(render(sheets)):
+                    f.write(chunk)
+            count = len(sheets)
+    finally:
+        shutdown()
+    print(f"{count} timesheets for {year:04d}-{month:02d} written to {args.out or args.zip}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())